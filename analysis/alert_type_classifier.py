@@ -0,0 +1,245 @@
+"""
+Alert Type Classifier
+Ranks the 18 FCC alert types in one pass over the tokens using an inverted keyword index
+"""
+
+from typing import Optional
+
+from analysis.text_preprocessor import prepare
+
+# id -> (display name, keywords); keywords may be multi-word phrases
+ALERT_TYPES: dict[str, tuple[str, list[str]]] = {
+    "evacuation": ("Evacuation Order", [
+        "evacuate", "evacuation", "evacuating", "flee", "leave immediately", "leave now", "abandon",
+    ]),
+    "shelter_in_place": ("Shelter in Place", [
+        "shelter in place", "stay indoors", "remain indoors", "remain inside", "stay inside",
+        "do not leave", "shelter",
+    ]),
+    "severe_weather": ("Severe Weather Warning", [
+        "tornado", "hurricane", "flood", "flooding", "flash flood", "severe thunderstorm",
+        "damaging winds", "hail", "severe",
+    ]),
+    "hazmat": ("Hazmat Release", [
+        "chemical", "chemical release", "hazardous", "hazmat", "contamination", "spill", "toxic",
+        "gas leak", "vapors", "fumes",
+    ]),
+    "infrastructure": ("Infrastructure Failure", [
+        "collapse", "failure", "bridge", "dam", "levee", "structure",
+    ]),
+    "public_safety": ("Public Safety Threat", [
+        "armed", "threat", "danger", "dangerous", "intruder", "suspicious", "active shooter",
+        "shooter", "public safety",
+    ]),
+    "law_enforcement": ("Law Enforcement Warning", [
+        "police", "law enforcement", "suspect", "wanted", "fugitive", "escaped", "sheriff",
+    ]),
+    "all_clear": ("All Clear / Cancel", [
+        "all clear", "cancelled", "canceled", "cancel", "resume", "no longer in effect", "lifted",
+    ]),
+    # Only marker phrases: a bare "test" or "drill" also appears in real alerts ("boil water until tested")
+    "test": ("Test / Exercise", [
+        "this is a test", "only a test", "this is a drill", "this is an exercise", "test message", "test alert",
+    ]),
+    "tsunami": ("Tsunami Warning", [
+        "tsunami", "earthquake", "ocean", "coastal", "high ground",
+    ]),
+    "winter_storm": ("Winter Storm Warning", [
+        "blizzard", "ice", "icy", "frozen", "winter", "snow", "winter storm", "freezing rain", "wind chill",
+    ]),
+    "fire": ("Fire Warning", [
+        "fire", "wildfire", "burning", "flames", "blaze",
+    ]),
+    "health": ("Health / Medical Emergency", [
+        "disease", "outbreak", "epidemic", "pandemic", "contamination", "health", "medical", "quarantine",
+    ]),
+    "utility": ("Utility Alert", [
+        "power", "outage", "utility", "water", "gas", "electricity", "boil water",
+    ]),
+    "transportation": ("Transportation Disruption", [
+        "closure", "closed", "transit", "traffic", "road", "highway", "interstate", "detour",
+    ]),
+    "national_security": ("National Security Warning", [
+        "national security", "nuclear", "missile", "ballistic", "attack", "terrorist", "national", "security",
+    ]),
+    "environmental": ("Environmental Warning", [
+        "air quality", "dust", "radiation", "environmental", "pollution", "smog", "ozone",
+    ]),
+    "other": ("Other / Miscellaneous", []),
+}
+
+# Words that hint at a category but also appear in unrelated alerts
+WEAK_KEYWORDS = frozenset({
+    "severe", "danger", "dangerous", "national", "security", "water", "gas", "road", "structure",
+    "ocean", "health", "power", "shelter", "closed", "failure", "resume",
+})
+
+# Categories whose words mean "this is real, act now"
+EMERGENCY_TYPES = frozenset({
+    "evacuation", "shelter_in_place", "severe_weather", "hazmat", "public_safety",
+    "tsunami", "fire", "national_security",
+})
+
+HEADLINE_TOKENS = 3
+
+NEGATIONS = frozenset({"not", "no", "don't", "never"})
+
+# Single words that mark a test only as an uppercase header ("TEST: ...") or as "not a drill"
+MARKER_WORDS = frozenset({"test", "exercise", "drill"})
+
+
+class AlertTypeClassifier:
+    """Inverted index from first token to (category, phrase, weight) entries"""
+
+    def __init__(self, alert_types: Optional[dict] = None):
+        self.alert_types = alert_types or ALERT_TYPES
+        self.index: dict[str, list[tuple[str, tuple[str, ...], float]]] = {}
+        for category, (_, keywords) in self.alert_types.items():
+            for keyword in keywords:
+                phrase = tuple(keyword.split())
+                weight = 0.5 if keyword in WEAK_KEYWORDS else 1.0 + 0.5 * (len(phrase) - 1)
+                self.index.setdefault(phrase[0], []).append((category, phrase, weight))
+        # Longest phrases first so "shelter in place" wins over "shelter" at the same position
+        for entries in self.index.values():
+            entries.sort(key=lambda entry: -len(entry[1]))
+
+    def _scan(self, text: str) -> tuple[list[dict], int]:
+        """Single pass over the shared tokens; one hit per category per position"""
+        prepared = prepare(text)
+        tokens, offsets = prepared.tokens, prepared.offsets
+        hits = []
+        for i, token in enumerate(tokens):
+            entries = self.index.get(token, [])
+            seen = set()
+            for category, phrase, weight in entries:
+                if category in seen or tokens[i:i + len(phrase)] != phrase:
+                    continue
+                seen.add(category)
+                start, end = offsets[i][0], offsets[i + len(phrase) - 1][1]
+                hits.append({
+                    "category": category,
+                    "phrase": " ".join(phrase),
+                    "text": str(prepared)[start:end],
+                    "start": start,
+                    "end": end,
+                    "token_index": i,
+                    "weight": weight,
+                    "negated": any(t in NEGATIONS for t in tokens[max(0, i - 2):i]),
+                })
+            if token in MARKER_WORDS and "test" not in seen:
+                start, end = offsets[i]
+                text_span = str(prepared)[start:end]
+                negated = tokens[max(0, i - 2):i] in (("not", "a"), ("not", "an"))
+                if negated or (i < HEADLINE_TOKENS and text_span.isupper()):
+                    hits.append({
+                        "category": "test",
+                        "phrase": token,
+                        "text": text_span,
+                        "start": start,
+                        "end": end,
+                        "token_index": i,
+                        "weight": 1.0,
+                        "negated": negated,
+                    })
+        return hits, len(tokens)
+
+    def classify(self, text: str) -> dict:
+        """Ranked alert types with confidence, plus category-specific checks"""
+        hits, token_count = self._scan(text)
+
+        scores: dict[str, float] = {}
+        for hit in hits:
+            weight = hit["weight"]
+            if hit["negated"]:
+                # "Do not evacuate" is still about evacuation, just much weaker evidence
+                weight *= 0.25
+            elif hit["token_index"] < HEADLINE_TOKENS:
+                # Alerts usually open with their type ("Evacuation Order from ...")
+                weight *= 1.5
+            scores[hit["category"]] = scores.get(hit["category"], 0.0) + weight
+
+        total = sum(scores.values())
+        ranked = []
+        for category, score in sorted(scores.items(), key=lambda item: -item[1]):
+            # Share of the evidence, discounted when there is little of it
+            confidence = (score / total) * min(1.0, score / 2.0)
+            ranked.append({
+                "type": category,
+                "name": self.alert_types[category][0],
+                "score": round(score, 2),
+                "confidence": round(confidence, 2),
+                "matches": sorted({h["text"] for h in hits if h["category"] == category}),
+            })
+        if not ranked:
+            ranked.append({"type": "other", "name": self.alert_types["other"][0],
+                           "score": 0.0, "confidence": 0.0, "matches": []})
+
+        is_test = any(h["category"] == "test" and not h["negated"] for h in hits)
+        return {
+            "primary_type": ranked[0]["type"],
+            "primary_name": ranked[0]["name"],
+            "confidence": ranked[0]["confidence"],
+            "is_test": is_test,
+            "types": ranked,
+            "checks": self._checks(hits, token_count, is_test),
+        }
+
+    def _checks(self, hits: list[dict], token_count: int, is_test: bool) -> list[dict]:
+        checks = []
+        by_category: dict[str, list[dict]] = {}
+        for hit in hits:
+            by_category.setdefault(hit["category"], []).append(hit)
+
+        emergency = [
+            h for h in hits
+            if h["category"] in EMERGENCY_TYPES and not h["negated"] and h["phrase"] not in WEAK_KEYWORDS
+        ]
+        if is_test:
+            test_hits = [h for h in by_category["test"] if not h["negated"]]
+            if emergency:
+                checks.append({
+                    "type": "test_with_emergency_language",
+                    "severity": "high",
+                    "message": "TEST alert contains real emergency language: "
+                               + ", ".join(sorted({h["text"] for h in emergency})),
+                })
+            first, last = test_hits[0]["token_index"], test_hits[-1]["token_index"]
+            if first > 5 or last < token_count - 8:
+                checks.append({
+                    "type": "test_marker_position",
+                    "severity": "medium",
+                    "message": "Mark TEST alerts at both the beginning and the end of the message.",
+                })
+            if not any(word.isupper() for h in test_hits for word in h["text"].split()
+                       if word.lower() in MARKER_WORDS):
+                checks.append({
+                    "type": "test_marker_case",
+                    "severity": "low",
+                    "message": 'Write "TEST" in capital letters.',
+                })
+
+        if any(h["category"] == "test" and h["negated"] for h in hits):
+            checks.append({
+                "type": "not_a_drill",
+                "severity": "high",
+                "message": '"Not a drill/test" wording: confirm this is a real alert and name the issuing agency.',
+            })
+
+        if "all_clear" in by_category and not (set(by_category) & (EMERGENCY_TYPES | {"winter_storm", "health",
+                                                                                     "utility", "environmental"})):
+            checks.append({
+                "type": "all_clear_without_reference",
+                "severity": "medium",
+                "message": "All-clear messages should name the alert being cancelled.",
+            })
+
+        evacuate = [h for h in by_category.get("evacuation", []) if not h["negated"]]
+        shelter = [h for h in by_category.get("shelter_in_place", [])
+                   if not h["negated"] and h["phrase"] != "shelter"]
+        if evacuate and shelter:
+            checks.append({
+                "type": "evacuate_and_shelter",
+                "severity": "high",
+                "message": "Message tells people both to evacuate and to stay inside.",
+            })
+        return checks
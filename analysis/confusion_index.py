@@ -0,0 +1,149 @@
+"""
+Compiled Confusion-Pattern Index
+Matches every ConfusionDetector pattern in a single regex pass and returns typed spans
+"""
+
+import re
+import time
+from typing import Iterable, Optional
+
+# Each rule becomes one named group in the combined pattern.
+# Rules with "report": False are markers used only by contradiction checks.
+DEFAULT_CONFUSION_RULES = [
+    # Ambiguous phrases
+    {"type": "Ambiguous phrase", "pattern": r"\bsomething\b",
+     "reason": "Does not say what the danger is"},
+    {"type": "Ambiguous phrase", "pattern": r"\bmight\b|\bpossibly\b|\bcould\b",
+     "reason": "Uncertain wording weakens the call to action"},
+    {"type": "Ambiguous phrase", "pattern": r"\bsoon\b|\bat some point\b|\blater\b",
+     "reason": "Timing is unclear; give a specific time"},
+    {"type": "Ambiguous phrase", "pattern": r"\bsomewhere\b|\bin the area\b|\bnearby\b",
+     "reason": "Location is unclear; name the affected area"},
+    # Vague language
+    {"type": "Vague language", "pattern": r"\bbe careful\b|\bstay alert\b|\bbe aware\b",
+     "reason": "Does not tell people what to do"},
+    {"type": "Vague language", "pattern": r"\btake (?:action|precautions|necessary steps)\b",
+     "reason": "Name the specific protective action"},
+    {"type": "Vague language", "pattern": r"\bsituation\b|\bcircumstances\b",
+     "reason": "Describe the actual hazard"},
+    # Panic words
+    {"type": "Panic language", "pattern": r"\bcatastroph\w*|\bapocalyp\w*|\bdoom\w*",
+     "reason": "Alarming wording can cause panic; use calm, factual terms"},
+    {"type": "Panic language", "pattern": r"\bterror\b|\bhorrific\b|\bdeadly\b|\bmassive\b",
+     "reason": "Alarming wording can cause panic; use calm, factual terms"},
+    {"type": "Panic language", "pattern": r"\bflee\b|\brun for your li(?:fe|ves)\b",
+     "reason": "Replace with a specific, orderly instruction"},
+    # Alert-type markers (Hawaii 2018 false missile alert)
+    {"type": "Alert type", "pattern": r"\bnot an? (?:drill|test|exercise)\b",
+     "reason": "'NOT A DRILL' wording is not a standard alert format; confirm the alert is real",
+     "tag": "real_marker"},
+    {"type": "Test marker", "pattern": r"\bthis is (?:only )?an? (?:test|drill|exercise)\b|\btest (?:alert|message)\b",
+     "reason": "Message is marked as a test", "tag": "test_marker", "report": False},
+    {"type": "Urgent action", "pattern": r"\bevacuate\b|\bseek (?:immediate )?shelter\b|\bmissile\b|\btake cover\b",
+     "reason": "Urgent protective action", "tag": "urgent_action", "report": False},
+]
+
+# Pairs of tags that must not appear in the same message
+DEFAULT_CONTRADICTIONS = [
+    ("test_marker", "urgent_action",
+     "TEST tag combined with an urgent action; either mark as TEST or remove the TEST tag"),
+    ("test_marker", "real_marker",
+     "Message is marked both as a test and as real"),
+]
+
+
+class ConfusionPatternIndex:
+    """All confusion patterns compiled into one indexed alternation"""
+
+    def __init__(self, rules: Optional[list[dict]] = None,
+                 contradictions: Optional[list[tuple]] = None):
+        """Compile rules into a single case-insensitive pattern"""
+        self.rules = list(rules if rules is not None else DEFAULT_CONFUSION_RULES)
+        self.contradictions = list(
+            contradictions if contradictions is not None else DEFAULT_CONTRADICTIONS
+        )
+        self._combined = re.compile(
+            "|".join(f"(?P<r{i}>{rule['pattern']})" for i, rule in enumerate(self.rules)),
+            re.IGNORECASE,
+        )
+        # lastgroup name -> rule, resolved once instead of parsing the group name per match
+        self._rule_by_group = {f"r{i}": rule for i, rule in enumerate(self.rules)}
+
+    def find_spans(self, text: str) -> list[dict]:
+        """Return typed issue spans ({type, text, reason, start, end}) in one pass"""
+        spans = []
+        tagged: dict[str, list[dict]] = {}
+        for match in self._combined.finditer(text):
+            rule = self._rule_by_group[match.lastgroup]
+            span = {
+                "type": rule["type"],
+                "text": match.group(),
+                "reason": rule["reason"],
+                "start": match.start(),
+                "end": match.end(),
+            }
+            if rule.get("tag"):
+                tagged.setdefault(rule["tag"], []).append(span)
+            if rule.get("report", True):
+                spans.append(span)
+
+        for tag_a, tag_b, reason in self.contradictions:
+            if tag_a in tagged and tag_b in tagged:
+                first, second = tagged[tag_a][0], tagged[tag_b][0]
+                start, end = min(first["start"], second["start"]), max(first["end"], second["end"])
+                spans.append({
+                    "type": "Contradiction",
+                    "text": f"{first['text']} / {second['text']}",
+                    "reason": reason,
+                    "start": start,
+                    "end": end,
+                })
+        return spans
+
+    def issue_counts(self, spans: list[dict]) -> dict[str, int]:
+        """Count spans per issue type"""
+        counts: dict[str, int] = {}
+        for span in spans:
+            counts[span["type"]] = counts.get(span["type"], 0) + 1
+        return counts
+
+    def profile(self, messages: Iterable[str], repeat: int = 20) -> dict:
+        """Time each pattern on its own over a corpus and report the costliest first"""
+        messages = list(messages)
+        compiled = [re.compile(rule["pattern"], re.IGNORECASE) for rule in self.rules]
+
+        per_rule = []
+        for rule, pattern in zip(self.rules, compiled):
+            matches = 0
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for text in messages:
+                    for _ in pattern.finditer(text):
+                        matches += 1
+            elapsed = time.perf_counter() - start
+            per_rule.append({
+                "type": rule["type"],
+                "pattern": rule["pattern"],
+                "seconds": elapsed,
+                "matches": matches // max(repeat, 1),
+            })
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in messages:
+                self.find_spans(text)
+        combined_seconds = time.perf_counter() - start
+
+        separate_seconds = sum(row["seconds"] for row in per_rule) or 1e-12
+        for row in per_rule:
+            row["share"] = round(row["seconds"] / separate_seconds, 4)
+        per_rule.sort(key=lambda row: row["seconds"], reverse=True)
+
+        runs = max(repeat * len(messages), 1)
+        return {
+            "messages": len(messages),
+            "repeat": repeat,
+            "separate_ms_per_message": round(separate_seconds / runs * 1000, 4),
+            "combined_ms_per_message": round(combined_seconds / runs * 1000, 4),
+            "patterns": per_rule,
+        }
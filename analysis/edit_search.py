@@ -0,0 +1,176 @@
+"""
+Suggested Edit Search
+Generates single local edits (add source, add time, replace flagged wording, split the longest sentence),
+scores them in one concurrent batch and ranks them by actual score change within a latency budget.
+Edits that would need facts only the operator knows are offered as placeholders, never scored or sent
+"""
+
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from analysis.text_preprocessor import prepare
+
+EDIT_SEARCH_BUDGET_MS = float(os.getenv("EDIT_SEARCH_BUDGET_MS", "400"))
+EDIT_SEARCH_WORKERS = 4
+
+# Placeholders the operator must replace; a message containing one cannot be sent
+SOURCE_PLACEHOLDER = "[ENTER AGENCY]"
+TIME_PLACEHOLDER = " In effect until [ENTER TIME]."
+WORDING_PLACEHOLDER = "[ENTER SPECIFIC WORDING]"
+_PLACEHOLDER_RE = re.compile(r"\[ENTER [A-Z ]+\]")
+
+# Automatic replacements for flagged wording: only ones that keep the meaning (no added
+# certainty, urgency, time or instruction). Anything unlisted becomes a placeholder
+REPLACEMENTS = {
+    "circumstances": "conditions", "flee": "evacuate", "massive": "large", "horrific": "serious",
+}
+
+# Where a long sentence is split, preferred first
+_SPLIT_RE = re.compile(r",\s+(?:and|but|so)\s+|\s+(?:because|so that|and then)\s+|;\s+|,\s+")
+
+
+def unfilled_placeholders(text: str) -> list[str]:
+    """Edit-search placeholders still present in a message"""
+    return _PLACEHOLDER_RE.findall(text)
+
+
+def _tidy(text: str) -> str:
+    text = re.sub(r"\s{2,}", " ", text)
+    return re.sub(r"\s+([.,!?;:])", r"\1", text).strip()
+
+
+def _keep_case(original: str, replacement: str) -> str:
+    if original[:1].isupper() and replacement:
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+def _split_longest_sentence(message: str) -> Optional[str]:
+    prepared = prepare(message)
+    if not prepared.sentences:
+        return None
+    start, end = max(prepared.sentences, key=lambda span: span[1] - span[0])
+    sentence = message[start:end]
+    middle = len(sentence) / 2
+    # The break closest to the middle gives two sentences of similar length
+    splits = sorted(_SPLIT_RE.finditer(sentence), key=lambda m: abs(m.start() - middle))
+    for match in splits:
+        head, tail = sentence[:match.start()].rstrip(), sentence[match.end():].lstrip()
+        if len(head.split()) >= 3 and len(tail.split()) >= 3:
+            head = head if head[-1] in ".!?" else head + "."
+            return message[:start] + head + " " + tail[:1].upper() + tail[1:] + message[end:]
+    return None
+
+
+class EditSearch:
+    """Best single edits by measured score delta; candidates with more estimated gain are scored first"""
+
+    def __init__(self, budget_ms: float = EDIT_SEARCH_BUDGET_MS, workers: int = EDIT_SEARCH_WORKERS):
+        self.budget_ms = budget_ms
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="edit-search")
+
+    def candidates(self, message: str, results: dict, overall: Optional[dict] = None) -> list[dict]:
+        """Distinct edited texts, each tagged with the component it targets
+
+        Edits with "needs_input" hold a placeholder instead of an invented fact.
+        """
+        fema = results["fema"]
+        gains = {fix["fix_id"]: fix["estimated_gain"]
+                 for fix in ((overall or {}).get("explanation") or {}).get("fixes", [])}
+        found: list[dict] = []
+
+        def _add(edit_id: str, component: str, description: str, text: Optional[str],
+                 fix_id: Optional[str] = None) -> None:
+            if text:
+                text = _tidy(text)
+                if text != message.strip() and all(c["text"] != text for c in found):
+                    found.append({"id": edit_id, "component": component, "description": description,
+                                  "text": text, "needs_input": bool(unfilled_placeholders(text)),
+                                  "estimated_gain": gains.get(fix_id, 0.0)})
+
+        if not fema.get("source"):
+            _add("add_source", "fema", "Start with the issuing agency",
+                 f"{SOURCE_PLACEHOLDER}: {message.strip()}", "fema_source")
+        if not fema.get("time"):
+            base = message.rstrip()
+            base = base if base[-1:] in ".!?" else base + "."
+            _add("add_time", "fema", "Say how long it is in effect", base + TIME_PLACEHOLDER, "fema_time")
+
+        for index, issue in enumerate(results["confusion"].get("identified_issues", [])):
+            flagged = issue["text"]
+            start, end = issue.get("start"), issue.get("end")
+            if start is None or message[start:end] != flagged:
+                match = re.search(re.escape(flagged), message, re.IGNORECASE)
+                if not match:
+                    continue
+                start, end = match.span()
+            replacement = REPLACEMENTS.get(flagged.lower())
+            if replacement:
+                replacement = _keep_case(flagged, replacement)
+                description = f'Replace "{flagged}" with "{replacement}"'
+            else:
+                replacement, description = WORDING_PLACEHOLDER, f'Replace "{flagged}" with specific wording'
+            _add(f"replace_{index}", "confusion", description,
+                 message[:start] + replacement + message[end:], f"confusion_{index}")
+
+        _add("split_sentence", "readability", "Split the longest sentence in two",
+             _split_longest_sentence(message), "readability_sentence")
+
+        # Score the edits the explanation expects to matter most first, in case the budget runs out
+        found.sort(key=lambda c: -c["estimated_gain"])
+        return found
+
+    def search(self, message: str, results: dict, overall: dict, analyze: Callable[[str], dict],
+               scorer, k: int = 3, budget_ms: Optional[float] = None) -> dict:
+        """Top-k edits by score delta; edits still being scored when the budget ends are dropped
+
+        Placeholder edits are not scored (a placeholder is not what will be sent); they
+        are returned under "placeholders", ranked by the explanation's estimated gain.
+        """
+        started = time.perf_counter()
+        deadline = started + (budget_ms if budget_ms is not None else self.budget_ms) / 1000
+        found = self.candidates(message, results, overall)
+        candidates = [c for c in found if not c["needs_input"]]
+        placeholders = [c for c in found if c["needs_input"]]
+        base_score = overall["overall_score"]
+
+        def _score(candidate: dict) -> dict:
+            edited = scorer.calculate_overall_score(analyze(candidate["text"]))
+            return {
+                **candidate,
+                "score": edited["overall_score"],
+                "delta": round(edited["overall_score"] - base_score, 1),
+                "is_ready_to_send": edited["is_ready_to_send"],
+                "unblocks": edited["is_ready_to_send"] and not overall["is_ready_to_send"],
+            }
+
+        pending = {self._executor.submit(_score, candidate) for candidate in candidates}
+        scored = []
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    scored.append(future.result())
+                except Exception:
+                    continue  # one failing edit should not hide the others
+        for future in pending:
+            future.cancel()
+
+        improving = sorted((edit for edit in scored if edit["delta"] > 0),
+                           key=lambda edit: (not edit["unblocks"], -edit["delta"]))
+        return {
+            "edits": improving[:k],
+            "placeholders": placeholders[:k],
+            "candidates": len(found),
+            "scorable": len(candidates),
+            "evaluated": len(scored),
+
+            "timed_out": bool(pending),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
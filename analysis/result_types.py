@@ -0,0 +1,229 @@
+"""
+Compact Result Types
+__slots__ result objects for analyzer and scorer output that still read like the original dicts
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any
+
+
+class CompactResult(Mapping):
+    """Read-only mapping over __slots__ fields; unknown keys are kept in _extra
+
+    Lists become tuples, nested dicts become compact objects, and fields whose
+    strings repeat across results (issue types, recommendations) are interned.
+    """
+
+    __slots__ = ("_extra",)
+    _fields: tuple[str, ...] = ()
+    _interned: frozenset = frozenset()
+    _nested: dict[str, type] = {}
+
+    def __init__(self, data: Mapping):
+        extra = None
+        for key, value in data.items():
+            if key in self._fields:
+                object.__setattr__(self, key, self._pack(key, value))
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        object.__setattr__(self, "_extra", extra)
+
+    @classmethod
+    def from_value(cls, value: Any) -> Any:
+        """Compact a dict; anything else (already compact, None, error strings) passes through"""
+        return cls(value) if type(value) is dict else value
+
+    def _pack(self, key: str, value: Any) -> Any:
+        nested = self._nested.get(key)
+        if isinstance(value, list):
+            if nested is not None:
+                return tuple(nested.from_value(item) for item in value)
+            if key in self._interned:
+                return tuple(sys.intern(item) if type(item) is str else item for item in value)
+            return tuple(value)
+        if nested is not None:
+            return nested.from_value(value)
+        if key in self._interned and type(value) is str:
+            return sys.intern(value)
+        return value
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self._fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (type(self), (self.to_dict(),))
+
+    def to_dict(self) -> dict:
+        """Plain dict/list copy for JSON, delivery logs and code that mutates results"""
+        return {key: _unpack(value) for key, value in self.items()}
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, CompactResult):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_unpack(item) for item in value]
+    return value
+
+
+class Issue(CompactResult):
+    """One confusion finding"""
+    __slots__ = _fields = ("type", "text", "reason", "start", "end")
+    _interned = frozenset({"type", "reason"})
+
+
+class FEMAResult(CompactResult):
+    """FEMA five-element analysis"""
+    __slots__ = _fields = (
+        "source", "hazard", "location", "time", "instruction",
+        "elements_present", "missing_elements", "compliance_percentage",
+        "matched_phrases", "rule_pack_version",
+    )
+    _interned = frozenset({"elements_present", "missing_elements", "rule_pack_version"})
+
+
+class WEAResult(CompactResult):
+    """WEA character-limit check"""
+    __slots__ = _fields = ("character_count", "compliant_90", "compliant_360", "chars_over_long", "recommendation")
+    _interned = frozenset({"recommendation"})
+
+
+class ReadabilityResult(CompactResult):
+    """Readability metrics"""
+    __slots__ = _fields = (
+        "average_grade_level", "is_compliant", "compliance_score", "flesch_kincaid_grade",
+        "flesch_reading_ease", "gunning_fog_index", "smog_index", "automated_readability_index",
+        "recommendations",
+    )
+    _interned = frozenset({"recommendations", "gunning_fog_index", "smog_index", "automated_readability_index"})
+
+
+class ConfusionResult(CompactResult):
+    """Confusion risk analysis"""
+    __slots__ = _fields = ("risk_score", "compliance_score", "identified_issues", "recommendations")
+    _interned = frozenset({"recommendations"})
+    _nested = {"identified_issues": Issue}
+
+
+class ComponentScores(CompactResult):
+    """Per-component scores behind the overall score"""
+    __slots__ = _fields = ("fema", "wea", "readability", "confusion")
+
+
+class PriorityFix(CompactResult):
+    """One suggested fix"""
+    __slots__ = _fields = ("issue", "impact")
+    _interned = frozenset({"issue", "impact"})
+
+
+class FixExplanation(CompactResult):
+    """One explained fix with its estimated gain"""
+    __slots__ = _fields = ("fix_id", "component", "issue", "impact", "estimated_gain", "span", "text", "unblocks")
+    _interned = frozenset({"fix_id", "component", "impact"})
+
+
+class ScoreExplanation(CompactResult):
+    """score_explanation.explain_score output"""
+    __slots__ = _fields = ("overall_score", "potential_score", "blocking", "fixes")
+    _interned = frozenset({"blocking"})
+    _nested = {"fixes": FixExplanation}
+
+
+class OverallScore(CompactResult):
+    """SafetyScorer.calculate_overall_score output"""
+    __slots__ = _fields = (
+        "overall_score", "safety_level", "component_scores", "is_ready_to_send", "min_threshold",
+        "fema_gate_passed", "min_fema_elements", "priority_fixes", "explanation",
+    )
+    _interned = frozenset({"safety_level"})
+    _nested = {"component_scores": ComponentScores, "priority_fixes": PriorityFix,
+               "explanation": ScoreExplanation}
+
+
+class DeliveryDetail(CompactResult):
+    """One recipient's delivery outcome"""
+    __slots__ = _fields = ("recipient", "status", "error", "ambiguous", "permanent")
+    _interned = frozenset({"status"})
+
+
+class ChannelDelivery(CompactResult):
+    """Per-channel delivery status (SMS or email)"""
+    __slots__ = _fields = ("attempted", "sent", "failed", "details")
+    _nested = {"details": DeliveryDetail}
+
+
+class DeliveryResult(CompactResult):
+    """deliver_message output kept for the confirmation panel"""
+    __slots__ = _fields = (
+        "success", "message", "message_id", "timestamp", "sender", "method", "recipient_count",
+        "sms_delivery_status", "email_delivery_status",
+    )
+    _interned = frozenset({"method"})
+    _nested = {"sms_delivery_status": ChannelDelivery, "email_delivery_status": ChannelDelivery}
+
+
+COMPONENT_TYPES: dict[str, type] = {
+    "fema": FEMAResult,
+    "wea": WEAResult,
+    "readability": ReadabilityResult,
+    "confusion": ConfusionResult,
+}
+
+
+def compact_analysis(results: dict) -> dict:
+    """run_analysis output with each component compacted; the outer dict stays a plain dict"""
+    compact = {}
+    for key, value in results.items():
+        result_type = COMPONENT_TYPES.get(key)
+        if result_type is not None:
+            compact[key] = result_type.from_value(value)
+        elif type(value) is str:
+            compact[key] = sys.intern(value)
+        else:
+            compact[key] = value
+    return compact
+
+
+def expand_analysis(results: dict) -> dict:
+    """Plain-dict copy of (possibly compacted) run_analysis output"""
+    return {key: _unpack(value) for key, value in results.items()}
+
+
+def compact_overall(overall: dict) -> Any:
+    return OverallScore.from_value(overall)
+
+
+def expand_overall(overall: Any) -> Any:
+    """Plain-dict copy of (possibly compacted) scorer output"""
+    return _unpack(overall)
+
+
+def compact_delivery(result: dict) -> Any:
+    return DeliveryResult.from_value(result)
+
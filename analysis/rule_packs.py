@@ -0,0 +1,190 @@
+"""
+Hot-Reloadable Rule Packs
+Loads versioned keyword/pattern packs (JSON or YAML), compiles them into matchers,
+caches the compiled form on disk and swaps it in atomically when the file changes
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from analysis.confusion_index import ConfusionPatternIndex
+
+FEMA_ELEMENTS = ("source", "hazard", "location", "time", "instruction")
+
+# Bump when the cached payload layout changes so stale caches are ignored
+CACHE_FORMAT = 1
+
+
+def _keyword_pattern(keywords: list[str]) -> str:
+    """Build one alternation from plain keywords and "re:"-prefixed raw patterns"""
+    literals, raw = [], []
+    for keyword in keywords:
+        if keyword.startswith("re:"):
+            raw.append(keyword[3:])
+        else:
+            literals.append(r"\s+".join(re.escape(part) for part in keyword.split()))
+    # Longest first so "seek shelter" wins over "shelter"
+    literals.sort(key=len, reverse=True)
+    parts = [rf"\b(?:{'|'.join(literals)})\b"] if literals else []
+    return "|".join(parts + raw)
+
+
+def _read_source(path: Path) -> dict:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("PyYAML is required for YAML rule packs; install with: pip install pyyaml")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+class CompiledRulePack:
+    """Compiled matchers for one version of a rule pack"""
+
+    def __init__(self, payload: dict):
+        """Compile a payload produced by build_payload()"""
+        self.name = payload["name"]
+        self.version = payload["version"]
+        self.language = payload["language"]
+        self.source_sha = payload["source_sha"]
+        self.fema_patterns = {
+            element: re.compile(pattern, re.IGNORECASE) if pattern else None
+            for element, pattern in payload["fema"].items()
+        }
+        self.confusion = ConfusionPatternIndex(
+            rules=payload["confusion_rules"],
+            contradictions=[tuple(item) for item in payload["contradictions"]],
+        )
+
+    def match_fema(self, text: str) -> dict[str, Optional[str]]:
+        """First matched phrase per FEMA element (None when the element is missing)"""
+        found = {}
+        for element in FEMA_ELEMENTS:
+            pattern = self.fema_patterns.get(element)
+            match = pattern.search(text) if pattern else None
+            found[element] = match.group() if match else None
+        return found
+
+    def fema_result(self, text: str) -> dict:
+        """FEMA element result in the same shape FEMAAnalyzer.analyze() returns"""
+        matches = self.match_fema(text)
+        present = [element for element in FEMA_ELEMENTS if matches[element]]
+        result = {element: matches[element] is not None for element in FEMA_ELEMENTS}
+        result.update({
+            "elements_present": len(present),
+            "missing_elements": [e.title() for e in FEMA_ELEMENTS if e not in present],
+            "compliance_percentage": round(len(present) / len(FEMA_ELEMENTS) * 100, 1),
+            "matched_phrases": {e: m for e, m in matches.items() if m},
+            "rule_pack_version": self.version,
+        })
+        return result
+
+    def find_spans(self, text: str) -> list[dict]:
+        """Typed confusion spans from the pack's confusion rules"""
+        return self.confusion.find_spans(text)
+
+
+def build_payload(source: dict, source_sha: str) -> dict:
+    """Normalize a parsed rule-pack file into the cacheable payload"""
+    fema = source.get("fema", {})
+    confusion = source.get("confusion", {})
+    return {
+        "format": CACHE_FORMAT,
+        "name": source.get("name", source.get("language", "default")),
+        "version": str(source["version"]),
+        "language": source.get("language", "en"),
+        "source_sha": source_sha,
+        "fema": {element: _keyword_pattern(fema.get(element, [])) for element in FEMA_ELEMENTS},
+        "confusion_rules": confusion.get("rules", []),
+        "contradictions": confusion.get("contradictions", []),
+    }
+
+
+def load_rule_pack(path: str, cache_dir: Optional[str] = ".rule_cache") -> CompiledRulePack:
+    """Load a rule pack, reusing the on-disk binary cache when the source is unchanged"""
+    path = Path(path)
+    raw = path.read_bytes()
+    source_sha = hashlib.sha256(raw).hexdigest()
+
+    cache_file = Path(cache_dir) / f"{path.stem}.pickle" if cache_dir else None
+    if cache_file and cache_file.exists():
+        try:
+            with open(cache_file, "rb") as handle:
+                payload = pickle.load(handle)
+            if payload.get("format") == CACHE_FORMAT and payload.get("source_sha") == source_sha:
+                return CompiledRulePack(payload)
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            pass
+
+    payload = build_payload(_read_source(path), source_sha)
+    pack = CompiledRulePack(payload)
+
+    if cache_file:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as handle:
+            pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    return pack
+
+
+class RulePackManager:
+    """Holds the active rule pack and hot-swaps it when the source file changes"""
+
+    def __init__(self, path: str, cache_dir: Optional[str] = ".rule_cache",
+                 check_interval: float = 2.0):
+        """Load the pack once; later changes are picked up by `current`"""
+        self.path = Path(path)
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._pack = load_rule_pack(self.path, cache_dir)
+        self._mtime = self.path.stat().st_mtime_ns
+        self._last_check = time.monotonic()
+
+    @property
+    def current(self) -> CompiledRulePack:
+        """Active pack, reloaded if the file changed since the last check"""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self.reload_if_changed()
+        return self._pack
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+    def reload_if_changed(self) -> bool:
+        """Recompile and swap the pack if the file changed; keep the old pack on errors"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            try:
+                pack = load_rule_pack(self.path, self.cache_dir)
+            except Exception as e:
+                self.last_error = f"Rule pack reload failed: {e}"
+                return False
+            # Single reference assignment: readers see either the old or the new pack
+            self._pack = pack
+            self._mtime = mtime
+            self.last_error = None
+            return True
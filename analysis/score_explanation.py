@@ -0,0 +1,137 @@
+"""
+Score Explanation
+Turns analyzer results and the overall score into ranked fixes with impact, estimated gain and text span,
+computed once per scored message and reused by every renderer
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from analysis.text_preprocessor import prepare
+
+# Score Breakdown weights shown in the app (FEMA 40 / WEA 20 / Readability 20 / Clarity 20)
+COMPONENT_WEIGHTS = {"fema": 0.40, "wea": 0.20, "readability": 0.20, "confusion": 0.20}
+
+FEMA_ELEMENTS = ("source", "hazard", "location", "time", "instruction")
+WEA_LONG_LIMIT = 360
+
+# Estimated gain (overall points) at or above which a fix is labelled high / medium impact
+HIGH_IMPACT_GAIN = 8.0
+MEDIUM_IMPACT_GAIN = 3.0
+
+EXPLANATION_CACHE_SIZE = 256
+
+_FEMA_FIXES = {
+    "source": "Name the issuing agency",
+    "hazard": "State the hazard",
+    "location": "Say where the threat is",
+    "time": "Say when it starts or how long it lasts",
+    "instruction": "Tell people what to do",
+}
+
+
+def _impact(gain: float, unblocks: bool) -> str:
+    if unblocks or gain >= HIGH_IMPACT_GAIN:
+        return "high"
+    return "medium" if gain >= MEDIUM_IMPACT_GAIN else "low"
+
+
+def _longest_sentence(message: str) -> Optional[tuple[int, int]]:
+    sentences = prepare(message).sentences
+    return max(sentences, key=lambda span: span[1] - span[0]) if sentences else None
+
+
+def explain_score(message: str, results: dict, overall: dict,
+                  weights: Optional[dict] = None) -> dict:
+    """Ranked fixes with estimated overall-score gain; gate-unblocking fixes come first
+
+    A gain is the component's headroom times its weight, shared among the fixes
+    that address that component, so gains from different components add up.
+    """
+    weights = weights or COMPONENT_WEIGHTS
+    comp = overall["component_scores"]
+    fixes = []
+
+    def _add(fix_id: str, component: str, issue: str, gain: float,
+             span: Optional[tuple[int, int]] = None, unblocks: bool = False) -> None:
+        gain = round(max(gain, 0.0), 1)
+        fixes.append({
+            "fix_id": fix_id,
+            "component": component,
+            "issue": issue,
+            "impact": _impact(gain, unblocks),
+            "estimated_gain": gain,
+            "span": list(span) if span else None,
+            "text": message[span[0]:span[1]] if span else None,
+            "unblocks": unblocks,
+        })
+
+    fema = results["fema"]
+    missing = [element for element in FEMA_ELEMENTS if not fema.get(element)]
+    gate_short = 0 if overall.get("fema_gate_passed", True) else (
+        overall.get("min_fema_elements", len(FEMA_ELEMENTS)) - fema.get("elements_present", 0)
+    )
+    for element in missing:
+        _add(f"fema_{element}", "fema", _FEMA_FIXES[element],
+             weights["fema"] * 100 / len(FEMA_ELEMENTS),
+             unblocks=gate_short == 1)
+
+    wea = results["wea"]
+    if not wea.get("compliant_360", True):
+        characters = wea.get("character_count", len(message))
+        _add("wea_length", "wea",
+             f"Cut {wea.get('chars_over_long', characters - WEA_LONG_LIMIT)} characters to fit {WEA_LONG_LIMIT}",
+             weights["wea"] * (100 - comp["wea"]), span=(WEA_LONG_LIMIT, len(message)))
+
+    readability = results["readability"]
+    if not readability.get("is_compliant", True):
+        span = _longest_sentence(message)
+        _add("readability_sentence", "readability",
+             f"Simplify to grade 6 (now grade {readability.get('average_grade_level')}); "
+             "start with the longest sentence",
+             weights["readability"] * (100 - comp["readability"]), span=span)
+
+    issues = results["confusion"].get("identified_issues", [])
+    for index, issue in enumerate(issues):
+        span = (issue["start"], issue["end"]) if issue.get("start") is not None and issue.get("end") else None
+        _add(f"confusion_{index}", "confusion",
+             f"Replace \"{issue['text']}\": {issue['reason']}",
+             weights["confusion"] * (100 - comp["confusion"]) / len(issues), span=span)
+
+    fixes.sort(key=lambda fix: (not fix["unblocks"], -fix["estimated_gain"]))
+    score = overall["overall_score"]
+    return {
+        "overall_score": score,
+        "potential_score": round(min(100.0, score + sum(fix["estimated_gain"] for fix in fixes)), 1),
+        "blocking": [fix["fix_id"] for fix in fixes if fix["unblocks"]],
+        "fixes": fixes,
+    }
+
+
+class ScoreExplainer:
+    """explain_score() memoized per message digest, rule pack and score"""
+
+    def __init__(self, weights: Optional[dict] = None, cache_size: int = EXPLANATION_CACHE_SIZE):
+        self.weights = weights or COMPONENT_WEIGHTS
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = Lock()
+
+    def explain(self, message: str, results: dict, overall: dict) -> dict:
+        key = (prepare(message).digest, results.get("rule_pack_version"), overall["overall_score"])
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        explanation = explain_score(message, results, overall, self.weights)
+        with self._lock:
+            self._cache[key] = explanation
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return explanation
+
+    def attach(self, message: str, results: dict, overall: dict) -> dict:
+        """Overall score with its explanation stored alongside, cached with it"""
+        overall["explanation"] = self.explain(message, results, overall)
+        return overall
@@ -0,0 +1,130 @@
+"""
+Shared Text Preprocessing
+Tokenizes a message once (tokens, offsets, sentence spans, digest) and shares the result with every analyzer
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Union
+
+PREPARED_CACHE_SIZE = 256
+
+# Letters and digits (any script), keeping in-word apostrophes: "don't", "o'clock"
+_TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+# Closing punctuation (with any closing quotes), or just before Spanish opening marks
+_CLOSING_QUOTES = "\"')]”’"
+_SENTENCE_END_RE = re.compile(r"[.!?]+[\"')\]”’]*|(?=[¡¿])")
+# The word (or dotted initialism: "p.m", "U.S") right before a period
+_WORD_BEFORE_RE = re.compile(r"(?<![\w.])(?:[^\W\d_]+\.)*[^\W\d_]+$")
+# Titles and place prefixes are followed by a name, never a new sentence: "Dr. Lee", "Mt. Hood"
+_PREFIX_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "mt", "ft", "gov", "sen", "rep", "gen", "lt", "sgt", "capt",
+    "e.g", "i.e", "vs", "approx",
+})
+# These end a sentence only before a capitalized word: "until 6 p.m. Move inland" vs "6 p.m. tonight"
+_CLOSING_ABBREVIATIONS = frozenset({"ave", "rd", "blvd", "hwy", "ln", "etc", "inc", "co"})
+
+
+class PreparedText(str):
+    """A message string that also carries its tokens and sentence spans
+
+    Being a str, it can be handed to any analyzer unchanged; analyzers that
+    know about it read the precomputed fields instead of re-scanning.
+    """
+
+    def __new__(cls, text: str):
+        self = super().__new__(cls, text)
+        matches = list(_TOKEN_RE.finditer(text))
+        # Lower-cased per token so offsets always index the original text
+        self.tokens = tuple(m.group().lower() for m in matches)
+        self.offsets = tuple(m.span() for m in matches)
+        self.sentences = _sentence_spans(text)
+        self.digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        return self
+
+    @property
+    def words(self) -> list[str]:
+        """Tokens that contain at least one letter (numbers and times excluded)"""
+        return [token for token in self.tokens if not token.isdigit()]
+
+    @property
+    def word_count(self) -> int:
+        return len(self.words)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentences)
+
+    def token_at(self, index: int) -> str:
+        """Original-case text of token `index`"""
+        start, end = self.offsets[index]
+        return str.__getitem__(self, slice(start, end))
+
+    def sentence_texts(self) -> list[str]:
+        return [str.__getitem__(self, slice(start, end)) for start, end in self.sentences]
+
+
+def _ends_sentence(text: str, match: re.Match) -> bool:
+    """False for periods inside numbers, domains and abbreviations"""
+    if match.group().rstrip(_CLOSING_QUOTES) != ".":
+        return True
+    following = text[match.end():match.end() + 1]
+    if following and not following.isspace():
+        return False  # "2.5", "weather.gov", the inner dot of "p.m."
+
+    found = _WORD_BEFORE_RE.search(text, max(0, match.start() - 40), match.start())
+
+    if found is None:
+        return True
+    word = found.group().lower()
+    if word == "st":
+        # "Main St." / "5th St." is a street and can close a sentence; "on St. Mary's" cannot
+        previous = text[:found.start()].split()[-1:]
+        if not previous or not (previous[0][0].isupper() or previous[0][0].isdigit()):
+            return False
+        closing = True
+    elif word in _PREFIX_ABBREVIATIONS or (found.group().isupper() and "." in word):
+        return False  # titles and uppercase initialisms ("U.S.") lead into a name
+    else:
+        closing = "." in word or word in _CLOSING_ABBREVIATIONS
+    if closing:
+        rest = text[match.end():].lstrip()
+        return not rest or rest[0].isupper()
+    return True
+
+
+
+def _sentence_spans(text: str) -> tuple[tuple[int, int], ...]:
+    spans = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if not _ends_sentence(text, match):
+            continue
+        if text[start:match.start()].strip():
+
+            spans.append(_strip_span(text, start, match.end()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append(_strip_span(text, start, len(text)))
+    return tuple(spans)
+
+
+def _strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+@lru_cache(maxsize=PREPARED_CACHE_SIZE)
+def _prepare_cached(text: str) -> PreparedText:
+    return PreparedText(text)
+
+
+def prepare(text: Union[str, PreparedText]) -> PreparedText:
+    """PreparedText for `text`, reused across reruns and analyzers for the same message"""
+    if isinstance(text, PreparedText):
+        return text
+    return _prepare_cached(str(text))
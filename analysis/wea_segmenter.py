@@ -0,0 +1,126 @@
+"""
+WEA Segmentation
+Splits an over-long alert into the fewest WEA-compliant segments at sentence boundaries
+and scores the whole sequence in one batch
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from analysis.text_preprocessor import prepare
+
+WEA_LONG_LIMIT = 360
+
+
+def _counter(index: int, total: int) -> str:
+    return f"({index}/{total}) "
+
+
+class WEASegmenter:
+    """Greedy in-order packing of sentences, which gives the fewest contiguous segments"""
+
+    def __init__(self, limit: int = WEA_LONG_LIMIT):
+        self.limit = limit
+
+    @staticmethod
+    def header_for(message: str, fema_matches: dict) -> str:
+        """Source and hazard phrases repeated at the top of every continuation segment"""
+        parts = [fema_matches.get("source"), fema_matches.get("hazard")]
+        return " - ".join(p.strip() for p in parts if p)
+
+    def _pieces(self, message: str, capacity: int) -> list[str]:
+        """Sentences, with any sentence longer than capacity broken at word boundaries"""
+        pieces = []
+        for sentence in prepare(message).sentence_texts():
+            if len(sentence) <= capacity:
+                pieces.append(sentence)
+                continue
+            line = ""
+            for word in sentence.split():
+                while len(word) > capacity:
+                    if line:
+                        pieces.append(line)
+                        line = ""
+                    pieces.append(word[:capacity])
+                    word = word[capacity:]
+                candidate = f"{line} {word}" if line else word
+                if len(candidate) <= capacity:
+                    line = candidate
+                else:
+                    pieces.append(line)
+                    line = word
+            if line:
+                pieces.append(line)
+        return pieces
+
+    def _pack(self, message: str, header: str, total: int) -> list[str]:
+        """Pack pieces assuming `total` segments (counter width depends on it)"""
+        counter_width = len(_counter(total, total))
+        first_capacity = self.limit - counter_width
+        # Continuations carry "header: " unless the header is empty
+        prefix = f"{header}: " if header else ""
+        if len(prefix) > self.limit // 3:
+            prefix = ""
+        next_capacity = self.limit - counter_width - len(prefix)
+        pieces = self._pieces(message, min(first_capacity, next_capacity))
+
+        segments: list[str] = []
+        current = ""
+        for piece in pieces:
+            capacity = first_capacity if not segments else next_capacity
+            candidate = f"{current} {piece}" if current else piece
+            if len(candidate) <= capacity:
+                current = candidate
+            else:
+                segments.append(current)
+                current = piece
+        if current:
+            segments.append(current)
+        return [segments[0]] + [prefix + body for body in segments[1:]] if segments else []
+
+    def split(self, message: str, fema_matches: Optional[dict] = None) -> list[str]:
+        """Ordered, numbered segments, each at most `limit` characters"""
+        message = message.strip()
+        if len(message) <= self.limit:
+            return [message] if message else []
+
+        header = self.header_for(message, fema_matches or {})
+        total = 2
+        while True:
+            bodies = self._pack(message, header, total)
+            # The counter widens at 10 and 100 segments; repack once it settles
+            if len(_counter(len(bodies), len(bodies))) == len(_counter(total, total)):
+                break
+            total = len(bodies)
+        return [f"{_counter(i, len(bodies))}{body}" for i, body in enumerate(bodies, 1)]
+
+    def plan(self, message: str, rules, analyze: Callable[[str], dict], scorer) -> dict:
+        """Split with the rule pack's source/hazard header and score every segment in one batch"""
+        segments = self.split(message, rules.current.match_fema(message))
+        return {
+            "segments": score_segments(segments, analyze, scorer),
+            "count": len(segments),
+            "original_characters": len(message),
+        }
+
+
+def score_segments(segments: list[str], analyze: Callable[[str], dict], scorer) -> list[dict]:
+    """Analyze and score all segments concurrently; results keep segment order"""
+    def _score(text: str) -> dict:
+        results = analyze(text)
+        overall = scorer.calculate_overall_score(results)
+        return {
+            "text": text,
+            "characters": len(text),
+            "overall_score": overall["overall_score"],
+            "is_ready_to_send": overall["is_ready_to_send"],
+            "missing_elements": list(results["fema"].get("missing_elements", [])),
+        }
+
+    if not segments:
+        return []
+    with ThreadPoolExecutor(max_workers=min(4, len(segments)), thread_name_prefix="segment") as pool:
+        scored = list(pool.map(_score, segments))
+    for index, segment in enumerate(scored, 1):
+        segment["index"] = index
+    return scored
@@ -3,20 +3,48 @@ AI Message Compliance & Safety Checker
 MVP Application using Streamlit
 """
 
+import html
 import re
 import streamlit as st
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from analysis.fema_analyzer import FEMAAnalyzer
-from analysis.wea_analyzer import WEAAnalyzer
-from analysis.readability_analyzer import ReadabilityAnalyzer
-from analysis.confusion_detector import ConfusionDetector
-from utils.safety_scorer import SafetyScorer
+from analysis.language_router import (
+    LANGUAGE_NAMES, analysis_version, analyze_pair, build_analyzers, detect_language, select_analyzers
+)
+from analysis.result_types import (
+    compact_analysis, compact_delivery, compact_overall, expand_analysis, expand_overall
+)
+from analysis.alert_type_classifier import AlertTypeClassifier
+from analysis.text_preprocessor import prepare
+from analysis.wea_segmenter import WEASegmenter
+from analysis.score_explanation import ScoreExplainer
+from analysis.edit_search import EditSearch, unfilled_placeholders
 from utils.message_delivery import MessageDeliverySystem
 from utils.email_service import EmailService
+from utils.background_analysis import BackgroundAnalyzer
+from utils.near_duplicate_index import NearDuplicateIndex
+from utils.template_library import TemplateLibrary
+from utils.send_ledger import SendLedger, alert_key, channel_recipients, mark_send_used, send_nonce
+from utils.retry_scheduler import RetryScheduler
+from utils.sms_encoding import estimate_cost, measure
+from utils.throughput_estimator import ThroughputEstimator
+from utils.geo_index import GeoIndex
+from utils.audit_log import AuditLog
+from utils.history_index import HistoryIndex
 
 load_dotenv()
 
+RULE_PACK_PATH = os.getenv("RULE_PACK_PATH", "rules/en.json")
+SPANISH_RULE_PACK_PATH = os.getenv("SPANISH_RULE_PACK_PATH", "rules/es.json")
+TEMPLATE_LIBRARY_PATH = os.getenv("TEMPLATE_LIBRARY_PATH", "templates/library.json")
+
+# How long a rerun waits for fresh results before rendering the last completed ones
+ANALYSIS_WAIT_SECONDS = 0.15
+# The Send step waits this long per script run, then reruns so a newer edit can take over
+SEND_WAIT_SECONDS = 2.0
+
 # --- Page Config: wide layout, sidebar always open ---
 st.set_page_config(
     page_title="Emergency Alert Safety Checker",
@@ -141,14 +169,25 @@ def validate_phones(raw_lines: list[str]) -> tuple[list[str], list[str]]:
 # --- Cached init ---
 @st.cache_resource
 def initialize_analyzers():
-    return {
-        "fema": FEMAAnalyzer(),
-        "wea": WEAAnalyzer(),
-        "readability": ReadabilityAnalyzer(),
-        "confusion": ConfusionDetector(),
-        "scorer": SafetyScorer(),
-        "delivery": MessageDeliverySystem()
-    }
+    analyzers = build_analyzers(RULE_PACK_PATH, SPANISH_RULE_PACK_PATH)
+    analyzers.update({
+        "delivery": MessageDeliverySystem(),
+        "alert_types": AlertTypeClassifier(),
+        "segmenter": WEASegmenter(),
+        "dedupe": NearDuplicateIndex(),
+        "templates": TemplateLibrary(TEMPLATE_LIBRARY_PATH),
+        "ledger": SendLedger(),
+        "retries": RetryScheduler(),
+        "throughput": ThroughputEstimator(),
+        "geo": GeoIndex(),
+        "audit": AuditLog(),
+        "history": HistoryIndex(),
+        "explainer": ScoreExplainer(),
+        "edits": EditSearch()
+    })
+    # Snapshots are built and saved once per template/analyzer version here, not in a user's click
+    analyzers["templates"].precompute(lambda text: run_analysis(text, analyzers), analyzers)
+    return analyzers
 
 
 def get_ai_analyzer():
@@ -163,14 +202,54 @@ def get_ai_analyzer():
 
 
 def run_analysis(message: str, analyzers: dict) -> dict:
+    # Tokenized once here; every analyzer below receives the same PreparedText
+    message = prepare(message)
+
+    # Filled-in library templates were assembled from their precomputed snapshot
+    from_template = analyzers["templates"].cached_analysis(message)
+    if from_template:
+        return from_template
+
+    language = detect_language(message)
+    routed = select_analyzers(language, analyzers)
+
+    # Resent alerts reuse the stored analysis if the same analyzers (and rule pack) produced it
+    version = analysis_version(routed)
+    prior = analyzers["dedupe"].lookup(message)
+    if (prior and prior.exact and prior.analysis
+            and prior.analysis.get("rule_pack_version") == version):
+        return expand_analysis(prior.analysis)
+
     return {
-        "fema": analyzers["fema"].analyze(message),
-        "wea": analyzers["wea"].analyze(message),
-        "readability": analyzers["readability"].analyze(message),
-        "confusion": analyzers["confusion"].analyze(message)
+        "fema": routed["fema"].analyze(message),
+        "wea": routed["wea"].analyze(message),
+        "readability": routed["readability"].analyze(message),
+        "confusion": routed["confusion"].analyze(message),
+        "alert_type": analyzers["alert_types"].classify(message),
+        "language": language,
+        "rule_pack_version": version
     }
 
 
+@st.cache_resource
+def get_analysis_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="analysis")
+
+
+def get_background_analyzer(analyzers: dict) -> BackgroundAnalyzer:
+    if "background_analyzer" not in st.session_state:
+        def _analyze(text: str) -> tuple[dict, dict]:
+            results = run_analysis(text, analyzers)
+            overall = analyzers["scorer"].calculate_overall_score(results)
+            # Explained once here and cached with the result; renderers only read it.
+            # Snapshots live in session state, so they are kept compact
+            overall = analyzers["explainer"].attach(text, results, overall)
+            return compact_analysis(results), compact_overall(overall)
+
+        st.session_state.background_analyzer = BackgroundAnalyzer(_analyze, get_analysis_executor())
+    return st.session_state.background_analyzer
+
+
 # --- UI helpers ---
 def _score_css(score: float) -> str:
     if score >= 80:
@@ -197,6 +276,7 @@ def _fema_pill(present: bool, name: str) -> str:
 # ====================================================
 def main():
     analyzers = initialize_analyzers()
+    background = get_background_analyzer(analyzers)
 
     # ================================================
     # SIDEBAR — Settings (always visible)
@@ -233,14 +313,21 @@ def main():
 
         # Delivery history
         st.markdown("**Delivery History**")
-        delivery_system = analyzers["delivery"]
-        total_delivered = delivery_system.get_total_messages_delivered()
+        # Served from the mapped index; only log files added since the last rerun are parsed
+        history_index = analyzers["history"]
+        history_index.refresh()
+        total_delivered = history_index.total_delivered()
         st.metric("Messages Sent", total_delivered)
         if total_delivered > 0:
             with st.expander("View history"):
-                history = delivery_system.get_delivery_history(10)
+                history = history_index.latest(10)
                 for msg in history:
                     st.caption(f"{msg['message_id'][:18]}... — Score {msg['safety_score']}/100")
+                if st.checkbox("Show full records", key="history_details"):
+                    for msg in history:
+                        record = history_index.record(msg)
+                        if record:
+                            st.json(record, expanded=False)
 
         st.divider()
 
@@ -263,7 +350,9 @@ def main():
 
     # Callbacks
     def _clear_form():
+        background.reset()
         st.session_state.message_input = ""
+        st.session_state.secondary_input = ""
         st.session_state.message_sent = False
         st.session_state.last_sent_message = ""
         st.session_state.sent_message_id = None
@@ -275,6 +364,14 @@ def main():
             st.session_state.message_input = text
             st.session_state.message_sent = False
 
+    def _load_template(template_id: str, slots: list[str]):
+        values = {slot: st.session_state.get(f"slot_{template_id}_{slot}", "") for slot in slots}
+        text, _ = analyzers["templates"].fill(
+            template_id, values, analyzers, lambda t: run_analysis(t, analyzers)
+        )
+        st.session_state.message_input = text
+        st.session_state.message_sent = False
+
     # --- Two-column layout: left = input, right = results ---
     col_input, col_results = st.columns([1, 1], gap="large")
 
@@ -291,27 +388,51 @@ def main():
             key="message_input"
         )
 
+        # Analysis runs on a worker thread; render whatever finished last
+        snapshot = None
+        if message:
+            background.submit(message)
+            background.wait(ANALYSIS_WAIT_SECONDS)
+            snapshot = background.latest()
+
         # Character counter + FEMA pills inline under the text area
         if message:
             char_count = len(message)
             if char_count <= 90:
-                cc_html = f'<div class="char-counter"><span class="ok">{char_count}/90</span> chars — fits standard WEA</div>'
+                cc_html = f'<span class="ok">{char_count}/90</span> chars — fits standard WEA'
             elif char_count <= 360:
-                cc_html = f'<div class="char-counter">{char_count}/360 chars — extended WEA</div>'
+                cc_html = f'{char_count}/360 chars — extended WEA'
             else:
                 over = char_count - 360
-                cc_html = f'<div class="char-counter"><span class="over">{char_count} chars — {over} over 360 limit</span></div>'
-            st.markdown(cc_html, unsafe_allow_html=True)
+                cc_html = f'<span class="over">{char_count} chars — {over} over 360 limit</span>'
+            # SMS cost depends on encoding: one non-GSM character drops segments from 160 to 70 chars
+            sms = measure(message)
+            cc_html += f' · {sms.segments} SMS segment{"s" if sms.segments != 1 else ""} ({sms.encoding})'
+            if sms.non_gsm_chars:
+                cc_html += f' <span class="over">— {html.escape(" ".join(sms.non_gsm_chars))} forces UCS-2</span>'
+            st.markdown(f'<div class="char-counter">{cc_html}</div>', unsafe_allow_html=True)
 
             # Live FEMA indicators
-            quick_fema = analyzers["fema"].analyze(message)
-            pills = " ".join(
-                _fema_pill(quick_fema[key], label)
-                for key, label in [("source", "Source"), ("hazard", "Hazard"),
-                                   ("location", "Location"), ("time", "Time"),
-                                   ("instruction", "Instruction")]
-            )
-            st.markdown(pills, unsafe_allow_html=True)
+            if snapshot:
+                quick_fema = snapshot.analysis_results["fema"]
+                pills = " ".join(
+                    _fema_pill(quick_fema[key], label)
+                    for key, label in [("source", "Source"), ("hazard", "Hazard"),
+                                       ("location", "Location"), ("time", "Time"),
+                                       ("instruction", "Instruction")]
+                )
+                st.markdown(pills, unsafe_allow_html=True)
+
+        # Optional second-language version, sent with the primary and gated as one unit
+        with st.expander("Second language (optional)"):
+            secondary = st.text_area(
+                "Second-language message",
+                height=100,
+                placeholder="e.g. 'Ciudad de Honolulu: Alerta de tsunami para Waikiki hasta las 6 PM. Suba a terreno alto ahora.'",
+                label_visibility="collapsed",
+                key="secondary_input"
+            ).strip()
+        outgoing = f"{message}\n\n{secondary}" if message and secondary else message
 
         # Buttons row: Example selector | Load | Clear
         b1, b2, b3 = st.columns([3, 1, 1])
@@ -327,8 +448,34 @@ def main():
         with b3:
             st.button("Clear", on_click=_clear_form, use_container_width=True)
 
+        # Pre-approved agency templates: fill the slots; readability comes from the saved snapshot
+        # unless the filled text differs in shape from the sample
+        library = analyzers["templates"]
+        if library.templates:
+            with st.expander("Agency templates"):
+                template_id = st.selectbox(
+                    "Template",
+                    options=library.ids(),
+                    format_func=lambda t: library.get(t).name,
+                    key="template_selector",
+                )
+                template = library.get(template_id)
+                st.caption(template.text)
+                for slot in template.slots:
+                    st.text_input(
+                        slot.replace("_", " ").title(),
+                        key=f"slot_{template_id}_{slot}",
+                        placeholder=template.sample.get(slot, ""),
+                    )
+                st.button(
+                    "Use Template",
+                    on_click=_load_template,
+                    args=(template_id, template.slots),
+                    use_container_width=True,
+                )
+
     # Reset sent flag when message changes
-    if message != st.session_state.get("last_sent_message", "") and st.session_state.get("message_sent"):
+    if outgoing != st.session_state.get("last_sent_message", "") and st.session_state.get("message_sent"):
         st.session_state.message_sent = False
         st.session_state.sent_message_id = None
 
@@ -338,13 +485,33 @@ def main():
             st.markdown('<div class="step-label">Step 2</div>', unsafe_allow_html=True)
             st.markdown("**Compliance Review**")
             st.info("Enter a message or load an example to see compliance results.")
+        elif snapshot is None:
+            st.markdown('<div class="step-label">Step 2</div>', unsafe_allow_html=True)
+            st.markdown("**Compliance Review**")
+            if background.failed(message):
+                st.error(f"Analysis failed: {background.last_error}")
+            else:
+                st.info("Analyzing...")
         else:
-            analysis_results = run_analysis(message, analyzers)
-            overall = analyzers["scorer"].calculate_overall_score(analysis_results)
+            analysis_results = snapshot.analysis_results
+            overall = snapshot.overall
             score = overall["overall_score"]
 
             st.markdown('<div class="step-label">Step 2</div>', unsafe_allow_html=True)
             st.markdown("**Compliance Review**")
+            if snapshot.message != message:
+                st.caption("Updating for your latest edits...")
+            if analysis_results["language"] != "en":
+                st.caption(f"Language: {LANGUAGE_NAMES.get(analysis_results['language'], analysis_results['language'])}")
+            alert_type = analysis_results.get("alert_type")
+            if alert_type:
+                if alert_type["primary_type"] != "other":
+                    st.caption(f"Alert type: {alert_type['primary_name']} ({alert_type['confidence']:.0%} confidence)")
+                for check in alert_type["checks"]:
+                    if check["severity"] == "high":
+                        st.warning(check["message"])
+                    else:
+                        st.caption(f"⚠️ {check['message']}")
 
             # Score badge
             css = _score_css(score)
@@ -377,12 +544,63 @@ def main():
             m3.metric("Grade", read["average_grade_level"])
             m4.metric("Risk", f"{conf['risk_score']}/100")
 
-            # Priority fixes
-            if overall["priority_fixes"]:
+            # Priority fixes, ranked by estimated gain when the explanation is available
+            explanation = overall.get("explanation")
+            if explanation and explanation["fixes"]:
+                for fix in explanation["fixes"]:
+                    icon = {"high": "🔴", "medium": "🟡", "low": "🔵"}.get(fix["impact"], "⚪")
+                    note = f" (+{fix['estimated_gain']:g} pts)" if fix["estimated_gain"] else ""
+                    if fix["unblocks"]:
+                        note += " — unblocks sending"
+                    st.caption(f"{icon} {fix['issue']}{note}")
+                if explanation["potential_score"] > explanation["overall_score"]:
+                    st.caption(f"All fixes together: about {explanation['potential_score']:g}/100.")
+            elif overall["priority_fixes"]:
                 for fix in overall["priority_fixes"]:
                     icon = {"high": "🔴", "medium": "🟡", "low": "🔵"}.get(fix["impact"], "⚪")
                     st.caption(f"{icon} {fix['issue']}")
 
+            # Best single edits, ranked by the score change they actually produce
+            if overall["overall_score"] < 100:
+                digest = prepare(snapshot.message).digest
+                if st.button("Find Best Single Edit", key="find_edits", use_container_width=True):
+                    st.session_state.edit_search = {
+                        "digest": digest,
+                        **analyzers["edits"].search(
+                            snapshot.message, analysis_results, overall,
+                            lambda text: run_analysis(text, analyzers), analyzers["scorer"]
+                        ),
+                    }
+                found = st.session_state.get("edit_search")
+                if found and found["digest"] == digest:
+                    if found["timed_out"]:
+                        st.caption(f"⏱️ Search stopped at its time limit: {found['evaluated']} of "
+                                   f"{found['scorable']} edits evaluated, so a better edit may exist.")
+                    if not found["edits"] and not found["placeholders"]:
+
+                        st.caption(f"No single edit raises the score ({found['evaluated']} tried).")
+
+                    def _use_edit(text: str):
+                        st.session_state.message_input = text
+                        st.session_state.message_sent = False
+
+                    for index, edit in enumerate(found["edits"]):
+                        st.caption(
+                            f"+{edit['delta']:g} → {edit['score']:g}/100: {edit['description']}"
+                            + (" — ready to send" if edit["unblocks"] else "")
+                        )
+                        st.code(edit["text"], language=None)
+                        st.button("Use This Edit", key=f"use_edit_{index}", on_click=_use_edit,
+                                  args=(edit["text"],), use_container_width=True)
+
+                    # Facts only the operator knows: inserted as placeholders to fill in before sending
+                    for index, edit in enumerate(found["placeholders"]):
+                        gain = f" (about +{edit['estimated_gain']:g} pts once filled in)" if edit["estimated_gain"] else ""
+                        st.caption(f"{edit['description']}{gain}")
+                        st.code(edit["text"], language=None)
+                        st.button("Insert Placeholder", key=f"use_placeholder_{index}", on_click=_use_edit,
+                                  args=(edit["text"],), use_container_width=True)
+
             # Detailed breakdown
             with st.expander(
                 f"FEMA — {fema['elements_present']}/5 elements",
@@ -419,6 +637,20 @@ def main():
                 else:
                     st.progress(1.0)
                     st.error(f"Over limit by {wea['chars_over_long']} characters")
+                    if st.button("Split into WEA segments", key="split_wea"):
+                        routed = select_analyzers(analysis_results.get("language", "en"), analyzers)
+                        plan = analyzers["segmenter"].plan(
+                            snapshot.message, routed["rules"],
+                            lambda text: run_analysis(text, analyzers), analyzers["scorer"]
+                        )
+                        st.caption(f"{plan['count']} segments — send in this order:")
+                        for segment in plan["segments"]:
+                            status = "✅" if segment["is_ready_to_send"] else "⚠️"
+                            st.caption(
+                                f"{status} Segment {segment['index']} — {segment['characters']} chars, "
+                                f"score {segment['overall_score']}"
+                            )
+                            st.code(segment["text"], language=None)
                 st.caption(wea["recommendation"])
 
             with st.expander(
@@ -494,9 +726,20 @@ def main():
     if not message:
         return
 
-    # Re-fetch analysis for sections below (already computed inside col_results)
-    analysis_results = run_analysis(message, analyzers)
-    overall = analyzers["scorer"].calculate_overall_score(analysis_results)
+    # Sending is only offered against results for the exact current text. The page
+    # above is already rendered, so wait a bounded time for the analysis and rerun;
+    # the wait returns early if a newer edit or Clear supersedes this request.
+    snapshot = background.latest()
+    if snapshot is None or snapshot.message != message:
+        finished = background.wait(SEND_WAIT_SECONDS)
+        if background.failed(message):
+            st.error(f"Analysis failed: {background.last_error}")
+        elif background.is_current(message) or not finished:
+            st.rerun()
+        return
+
+    analysis_results = snapshot.analysis_results
+    overall = snapshot.overall
     score = overall["overall_score"]
 
     st.divider()
@@ -512,7 +755,7 @@ def main():
             st.markdown("**AI-Powered Rewrite**")
             if st.button("✨ Generate Compliant Rewrite", use_container_width=True):
                 with st.spinner("Generating..."):
-                    suggestion = ai_analyzer.suggest_rewrite(message, analysis_results)
+                    suggestion = ai_analyzer.suggest_rewrite(message, expand_analysis(analysis_results))
                 if suggestion["success"]:
                     suggested_msg = suggestion["suggested_message"]
                     st.success("Suggestion generated!")
@@ -548,15 +791,41 @@ def main():
         st.markdown('<div class="step-label">Step 3</div>', unsafe_allow_html=True)
         st.markdown("**Send Alert**")
 
-        is_ready = overall["is_ready_to_send"]
+        # A bilingual pair is analyzed together and is only as ready as its weaker message
+        pair = None
+        if secondary:
+            pair_key = (prepare(message).digest, prepare(secondary).digest)
+            cached = st.session_state.get("pair_analysis")
+            if cached and cached["key"] == pair_key:
+                pair = cached["pair"]
+            else:
+                pair = analyze_pair(message, secondary, lambda text: run_analysis(text, analyzers),
+                                    analyzers["scorer"])
+                for side in ("primary", "secondary"):
+                    pair[side] = {"analysis": compact_analysis(pair[side]["analysis"]),
+                                  "overall": compact_overall(pair[side]["overall"])}
+                st.session_state.pair_analysis = {"key": pair_key, "pair": pair}
+            second = pair["secondary"]["overall"]
+            st.caption(
+                f"Bilingual pair ({' + '.join(LANGUAGE_NAMES.get(lang, lang) for lang in pair['languages'])}): "
+                f"second message scores {second['overall_score']}/100, pair {pair['overall_score']}/100."
+            )
+
+        placeholders = unfilled_placeholders(outgoing)
+        is_ready = (pair or overall)["is_ready_to_send"] and not placeholders
         already_sent = st.session_state.get("message_sent", False)
 
         if not is_ready:
             reasons = []
+            if placeholders:
+                reasons.append(f"Fill in {', '.join(dict.fromkeys(placeholders))}")
             if score < overall["min_threshold"]:
                 reasons.append(f"Score {score} < {overall['min_threshold']}")
             if not overall.get("fema_gate_passed", True):
                 reasons.append(f"Need {overall['min_fema_elements']}/5 FEMA elements")
+            if pair and not pair["secondary"]["overall"]["is_ready_to_send"]:
+                reasons.append(f"Second-language message scores {pair['secondary']['overall']['overall_score']}")
+
             st.warning("Cannot send yet. " + ". ".join(reasons) + ".")
 
         elif already_sent:
@@ -578,6 +847,31 @@ def main():
                 key="delivery_method"
             )
 
+            # Location-scoped targeting: areas named in the alert resolve to their contacts
+            geo = analyzers["geo"]
+            geo.refresh()
+            if geo.available:
+                location = analyzers["rules"].current.match_fema(message).get("location")
+                detected = [area["name"] for area in geo.detect_areas(message, location)]
+                target_areas = st.multiselect(
+                    "Target Areas", geo.area_names(), default=detected,
+                    key=f"target_areas_{prepare(message).digest}"
+                )
+                if target_areas:
+                    targeted = geo.recipients(target_areas)
+
+                    def _add_area_recipients():
+                        for key, found in (("phone_input", targeted["phone"]), ("email_input", targeted["email"])):
+                            existing = [line.strip() for line in st.session_state.get(key, "").split("\n") if line.strip()]
+                            st.session_state[key] = "\n".join(dict.fromkeys(existing + found))
+
+                    st.caption(
+                        f"{targeted['contacts']:,} contacts in {', '.join(target_areas)}: "
+                        f"{len(targeted['phone']):,} phones, {len(targeted['email']):,} emails "
+                        f"({targeted['elapsed_ms']} ms)."
+                    )
+                    st.button("Add Area Recipients", on_click=_add_area_recipients, use_container_width=True)
+
             phones, emails = [], []
             phone_errors, email_errors = [], []
 
@@ -595,6 +889,14 @@ def main():
                 if email_errors:
                     st.error(f"Invalid: {', '.join(email_errors)}")
 
+            # Addresses that failed permanently before are skipped automatically
+            dead_lettered = analyzers["retries"].dead_lettered(phones + emails)
+            if dead_lettered:
+                phones = [p for p in phones if p not in dead_lettered]
+                emails = [e for e in emails if e not in dead_lettered]
+                st.caption(f"Skipping {len(dead_lettered)} permanently failing recipient"
+                           f"{'s' if len(dead_lettered) != 1 else ''}: {', '.join(sorted(dead_lettered))}")
+
             total_recipients = len(phones) + len(emails)
             has_validation_errors = bool(phone_errors or email_errors)
 
@@ -605,27 +907,110 @@ def main():
                 if emails:
                     parts.append(f"**{len(emails)}** email{'s' if len(emails) != 1 else ''}")
                 st.caption(f"Sending to {' and '.join(parts)}.")
+                if phones:
+                    cost = estimate_cost(outgoing, len(phones))
+                    note = (
+                        f"SMS: {cost['segments_per_message']} segment(s) per phone ({cost['encoding']}), "
+                        f"{cost['total_segments']:,} total, est. ${cost['estimated_cost']:,.2f}."
+                    )
+                    if cost["segments_if_gsm7"] < cost["total_segments"]:
+                        note += (f" Replacing {' '.join(cost['non_gsm_chars'])} would cut this to "
+                                 f"{cost['segments_if_gsm7']:,} segments.")
+                    st.caption(note)
+                eta = analyzers["throughput"].estimate(outgoing, len(phones), len(emails))
+                limited = [
+                    f"{channel.upper()} capped at {info['rate_limit']:g} {info['unit']}/s"
+                    for channel, info in eta["channels"].items() if info["bottleneck"] == "rate limit"
+                ]
+                # Send below delivers in this process with one worker; the pooled ETA
+                # applies only to the delivery coordinator
+                notes = list(limited)
+                if eta["recommended_workers"] > 1:
+                    notes.insert(0, f"~{eta['estimated']} with {eta['recommended_workers']} workers "
+                                    "via the delivery coordinator")
+                st.caption(
+                    f"Estimated delivery time: ~{eta['single_worker']}"
+                    + (f" ({'; '.join(notes)})" if notes else "") + "."
+                )
+
+            # Anti-spam: the same (or nearly the same) alert already reached these people
+            confirm_duplicate = True
+            duplicates = (
+                analyzers["dedupe"].find_duplicate_sends(outgoing, phones + emails)
+                if total_recipients else []
+            )
+            if duplicates:
+                dup = duplicates[0]
+                st.warning(
+                    f"A {'matching' if dup['distance'] == 0 else 'near-identical'} alert "
+                    f"({dup['alert_id'][:18]}...) was sent to {dup['overlapping_recipients']} "
+                    f"of these recipients at {dup['delivered_at']}."
+                )
+                confirm_duplicate = st.checkbox("Send again anyway", key="confirm_duplicate_send")
+
+            # One nonce per send attempt: reruns and double clicks reuse it, so the ledger
+            # refuses them; confirming "Send again anyway" after a send mints a fresh one
+            nonce = send_nonce(
+                st.session_state, alert_key(outgoing, sender_name, {"phone": phones, "email": emails}),
+                resend=bool(duplicates) and confirm_duplicate
+            )
 
             if st.button(
                 "🚀 Send Alert",
                 type="primary",
                 use_container_width=True,
-                disabled=(total_recipients == 0 or not sender_name or has_validation_errors)
+                disabled=(total_recipients == 0 or not sender_name or has_validation_errors
+                          or not confirm_duplicate)
             ):
                 recipients = {"phone": phones, "email": emails, "method": delivery_method}
-                delivery_sys = analyzers["delivery"]
-                result = delivery_sys.deliver_message(
-                    message, analysis_results, overall,
-                    sender=sender_name, recipients=recipients
-                )
+                # Claim before sending: a rerun or second click of the same send attempt finds
+                # these recipients "sending"/"sent" and does not deliver them again
+                ledger = analyzers["ledger"]
+                send_key = alert_key(outgoing, sender_name, recipients, nonce)
+                claimed = ledger.claim(send_key, channel_recipients(recipients))
+                mark_send_used(st.session_state)
+                if not claimed:
+                    result = {
+                        "success": False,
+                        "message": "This alert was already delivered (or is being delivered) to these recipients."
+                    }
+                else:
+                    recipients["phone"] = [r for c, r in claimed if c == "sms"]
+                    recipients["email"] = [r for c, r in claimed if c == "email"]
+                    delivery_sys = analyzers["delivery"]
+                    started = time.monotonic()
+                    try:
+                        result = delivery_sys.deliver_message(
+                            outgoing, expand_analysis(analysis_results), expand_overall(overall),
+                            sender=sender_name, recipients=recipients
+                        )
+                    except Exception:
+                        ledger.release(send_key, claimed)
+                        raise
+                    ledger.record_delivery(send_key, claimed, result)
+                    analyzers["audit"].record_delivery(result, outgoing)
+                    analyzers["throughput"].observe(
+                        {"duration_seconds": time.monotonic() - started, "workers": 1, **result},
+                        segments=measure(outgoing).segments
+                    )
+                    # Failed recipients are retried by the retry worker, not by resending to everyone
+                    st.session_state.sent_retries = analyzers["retries"].collect(
+                        send_key, outgoing, sender_name, result
+                    )
 
                 if result["success"]:
+                    # A pair's combined text was never analyzed as one message, so none is stored for reuse
+                    analyzers["dedupe"].add(
+                        result["message_id"], outgoing, None if pair else analysis_results,
+                        recipients=phones + emails, delivered_at=result["timestamp"]
+                    )
                     st.session_state.message_sent = True
-                    st.session_state.last_sent_message = message
+                    st.session_state.last_sent_message = outgoing
                     st.session_state.sent_message_id = result["message_id"]
                     st.session_state.sent_timestamp = result["timestamp"]
-                    st.session_state.sent_result = result
-                    st.session_state.sent_score = overall
+                    st.session_state.sent_result = compact_delivery(result)
+
+                    st.session_state.sent_score = compact_overall(overall)
                     st.success(result["message"])
                     st.rerun()
                 else:
@@ -661,6 +1046,15 @@ def _show_sent_confirmation():
                 else:
                     st.caption(f"❌ {detail['recipient']} — {detail.get('error', 'Unknown')}")
 
+        retries = st.session_state.get("sent_retries")
+        if retries and any(retries.values()):
+            st.caption(
+                f"{retries['scheduled']} failed recipient(s) queued for retry with backoff "
+                f"(sent by the retry worker, `python -m utils.retry_scheduler --loop`); "
+
+                f"{retries['dead_lettered']} moved to the dead-letter list and skipped in future sends."
+            )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,98 @@
+"""
+Async Email Transport Benchmark
+Measures AsyncEmailTransport throughput against a local SMTP sink (no network or credentials needed)
+"""
+
+import argparse
+import asyncio
+import smtplib
+import time
+from email.message import EmailMessage
+
+from utils.async_email_transport import AsyncEmailTransport
+from utils.smtp_sink import LocalSMTPSink
+
+
+async def bench_async(host: str, port: int, count: int, connections: int, concurrency: int,
+                      batch: bool = False) -> float:
+    transport = AsyncEmailTransport(
+        host=host, port=port, username="", password="", sender_email="alerts@localhost",
+        connections=connections, starttls=False,
+    )
+    await transport.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    recipients = [f"user{i}@example.com" for i in range(count)]
+
+    async def _one(recipient: str) -> dict:
+        async with semaphore:
+            return await transport.send("email", recipient, "Benchmark alert", "Bench")
+
+    start = time.perf_counter()
+    if batch:
+        results = list((await transport.send_batch("email", recipients, "Benchmark alert", "Bench")).values())
+    else:
+        results = await asyncio.gather(*(_one(r) for r in recipients))
+    elapsed = time.perf_counter() - start
+    await transport.close()
+
+    failed = sum(1 for r in results if r["status"] != "sent")
+    if failed:
+        print(f"  {failed} sends failed, e.g. {next(r for r in results if r['status'] != 'sent')}")
+    return elapsed
+
+
+def bench_smtplib(host: str, port: int, count: int) -> float:
+    """Baseline: blocking smtplib, one connection, one message at a time"""
+    start = time.perf_counter()
+    with smtplib.SMTP(host, port) as server:
+        for i in range(count):
+            msg = EmailMessage()
+            msg["From"] = "alerts@localhost"
+            msg["To"] = f"user{i}@example.com"
+            msg["Subject"] = "Emergency Alert from Bench"
+            msg.set_content("Benchmark alert")
+            server.send_message(msg)
+    return time.perf_counter() - start
+
+
+async def main_async(args) -> None:
+    sink = None
+    host, port = args.host, args.port
+    if not port:
+        sink = await LocalSMTPSink(latency=args.latency).start()
+        host, port = sink.host, sink.port
+        print(f"Local SMTP sink on {host}:{port} (simulated latency {args.latency * 1000:.0f} ms)")
+
+    elapsed = await bench_async(host, port, args.count, args.connections, args.concurrency)
+    print(f"async transport: {args.count} messages in {elapsed:.2f}s "
+          f"-> {args.count / elapsed:,.0f} msg/s ({args.connections} connections)")
+
+    elapsed = await bench_async(host, port, args.count, args.connections, args.concurrency, batch=True)
+    print(f"async batched:   {args.count} recipients in {elapsed:.2f}s "
+          f"-> {args.count / elapsed:,.0f} recipients/s (multi-RCPT envelopes, shared MIME)")
+
+    baseline = await asyncio.to_thread(bench_smtplib, host, port, min(args.count, args.baseline_count))
+    baseline_count = min(args.count, args.baseline_count)
+    print(f"smtplib baseline: {baseline_count} messages in {baseline:.2f}s "
+          f"-> {baseline_count / baseline:,.0f} msg/s (1 connection)")
+
+    if sink:
+        await sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async email transport")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Sink delay per message (s)")
+    parser.add_argument("--baseline-count", type=int, default=500)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0,
+                        help="Existing sink port (e.g. aiosmtpd: python -m aiosmtpd -n -l localhost:8025); "
+                             "0 starts the built-in sink")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
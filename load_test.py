@@ -0,0 +1,289 @@
+"""
+Load Test Harness
+Simulates concurrent operator sessions against the app's analysis, scoring and delivery path
+and reports a capacity curve (throughput, tail latency, CPU and RSS per concurrency level)
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from utils.smtp_sink import LocalSMTPSink
+
+# Inputs the app reads from working-directory-relative paths; pinned before the test moves it
+APP_INPUTS = {
+    "RULE_PACK_PATH": "rules/en.json",
+    "SPANISH_RULE_PACK_PATH": "rules/es.json",
+    "TEMPLATE_LIBRARY_PATH": "templates/library.json",
+    "CONTACTS_PATH": "contacts/contacts.csv",
+    "GAZETTEER_PATH": "contacts/gazetteer.json",
+}
+
+
+class FakeSMSTransport:
+    """Async SMS gateway stand-in for DeliveryCoordinator: fixed latency, optional failure rate"""
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, **_):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random()
+
+    async def start(self):
+        pass
+
+    async def send(self, channel: str, recipient: str, message: str, sender: str) -> dict:
+        await asyncio.sleep(self.latency)
+        if self._rng.random() < self.failure_rate:
+            return {"status": "failed", "error": "Simulated gateway error"}
+        return {"status": "sent"}
+
+    async def close(self):
+        pass
+
+
+class LatencyRecorder:
+    """Thread-safe latency samples per operation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, operation: str, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self.samples.setdefault(operation, []).append(seconds)
+            if not ok:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux /proc), falling back to the peak from getrusage"""
+    try:
+        with open("/proc/self/statm", "r") as handle:
+            pages = int(handle.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def start_smtp_sink(latency: float) -> LocalSMTPSink:
+    """Run the local SMTP sink on its own event loop thread for the whole test"""
+    loop = asyncio.new_event_loop()
+    sink = LocalSMTPSink(latency=latency)
+    loop.run_until_complete(sink.start())
+    threading.Thread(target=loop.run_forever, daemon=True, name="smtp-sink").start()
+    return sink
+
+
+class LoadTest:
+    """Drives the app's own run_analysis / calculate_overall_score / deliver_message"""
+
+    def __init__(self, delivery: str = "app", recipients: int = 10, send_ratio: float = 0.1,
+                 keystrokes: int = 4, think_time: float = 0.2, sms_latency: float = 0.05,
+                 smtp_latency: float = 0.005, seed: int = 7):
+        self.delivery = delivery
+        self.recipients = recipients
+        self.send_ratio = send_ratio
+        self.keystrokes = max(1, keystrokes)
+        self.think_time = think_time
+        self.seed = seed
+        self.sink: Optional[LocalSMTPSink] = None
+        self.coordinator = None
+
+        # Everything the app writes (delivery logs, ledger, retry queue, audit, indexes) goes to
+        # a scratch directory. The delivery system logs to a working-directory-relative
+        # delivery_logs/, so the whole process moves there rather than each path being redirected.
+        for name, default in APP_INPUTS.items():
+            os.environ[name] = os.path.abspath(os.environ.get(name, default))
+        self.work_dir = tempfile.mkdtemp(prefix="load-test-")
+        os.chdir(self.work_dir)
+
+        if delivery != "none":
+            self.sink = start_smtp_sink(smtp_latency)
+            # The app's delivery system reads these at import time
+            os.environ["SMTP_SERVER"] = self.sink.host
+            os.environ["SMTP_PORT"] = str(self.sink.port)
+            os.environ.setdefault("SENDER_EMAIL", "alerts@loadtest.invalid")
+            os.environ.setdefault("SENDER_PASSWORD", "unused")
+
+        # Imported late so the SMTP settings above are in place; Streamlit calls run in bare mode
+        import app
+        self.app = app
+        self.analyzers = app.initialize_analyzers()
+        self.messages = [text for text in app.EXAMPLE_TEMPLATES.values() if text]
+
+        if delivery == "coordinator":
+            from utils.delivery_coordinator import DeliveryCoordinator
+            self.coordinator = DeliveryCoordinator(
+                transport="utils.async_email_transport:AsyncEmailTransport",
+                workers=1,
+                checkpoint_dir=os.path.join(self.work_dir, "delivery_checkpoints"),
+                transport_options={
+                    "host": self.sink.host, "port": self.sink.port, "username": "", "password": "",
+                    "sender_email": "alerts@loadtest.invalid", "starttls": False,
+                    "sms_transport": "load_test:FakeSMSTransport", "latency": sms_latency,
+                },
+            )
+
+    def _recipients(self, rng: random.Random) -> dict:
+        emails = [f"user{rng.randrange(10 ** 6)}@loadtest.invalid" for _ in range(self.recipients)]
+        if self.delivery == "coordinator":
+            phones = [f"+1555{rng.randrange(10 ** 7):07d}" for _ in range(self.recipients)]
+            return {"phone": phones, "email": emails, "method": "Both (SMS & Email)"}
+        # SMS provider settings live outside this repo, so the app path exercises email only
+        return {"phone": [], "email": emails, "method": "Email"}
+
+    def _deliver(self, message: str, results: dict, overall: dict, recipients: dict) -> dict:
+        if self.coordinator:
+            return self.coordinator.deliver(message, "Load Test", recipients)
+        return self.analyzers["delivery"].deliver_message(
+            message, results, overall, sender="Load Test", recipients=recipients
+        )
+
+    def session(self, session_id: int, stop_at: float, recorder: LatencyRecorder) -> None:
+        """One operator: types an alert (re-analysed as it grows), then sometimes sends it"""
+        rng = random.Random(self.seed * 1000 + session_id)
+        while time.monotonic() < stop_at:
+            # A unique tail keeps the app's exact-match reuse from hiding the analysis cost
+            base = rng.choice(self.messages) + f" Ref {rng.randrange(10 ** 6)}."
+            results = overall = None
+            for step in range(1, self.keystrokes + 1):
+                draft = base[: max(1, len(base) * step // self.keystrokes)]
+                started = time.perf_counter()
+                try:
+                    results = self.app.run_analysis(draft, self.analyzers)
+                    overall = self.analyzers["scorer"].calculate_overall_score(results)
+                    ok = True
+                except Exception:
+                    ok = False
+                recorder.add("analysis", time.perf_counter() - started, ok)
+                if self.think_time:
+                    time.sleep(rng.uniform(0, 2 * self.think_time))
+                if time.monotonic() >= stop_at:
+                    return
+
+            if self.delivery != "none" and overall and rng.random() < self.send_ratio:
+                started = time.perf_counter()
+                try:
+                    ok = bool(self._deliver(base, results, overall, self._recipients(rng)).get("success"))
+                except Exception:
+                    ok = False
+                recorder.add("delivery", time.perf_counter() - started, ok)
+
+    def run_level(self, concurrency: int, duration: float) -> dict:
+        recorder = LatencyRecorder()
+        rss_before = current_rss_mb()
+        cpu_before, wall_before = time.process_time(), time.monotonic()
+        stop_at = wall_before + duration
+
+        # Streamlit runs each session's script on its own thread, so threads model it faithfully
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as pool:
+            for future in [pool.submit(self.session, i, stop_at, recorder) for i in range(concurrency)]:
+                future.result()
+
+        wall = time.monotonic() - wall_before
+        cpu = time.process_time() - cpu_before
+        row = {
+            "concurrency": concurrency,
+            "duration_seconds": round(wall, 2),
+            "cpu_cores": round(cpu / wall, 2) if wall else 0.0,
+            "rss_mb": round(current_rss_mb(), 1),
+            "rss_growth_mb": round(current_rss_mb() - rss_before, 1),
+        }
+        for operation in ("analysis", "delivery"):
+            samples = recorder.samples.get(operation, [])
+            row[f"{operation}_count"] = len(samples)
+            row[f"{operation}_per_second"] = round(len(samples) / wall, 2) if wall else 0.0
+            row[f"{operation}_errors"] = recorder.errors.get(operation, 0)
+            for pct in (50, 95, 99):
+                row[f"{operation}_p{pct}_ms"] = round(percentile(samples, pct) * 1000, 1)
+        return row
+
+
+def recommend(rows: list[dict], slo_ms: float) -> dict:
+    """Largest tested concurrency whose p95 analysis latency stays within the SLO"""
+    within = [r for r in rows if r["analysis_p95_ms"] <= slo_ms and not r["analysis_errors"]]
+    best = max(within, key=lambda r: r["concurrency"]) if within else None
+    return {
+        "slo_p95_ms": slo_ms,
+        "max_sessions_per_instance": best["concurrency"] if best else 0,
+        "cpu_cores_at_max": best["cpu_cores"] if best else None,
+        "rss_mb_at_max": best["rss_mb"] if best else None,
+    }
+
+
+def write_curve(rows: list[dict], summary: dict, path: str) -> None:
+    target = Path(path)
+    if target.suffix.lower() == ".csv":
+        with open(target, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(target, "w", encoding="utf-8") as handle:
+            json.dump({"levels": rows, "recommendation": summary}, handle, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the analysis and delivery path")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated session counts")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level")
+    parser.add_argument("--delivery", choices=["app", "coordinator", "none"], default="app",
+                        help="app: deliver_message against the local SMTP sink; "
+                             "coordinator: DeliveryCoordinator with the sink and a fake SMS gateway")
+    parser.add_argument("--recipients", type=int, default=10, help="Recipients per send")
+    parser.add_argument("--send-ratio", type=float, default=0.1, help="Share of drafts that get sent")
+    parser.add_argument("--keystrokes", type=int, default=4, help="Re-analyses while a draft is typed")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="Mean pause between edits")
+    parser.add_argument("--smtp-latency-ms", type=float, default=5.0)
+    parser.add_argument("--sms-latency-ms", type=float, default=50.0)
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p95 analysis latency target")
+    parser.add_argument("--output", default="capacity_curve.json", help=".json or .csv")
+    args = parser.parse_args()
+    # Resolved before LoadTest moves the working directory to its scratch directory
+    output = os.path.abspath(args.output)
+
+    test = LoadTest(
+        delivery=args.delivery, recipients=args.recipients, send_ratio=args.send_ratio,
+        keystrokes=args.keystrokes, think_time=args.think_ms / 1000,
+        sms_latency=args.sms_latency_ms / 1000, smtp_latency=args.smtp_latency_ms / 1000,
+    )
+
+    print(f"Delivery logs and other app writes go to {test.work_dir}")
+    rows = []
+    print(f"{'sessions':>8} {'analyses/s':>10} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'sends/s':>8} {'send p95':>9} {'cpu':>5} {'rss MB':>7}")
+    for level in [int(x) for x in args.levels.split(",") if x.strip()]:
+        row = test.run_level(level, args.duration)
+        rows.append(row)
+        print(f"{level:>8} {row['analysis_per_second']:>10.1f} {row['analysis_p50_ms']:>7.1f} "
+              f"{row['analysis_p95_ms']:>7.1f} {row['analysis_p99_ms']:>7.1f} "
+              f"{row['delivery_per_second']:>8.2f} {row['delivery_p95_ms']:>9.1f} "
+              f"{row['cpu_cores']:>5.2f} {row['rss_mb']:>7.1f}")
+
+    summary = recommend(rows, args.slo_ms)
+    write_curve(rows, summary, output)
+    print(f"\nWithin p95 <= {args.slo_ms:.0f} ms: up to {summary['max_sessions_per_instance']} "
+          f"concurrent sessions per instance. Curve written to {output}")
+
+
+if __name__ == "__main__":
+    main()
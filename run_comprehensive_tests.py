@@ -3,8 +3,18 @@ Comprehensive Test Suite for AI Message Compliance Checker
 Tests all functionalities and generates detailed test report
 """
 
+import asyncio
 import sys
 import os
+import json
+import pickle
+import tempfile
+import threading
+import time
+import socket
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,8 +25,40 @@ from analysis.fema_analyzer import FEMAAnalyzer
 from analysis.wea_analyzer import WEAAnalyzer
 from analysis.readability_analyzer import ReadabilityAnalyzer
 from analysis.confusion_detector import ConfusionDetector
+from analysis.confusion_index import ConfusionPatternIndex
+from analysis.alert_type_classifier import AlertTypeClassifier
+from analysis.score_explanation import explain_score
 from utils.safety_scorer import SafetyScorer
 from utils.email_service import EmailService
+from utils.sms_encoding import measure
+from analysis.result_types import (
+    CompactResult, compact_analysis, compact_delivery, compact_overall, expand_analysis, expand_overall
+)
+from utils import what_if_simulator
+from analysis.text_preprocessor import PreparedText, prepare
+from utils import corpus_linter
+from analysis.language_router import (
+    BUILTIN_ANALYSIS_VERSION, analysis_version, analyze_pair, build_analyzers, detect_language, select_analyzers
+)
+from analysis.wea_segmenter import WEA_LONG_LIMIT, WEASegmenter
+from utils.geo_index import Contact, GeoIndex, _in_polygon, haversine_km
+from utils.audit_log import AuditLog, AuditReader, verify
+from utils.send_ledger import SendLedger, alert_key, channel_recipients, mark_send_used, send_nonce
+from utils.delivery_coordinator import DeliveryCoordinator, TransportConfigurationError, _run_shard_async
+from utils.throughput_estimator import ThroughputEstimator
+from utils.background_analysis import BackgroundAnalyzer
+from utils.near_duplicate_index import NearDuplicateIndex
+from analysis.edit_search import EditSearch, unfilled_placeholders
+from analysis.rule_packs import RulePackManager
+from analysis.language_router import PackConfusionDetector, PackFEMAAnalyzer
+from utils.template_library import TemplateLibrary
+from utils.retry_scheduler import RetryScheduler
+from utils.async_email_transport import AsyncSMTPPool
+from utils.smtp_sink import LocalSMTPSink
+from utils.history_index import HistoryIndex
+
+# Dry-run transport: reports every send as delivered without contacting a provider
+LOGGING_TRANSPORT = "utils.delivery_coordinator:LoggingTransport"
 
 # Test data from TESTING.md
 test_messages = {
@@ -307,6 +349,102 @@ imminent! Flee your homes in terror!""",
     
     return passed, failed
 
+def test_confusion_index():
+    """Test Single-Pass Confusion Pattern Index"""
+    print_header("Confusion Pattern Index Tests")
+    
+    index = ConfusionPatternIndex()
+    passed = 0
+    failed = 0
+    
+    index_tests = [
+        ("Vague message", "Something might happen soon. Be careful.", "Vague language"),
+        ("Panic message", "Catastrophic disaster is approaching!", "Panic language"),
+        ("TEST with urgent action", "This is a TEST: Missile warning. Evacuate immediately.", "Contradiction"),
+        ("Hawaii wording", "MISSILE THREAT INBOUND. SEEK IMMEDIATE SHELTER. THIS IS NOT A DRILL.", "Alert type"),
+        ("Clear message", "Earthquake. Feel safe. Go outside.", None),
+    ]
+    
+    for desc, text, expected_type in index_tests:
+        print_test_case(desc)
+        spans = index.find_spans(text)
+        types = {span['type'] for span in spans}
+        
+        if (expected_type in types) if expected_type else not spans:
+            print_pass(f"Span types: {sorted(types) or 'none'}")
+            passed += 1
+        else:
+            print_fail("Span types", sorted(types), expected_type or "none")
+            failed += 1
+        for span in spans:
+            print_info(f"{span['type']}: \"{span['text']}\" — {span['reason']}")
+        print()
+    
+    return passed, failed
+
+def test_alert_type_classifier():
+    """Test Alert Type Classifier (FCC_ALERT_TYPES.md examples)"""
+    print_header("Alert Type Classifier Tests")
+    
+    classifier = AlertTypeClassifier()
+    passed = 0
+    failed = 0
+    
+    type_tests = [
+        ("Evacuation", "Evacuation Order from City Emergency. Wildfire is approaching residential area now. Leave via Main Street immediately.", "evacuation", None),
+        ("Tornado", "Tornado Warning from National Weather Service. A tornado is occurring now near Highway 5. Seek shelter immediately.", "severe_weather", None),
+        ("Compliant TEST", "This is a TEST. FEMA System Test. This is only a test of the Emergency Alert System. Do not evacuate. Repeat: This is a TEST.", "test", None),
+        ("TEST with emergency language", "This is a TEST. Missile attack inbound. Evacuate immediately. This is a TEST.", "test", "test_with_emergency_language"),
+        ("Hawaii wording", "BALLISTIC MISSILE THREAT INBOUND TO HAWAII. SEEK IMMEDIATE SHELTER. THIS IS NOT A DRILL.", "national_security", "not_a_drill"),
+        ("Bare test/exercise words", "City Water Department: boil water advisory until the test results are back. Exercise caution with tap water.", "utility", None),
+        ("Unclassified", "Large animal seen downtown now.", "other", None),
+    ]
+    
+    for desc, text, expected_type, expected_check in type_tests:
+        print_test_case(desc)
+        result = classifier.classify(text)
+        checks = [check['type'] for check in result['checks']]
+        
+        if result['primary_type'] == expected_type and (expected_check in checks if expected_check else not checks):
+            print_pass(f"{result['primary_name']} ({result['confidence']:.0%}), checks: {checks or 'none'}")
+            passed += 1
+        else:
+            print_fail("Type / checks", f"{result['primary_type']} {checks}", f"{expected_type} {expected_check or '[]'}")
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_sms_encoding():
+    """Test GSM-7 / UCS-2 SMS segment counting"""
+    print_header("SMS Encoding Tests")
+    
+    passed = 0
+    failed = 0
+    
+    encoding_tests = [
+        ("160 GSM-7 chars", "a" * 160, "GSM-7", 1),
+        ("161 GSM-7 chars", "a" * 161, "GSM-7", 2),
+        ("Extended char costs two septets", "a" * 159 + "€", "GSM-7", 2),
+        ("Emoji forces UCS-2", "Tornado warning now 🚨", "UCS-2", 1),
+        ("71 UCS-2 units", "x" * 69 + "🚨", "UCS-2", 2),
+        ("Smart quotes force UCS-2", "“Evacuate now”", "UCS-2", 1),
+    ]
+    
+    for desc, text, expected_encoding, expected_segments in encoding_tests:
+        print_test_case(desc)
+        info = measure(text)
+        
+        if info.encoding == expected_encoding and info.segments == expected_segments:
+            print_pass(f"{info.encoding}, length {info.length}, {info.segments} segment(s)")
+            passed += 1
+        else:
+            print_fail("Encoding / segments", f"{info.encoding} {info.segments}", f"{expected_encoding} {expected_segments}")
+            failed += 1
+        print()
+    
+    return passed, failed
+
 def test_safety_scorer():
     """Test Overall Safety Score Calculation"""
     print_header("Safety Scorer Tests")
@@ -360,115 +498,1574 @@ def test_safety_scorer():
     
     return passed, failed
 
-def test_email_service():
-    """Test Email Service Configuration"""
-    print_header("Email Service Configuration Check")
+def test_score_explanation():
+    """Test explained priority fixes"""
+    print_header("Score Explanation Tests")
+    
+    fema = FEMAAnalyzer()
+    wea = WEAAnalyzer()
+    readability = ReadabilityAnalyzer()
+    confusion = ConfusionDetector()
+    scorer = SafetyScorer()
     
     passed = 0
     failed = 0
     
-    # Check if environment variables are set
-    sender_email = os.getenv("SENDER_EMAIL", "")
-    sender_password = os.getenv("SENDER_PASSWORD", "")
-    smtp_server = os.getenv("SMTP_SERVER", "")
+    for msg_id, msg_data in test_messages.items():
+        print_test_case(msg_data['description'])
+        
+        text = msg_data['text']
+        analysis_results = {
+            "fema": fema.analyze(text),
+            "wea": wea.analyze(text),
+            "readability": readability.analyze(text),
+            "confusion": confusion.analyze(text)
+        }
+        score_result = scorer.calculate_overall_score(analysis_results)
+        explanation = explain_score(text, analysis_results, score_result)
+        
+        fema_fixes = [fix for fix in explanation['fixes'] if fix['component'] == "fema"]
+        gains = [fix['estimated_gain'] for fix in explanation['fixes'] if not fix['unblocks']]
+        spans_ok = all(
+            fix['span'] is None or text[fix['span'][0]:fix['span'][1]] == fix['text']
+            for fix in explanation['fixes']
+        )
+        
+        if (len(fema_fixes) == 5 - analysis_results['fema']['elements_present']
+                and gains == sorted(gains, reverse=True)
+                and explanation['potential_score'] >= score_result['overall_score']
+                and spans_ok):
+            print_pass(f"{len(explanation['fixes'])} fixes, potential score {explanation['potential_score']}")
+            passed += 1
+        else:
+            print_fail("Explanation", explanation['fixes'], "FEMA fixes per missing element, ranked by gain")
+            failed += 1
+        print()
     
-    print_test_case("Email Service Configuration")
+    return passed, failed
+
+def test_history_index():
+    """Test the memory-mapped delivery history index"""
+    print_header("History Index Tests")
     
-    if sender_email:
-        print_pass(f"SENDER_EMAIL configured: {sender_email}")
-        passed += 1
-    else:
-        print_fail("SENDER_EMAIL not configured")
-        failed += 1
+    passed = 0
+    failed = 0
     
-    if sender_password:
-        print_pass(f"SENDER_PASSWORD configured (hidden)")
+    def _log(directory, message_id, timestamp, success=True):
+        with open(os.path.join(directory, f"{message_id}.json"), "w", encoding="utf-8") as handle:
+            json.dump({"message_id": message_id, "timestamp": timestamp,
+                       "safety_score": 80, "success": success}, handle)
+    
+    with tempfile.TemporaryDirectory() as log_dir:
+        _log(log_dir, "MSG-1", "2025-01-01T00:00:00+00:00")
+        _log(log_dir, "MSG-2", "2025-01-02T00:00:00+00:00")
+        index = HistoryIndex(log_dir)
+        index.refresh()
+        
+        print_test_case("Refresh after a new delivery")
+        _log(log_dir, "MSG-3", "2025-01-03T00:00:00+00:00")
+        try:
+            added = index.refresh()
+            if added == 1 and index.total_delivered() == 3 and index.latest(1)[0]["message_id"] == "MSG-3":
+                print_pass("Second refresh indexed the new log")
+                passed += 1
+            else:
+                print_fail("Second refresh", added, 1)
+                failed += 1
+        except Exception as e:
+            print_fail(f"Second refresh raised {e!r}")
+            failed += 1
+        print()
+        
+        print_test_case("Out-of-order log and reopen")
+        _log(log_dir, "MSG-0", "2024-06-01T00:00:00+00:00", success=False)
+        index.refresh()
+        reopened = HistoryIndex(log_dir)
+        reopened.refresh()
+        order = [entry["message_id"] for entry in reopened.latest(10)]
+        if order == ["MSG-3", "MSG-2", "MSG-1", "MSG-0"] and reopened.total_delivered() == 3:
+            print_pass("All four logs kept, newest first")
+            passed += 1
+        else:
+            print_fail("Index after reopen", order, ["MSG-3", "MSG-2", "MSG-1", "MSG-0"])
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_async_email_transport():
+    """Test SMTP transport TLS enforcement and no resend after DATA"""
+    print_header("Async Email Transport Tests")
+    
+    passed = 0
+    failed = 0
+    
+    async def _scenario(starttls, timeout, latency, credentials=None):
+        sink = await LocalSMTPSink(latency=latency).start()
+        # The sink offers neither STARTTLS nor AUTH
+        credentials = credentials or {}
+        pool = AsyncSMTPPool(size=1, host=sink.host, port=sink.port, starttls=starttls,
+                             timeout=timeout, **credentials)
+        await pool.start()
+        try:
+            result = await pool.send("alerts@example.org", ["a@example.org"], b"Subject: t\r\n\r\nbody")
+            await asyncio.sleep(latency + 0.2)
+            return result["a@example.org"], sink.messages
+        finally:
+            await pool.close()
+            await sink.stop()
+    
+    print_test_case("STARTTLS requested but not offered")
+    outcome, delivered = asyncio.run(_scenario(starttls=True, timeout=5.0, latency=0.0,
+                                               credentials={"username": "user", "password": "secret"}))
+    if outcome["status"] == "failed" and "STARTTLS" in outcome.get("error", "") and delivered == 0:
+        print_pass(f"Refused plaintext session: {outcome['error']}")
         passed += 1
     else:
-        print_fail("SENDER_PASSWORD not configured")
+        print_fail("STARTTLS downgrade", outcome, "failed without sending")
         failed += 1
+    print()
     
-    if smtp_server:
-        print_pass(f"SMTP_SERVER configured: {smtp_server}")
+    print_test_case("Timeout after DATA is not retried")
+    outcome, delivered = asyncio.run(_scenario(starttls=False, timeout=0.2, latency=0.5))
+    if outcome.get("ambiguous") and delivered == 1:
+        print_pass("Reported as unknown outcome; server received the message once")
         passed += 1
     else:
-        print_info("SMTP_SERVER using default: smtp.gmail.com")
+        print_fail("Resend after DATA", (outcome, delivered), "ambiguous, delivered once")
+        failed += 1
+    print()
     
+    print_test_case("Credentials for a server without AUTH")
+    try:
+        outcome = asyncio.run(_scenario(starttls=False, timeout=5.0, latency=0.0,
+                                        credentials={"username": "user", "password": "secret"}))
+        print_fail("Missing AUTH", outcome, "TransportConfigurationError")
+        failed += 1
+    except TransportConfigurationError as e:
+        if "AUTH" in str(e):
+            print_pass(f"Refused to send credentials: {e}")
+            passed += 1
+        else:
+            print_fail("Missing AUTH", str(e), "error naming AUTH")
+            failed += 1
     print()
+
+    
     return passed, failed
 
-def test_edge_cases():
-    """Test Edge Cases"""
-    print_header("Edge Case Tests")
+def test_retry_scheduler():
+    """Test retry scheduler dead-letter and give-up transitions"""
+    print_header("Retry Scheduler Tests")
     
-    analyzer = ReadabilityAnalyzer()
-    wea = WEAAnalyzer()
     passed = 0
     failed = 0
     
-    edge_tests = {
-        "empty_string": {
-            "text": "",
-            "description": "Empty Message"
-        },
-        "only_numbers": {
-            "text": "123 456 789",
-            "description": "Only Numbers"
-        },
-        "only_symbols": {
-            "text": "!!! ### $$$",
-            "description": "Only Symbols"
-        },
-        "very_long": {
-            "text": "Warning " * 100,
-            "description": "Very Long Message (800+ chars)"
-        }
-    }
+    def _email_result(details):
+        return {"email_delivery_status": {"details": details}}
     
-    for test_id, test_data in edge_tests.items():
-        print_test_case(test_data['description'])
-        try:
-            result = analyzer.analyze(test_data['text'])
-            result_wea = wea.analyze(test_data['text'])
-            print_pass(f"Handled without errors")
-            print_info(f"Characters: {result_wea['character_count']}")
-            if test_data['text']:
-                print_info(f"Grade: {result['flesch_kincaid_grade']:.2f}")
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = RetryScheduler(os.path.join(tmp, "retry.db"), max_attempts=2, base_delay=0)
+        
+        print_test_case("Permanent address rejection is dead-lettered")
+        counts = scheduler.collect("m1", "Alert", "ops@example.org", _email_result([
+            {"recipient": "gone@example.org", "status": "failed", "error": "550 5.1.1 No such user"},
+            {"recipient": "tls@example.org", "status": "failed", "error": "530 Must issue STARTTLS first"},
+            {"recipient": "lost@example.org", "status": "failed", "error": "Outcome unknown after DATA",
+             "ambiguous": True},
+        ]))
+        if counts == {"scheduled": 1, "dead_lettered": 1} and scheduler.dead_lettered(
+                ["gone@example.org", "tls@example.org", "lost@example.org"]) == {"gone@example.org"}:
+            print_pass("550 dead-lettered, 530 scheduled, ambiguous outcome not retried")
+            passed += 1
+        else:
+            print_fail("Initial classification", counts, {"scheduled": 1, "dead_lettered": 1})
+            failed += 1
+        print()
+        
+        print_test_case("Transient failures give up without dead-lettering")
+        failing = lambda channel, recipients, message, sender: {
+            r: {"status": "failed", "error": "421 Try again later"} for r in recipients}
+        totals = {"rescheduled": 0, "dead_lettered": 0, "gave_up": 0}
+        for _ in range(scheduler.max_attempts):
+            for key, value in scheduler.run_due(failing, now=float("inf")).items():
+                totals[key] = totals.get(key, 0) + value
+        pending = scheduler.pending()
+        if (totals["gave_up"] == 1 and totals["dead_lettered"] == 0 and pending["queued"] == 0
+                and not scheduler.dead_lettered(["tls@example.org"])):
+            print_pass(f"Gave up after {scheduler.max_attempts} attempts; address still usable")
+            passed += 1
+        else:
+            print_fail("Exhausted retries", (totals, pending), "gave_up=1, not dead-lettered")
+            failed += 1
+        print()
+        
+        print_test_case("Concurrent workers send each due retry once")
+        scheduler.collect("m2", "Alert", "ops@example.org", _email_result([
+            {"recipient": f"user{i}@example.net", "status": "failed", "error": "421 Try again later"}
+            for i in range(40)
+        ]))
+        sent_to = []
+        lock = threading.Lock()
+        
+        def _slow_send(channel, recipients, message, sender):
+            time.sleep(0.05)
+            with lock:
+                sent_to.extend(recipients)
+            return {r: {"status": "sent"} for r in recipients}
+        
+        workers = [RetryScheduler(scheduler.path) for _ in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda worker: worker.run_due(_slow_send, now=float("inf")), workers))
+        if len(sent_to) == 40 and len(set(sent_to)) == 40 and scheduler.pending()["queued"] == 0:
+            print_pass("40 retries across 4 workers, no duplicates")
+            passed += 1
+        else:
+            print_fail("Concurrent workers", len(sent_to), 40)
+            failed += 1
+        print()
+        
+        print_test_case("A dead worker's claims are retried after the lease")
+        scheduler.collect("m3", "Alert", "ops@example.org", _email_result([
+            {"recipient": "later@example.net", "status": "failed", "error": "421 Try again later"}]))
+        claimed = RetryScheduler(scheduler.path, lease=0).due(now=float("inf"))
+        expired = scheduler.due(now=float("inf"))
+        again = scheduler.due(now=float("inf"))
+        if len(claimed) == 1 and list(expired.values()) == [["later@example.net"]] and not again:
+
+            print_pass("Claimed once; reclaimed after the lease expired")
             passed += 1
+        else:
+            print_fail("Lease", (claimed, again, expired), "claimed, not again, then reclaimed")
+            failed += 1
+        print()
+        
+        print_test_case("Dead-letter lookup over 300,000 recipients")
+
+        recipients = [f"user{i}@example.org" for i in range(300_000)] + ["gone@example.org"]
+        try:
+            found = scheduler.dead_lettered(recipients)
+            if found == {"gone@example.org"}:
+                print_pass("Looked up in chunks without exceeding the SQL variable limit")
+                passed += 1
+            else:
+                print_fail("Chunked lookup", found, {"gone@example.org"})
+                failed += 1
         except Exception as e:
-            print_fail(f"Error handling edge case: {str(e)}")
+            print_fail("Chunked lookup", str(e), "no error")
             failed += 1
         print()
     
     return passed, failed
 
-def main():
-    """Run all tests and generate report"""
-    print_header("AI Message Compliance Checker - Comprehensive Test Suite")
+def test_template_library():
+    """Test that filled-in templates are analyzed on what was typed"""
+    print_header("Template Library Tests")
     
-    print(f"{Colors.BOLD}Running all functional tests...{Colors.END}\n")
+    passed = 0
+    failed = 0
     
-    total_passed = 0
-    total_failed = 0
+    rules = RulePackManager("rules/en.json")
     
-    # Run all test suites
-    p, f = test_fema_analyzer()
-    total_passed += p
-    total_failed += f
+    class _LengthOnly:
+        def analyze(self, message):
+            return {"character_count": len(message)}
     
-    p, f = test_wea_analyzer()
-    total_passed += p
-    total_failed += f
+    class _WordsPerSentence:
+        def analyze(self, message):
+            prepared = prepare(message)
+            return {"average_grade_level": round(prepared.word_count / prepared.sentence_count, 1)}
     
-    p, f = test_readability_analyzer()
-    total_passed += p
-    total_failed += f
+    analyzers = {
+        "fema": PackFEMAAnalyzer(rules),
+        "wea": _LengthOnly(),
+        "readability": _WordsPerSentence(),
+        "confusion": PackConfusionDetector(rules),
+        "rules": rules,
+    }
+    analyzed = []
     
-    p, f = test_confusion_detector()
-    total_passed += p
-    total_failed += f
+    def analyze(text):
+        analyzed.append(text)
+        return {
+            "fema": analyzers["fema"].analyze(text),
+            "wea": analyzers["wea"].analyze(text),
+            "readability": analyzers["readability"].analyze(text),
+            "confusion": analyzers["confusion"].analyze(text),
+            "rule_pack_version": rules.version,
+        }
     
-    p, f = test_safety_scorer()
+    with tempfile.TemporaryDirectory() as tmp:
+        library = TemplateLibrary("templates/library.json", os.path.join(tmp, "snapshots.json"))
+        
+        print_test_case("Nonsense slot values do not count as FEMA elements")
+        _, results = library.fill("tsunami-warning",
+                                  {"agency": "asdf", "location": "asdf", "time": "asdf"}, analyzers, analyze)
+        if not results["fema"]["source"] and not results["fema"]["location"]:
+            print_pass(f"Missing: {', '.join(results['fema']['missing_elements'])}")
+            passed += 1
+        else:
+            print_fail("Slot-based FEMA credit", results["fema"], "source and location missing")
+            failed += 1
+        print()
+        
+        print_test_case("Clarity issues come from the filled text, not the sample")
+        message, results = library.fill("tsunami-warning", {"agency": "County Emergency Management",
+                                        "location": "Waikiki Beach", "time": "maybe later"}, analyzers, analyze)
+        expected = analyzers["confusion"].analyze(message)["identified_issues"]
+        if results["confusion"]["identified_issues"] == expected and library.cached_analysis(message):
+            print_pass(f"{len(expected)} issue(s), cached for the exact text")
+            passed += 1
+        else:
+            print_fail("Confusion carry-over", results["confusion"]["identified_issues"], expected)
+            failed += 1
+        print()
+        
+        print_test_case("Long slot values are re-graded; same-shape ones reuse the snapshot")
+        sample_grade = library.snapshots["tsunami-warning"]["sample_analysis"]["readability"]["average_grade_level"]
+        long_message, long_results = library.fill("tsunami-warning", {
+            "agency": "County Emergency Management", "time": "6:00 PM today",
+            "location": "the low-lying coastal neighborhoods between the harbor and the old airport road",
+        }, analyzers, analyze)
+        _, short_results = library.fill("tsunami-warning", {
+            "agency": "County Emergency Management", "location": "Hanauma Bay", "time": "7:00 PM today",
+        }, analyzers, analyze)
+        long_grade = long_results["readability"]["average_grade_level"]
+        if (long_grade == analyzers["readability"].analyze(long_message)["average_grade_level"] != sample_grade
+                and short_results["readability"]["average_grade_level"] == sample_grade):
+            print_pass(f"Sample grade {sample_grade}, long fill re-graded to {long_grade}")
+            passed += 1
+        else:
+            print_fail("Readability of the long fill", long_grade,
+                       analyzers["readability"].analyze(long_message)["average_grade_level"])
+            failed += 1
+        print()
+        
+        print_test_case("Precomputed snapshots are saved and reused after a restart")
+        snapshot_path = os.path.join(tmp, "startup.json")
+        built = TemplateLibrary("templates/library.json", snapshot_path).precompute(analyze, analyzers)
+        analyzed.clear()
+        restarted = TemplateLibrary("templates/library.json", snapshot_path)
+        rebuilt = restarted.precompute(analyze, analyzers)
+        restarted.fill("boil-water", {"agency": "City Water Department", "location": "Eastside",
+                                      "time": "further notice"}, analyzers, analyze)
+        if built == len(restarted.templates) and rebuilt == 0 and not analyzed:
+            print_pass(f"{built} snapshots built once, none re-analyzed after restart")
+            passed += 1
+        else:
+            print_fail("Snapshots rebuilt after restart", rebuilt, 0)
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_edit_search():
+    """Test that suggested edits never invent facts"""
+    print_header("Edit Search Tests")
+    
+    passed = 0
+    failed = 0
+    
+    message = "Flooding might reach the river district. Residents should flee."
+    results = {
+        "fema": {"source": False, "hazard": True, "location": True, "time": False, "instruction": True},
+        "confusion": {"identified_issues": [
+            {"text": "might", "start": 9, "end": 14, "reason": "Uncertain wording"},
+            {"text": "flee", "start": 58, "end": 62, "reason": "Panic language"},
+        ]},
+    }
+    overall = {"overall_score": 60.0, "is_ready_to_send": False}
+    
+    class _Scorer:
+        def calculate_overall_score(self, text):
+            ready = not unfilled_placeholders(text)
+            return {"overall_score": 70.0 if ready else 90.0, "is_ready_to_send": ready}
+    
+    search = EditSearch(budget_ms=2000)
+    found = search.search(message, results, overall, lambda text: text, _Scorer())
+    edits, placeholders = found["edits"], found["placeholders"]
+    
+    print_test_case("Missing facts are offered as placeholders, not made up")
+    texts = [e["text"] for e in edits + placeholders]
+    invented = [t for t in texts if "will reach" in t or "Act now" in t or "County Emergency" in t]
+    if (not invented and placeholders and all(p["needs_input"] for p in placeholders)
+            and all(unfilled_placeholders(p["text"]) for p in placeholders)):
+        print_pass(f"{len(placeholders)} placeholder edit(s): "
+                   + ", ".join(p["description"] for p in placeholders))
+        passed += 1
+    else:
+        print_fail("Invented content", invented or placeholders, "placeholders only")
+        failed += 1
+    print()
+    
+    print_test_case("Only meaning-preserving edits are scored and sendable")
+    if (edits and all(not e["needs_input"] for e in edits)
+            and any("evacuate" in e["text"] for e in edits)
+            and all(not unfilled_placeholders(e["text"]) for e in edits)):
+        print_pass(f"Scored: {', '.join(e['description'] for e in edits)}")
+        passed += 1
+    else:
+        print_fail("Scored edits", edits, "flee -> evacuate, no placeholders")
+        failed += 1
+    print()
+    
+    print_test_case("A search cut off by its budget reports how much was evaluated")
+    def _slow(text):
+        time.sleep(0.3)
+        return text
+    
+    cut = EditSearch(budget_ms=50).search(message, results, overall, _slow, _Scorer())
+    if cut["timed_out"] and cut["evaluated"] < cut["scorable"] <= cut["candidates"]:
+        print_pass(f"{cut['evaluated']} of {cut['scorable']} edits evaluated")
+        passed += 1
+    else:
+        print_fail("Timed out", cut, "timed_out with evaluated < scorable")
+        failed += 1
+    print()
+    
+    return passed, failed
+
+
+def test_near_duplicate_index():
+    """Test near-duplicate lookup and reload from disk"""
+    print_header("Near-Duplicate Index Tests")
+    
+    passed = 0
+    failed = 0
+    
+    sent = "Tornado warning for Dane County until 5 PM. Take shelter in a basement now."
+    edited = "Tornado warning for Dane County until 5 PM. Take shelter in the basement now."
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NearDuplicateIndex(index_dir=tmp)
+        index.add("alert-1", sent, {"language": "en"}, recipients=["+1 555-123-4567"],
+                  delivered_at="2026-10-19T12:00:00Z")
+        
+        print_test_case("Edited alert matches the sent one")
+        match = index.lookup(edited)
+        if match and match.alert_id == "alert-1" and not match.exact:
+            print_pass(f"Distance {match.distance}, changed: {match.delta['added']}")
+            passed += 1
+        else:
+            print_fail("Near-duplicate lookup", match, "alert-1, not exact")
+            failed += 1
+        print()
+        
+        print_test_case("Reloaded index keeps analyses and recipients")
+        reloaded = NearDuplicateIndex(index_dir=tmp)
+        match = reloaded.lookup(sent)
+        duplicates = reloaded.find_duplicate_sends(edited, ["15551234567"])
+        if (len(reloaded) == 1 and match and match.exact and match.analysis["language"] == "en"
+                and duplicates and duplicates[0]["overlapping_recipients"] == 1):
+            print_pass("Exact match with stored analysis; duplicate send detected after restart")
+            passed += 1
+        else:
+            print_fail("Persistence", (len(reloaded), match, duplicates), "1 entry, exact, 1 overlap")
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_background_analysis():
+    """Test that the newest text always wins in background analysis"""
+    print_header("Background Analysis Tests")
+    
+    passed = 0
+    failed = 0
+    
+    delays = {"A": 0.0, "B": 0.3, "C": 1.5}
+    
+    def _analyze(message):
+        time.sleep(delays[message])
+        return {"message": message}, {}
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        background = BackgroundAnalyzer(_analyze, executor)
+        
+        print_test_case("Returning to analyzed text drops the pending edit (A -> B -> A)")
+        background.submit("A")
+        background.wait(1.0)
+        background.submit("B")
+        background.submit("A")
+        time.sleep(0.5)
+        if background.is_current("A"):
+            print_pass("Results still show A after B finished")
+            passed += 1
+        else:
+            print_fail("Stale result", background.latest().message, "A")
+            failed += 1
+        print()
+        
+        print_test_case("Reset interrupts a blocked wait")
+        background.submit("C")
+        threading.Timer(0.1, background.reset).start()
+        started = time.monotonic()
+        finished = background.wait()
+        waited = time.monotonic() - started
+        if not finished and waited < 1.0 and background.latest() is None:
+            print_pass(f"Wait returned after {waited:.2f}s")
+            passed += 1
+        else:
+            print_fail("Interruptible wait", (finished, round(waited, 2)), "False in under 1s")
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_throughput_estimator():
+    """Test delivery time estimates from the throughput log"""
+    print_header("Throughput Estimator Tests")
+    
+    passed = 0
+    failed = 0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "throughput.jsonl")
+        # A per-message delivery log next to the sample log must not be parsed
+        with open(os.path.join(tmp, "msg-1.json"), "w", encoding="utf-8") as handle:
+            json.dump({"duration_seconds": 1.0, "email_delivery_status": {"sent": 1}}, handle)
+        
+        estimator = ThroughputEstimator(log_path, email_rate_limit=0, max_workers=4)
+        estimator.observe({"duration_seconds": 2.0, "workers": 1, "email_delivery_status": {"sent": 100}})
+        
+        print_test_case("Rates come from the throughput log only")
+        reloaded = ThroughputEstimator(log_path, email_rate_limit=0, max_workers=4)
+        rate, source = reloaded.per_worker_rate("email")
+        if rate == 50.0 and source == "measured":
+            print_pass(f"{rate:g} emails/s per worker ({source})")
+            passed += 1
+        else:
+            print_fail("Per-worker rate", (rate, source), (50.0, "measured"))
+            failed += 1
+        print()
+        
+        print_test_case("Single-worker time is reported for in-process sends")
+        eta = reloaded.estimate("Test", 0, 1000)
+        if eta["single_worker_seconds"] == 20.0 and eta["single_worker"] == "20s":
+            print_pass(f"~{eta['single_worker']} in process, ~{eta['estimated']} with "
+                       f"{eta['recommended_workers']} workers")
+            passed += 1
+        else:
+            print_fail("Single-worker ETA", eta["single_worker_seconds"], 20.0)
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_delivery_coordinator_resume():
+    """Test that a resumed delivery never sends to a recipient twice"""
+    print_header("Delivery Coordinator Resume Tests")
+    
+    passed = 0
+    failed = 0
+    
+    recipients = {"phone": [], "email": [f"user{i}@example.org" for i in range(40)]}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        first = DeliveryCoordinator(LOGGING_TRANSPORT, workers=2, checkpoint_dir=tmp).deliver(
+            "Test alert", "ops", recipients, delivery_id="RUN-1")
+        # Simulate a crash: the second shard only got through half its recipients
+        run_dir = os.path.join(tmp, "RUN-1")
+        shard_path = os.path.join(run_dir, "shard-001.jsonl")
+        with open(shard_path, "r", encoding="utf-8") as handle:
+            lines = handle.readlines()
+        with open(shard_path, "w", encoding="utf-8") as handle:
+            handle.writelines(lines[:len(lines) // 2])
+        
+        print_test_case("Resume with a different worker count")
+        resumed = DeliveryCoordinator(LOGGING_TRANSPORT, workers=3, checkpoint_dir=tmp).deliver(
+            "Test alert", "ops", recipients, delivery_id="RUN-1")
+        sends: dict[str, int] = {}
+        for name in os.listdir(run_dir):
+            if name.endswith(".jsonl"):
+                with open(os.path.join(run_dir, name), "r", encoding="utf-8") as handle:
+                    for line in handle:
+                        recipient = json.loads(line)["recipient"]
+                        sends[recipient] = sends.get(recipient, 0) + 1
+        doubled = sorted(r for r, count in sends.items() if count > 1)
+        if (first["complete"] and resumed["complete"] and not doubled
+                and len(sends) == len(recipients["email"])):
+            print_pass(f"All {len(sends)} recipients sent exactly once across both runs")
+            passed += 1
+        else:
+            print_fail("Double sends after resume", doubled, "none")
+            failed += 1
+        print()
+        
+        print_test_case("Resume reclaims recipients a crashed run left sending")
+        ledger_path = os.path.join(tmp, "send_ledger.db")
+        crashed = subprocess.Popen([sys.executable, "-c", "pass"])
+        crashed.wait()
+        host = socket.gethostname()
+        ledger = SendLedger(ledger_path)
+        ledger.claim("RUN-2", [("email", r) for r in recipients["email"][:20]], owner=f"{host}:{crashed.pid}")
+        # Still within the lease and owned by a live process: not this run's to send
+        ledger.claim("RUN-2", [("email", r) for r in recipients["email"][20:]], owner=f"{host}:{os.getppid()}")
+        ledger.close()
+        resumed = DeliveryCoordinator(LOGGING_TRANSPORT, workers=1, checkpoint_dir=tmp,
+                                      ledger_path=ledger_path).deliver(
+            "Test alert", "ops", recipients, delivery_id="RUN-2")
+        sent = resumed["email_delivery_status"]["sent"]
+        if sent == 20:
+            print_pass(f"{sent} reclaimed from the exited run; 20 left to the live one")
+            passed += 1
+        else:
+            print_fail("Recipients sent on resume", sent, 20)
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_delivery_coordinator_batching():
+    """Test that email batches are grouped by domain across the whole shard"""
+    print_header("Delivery Coordinator Batching Tests")
+    
+    passed = 0
+    failed = 0
+    
+    # Interleaved domains: slicing before grouping would split these into four envelopes
+    emails = [f"{name}{i}@{domain}" for i in range(3) for name, domain in (("a", "one.org"), ("b", "two.org"))]
+    
+    async def _deliver(checkpoint):
+        sink = await LocalSMTPSink().start()
+        try:
+            results = await _run_shard_async({
+                "shard": 0,
+                "recipients": [("email", r) for r in emails],
+                "message": "Test alert",
+                "sender": "ops",
+                "transport": "utils.async_email_transport:AsyncEmailTransport",
+                "transport_options": {"host": sink.host, "port": sink.port, "starttls": False, "username": "",
+                                      "sender_email": "ops@example.org", "max_recipients": 3},
+                "concurrency": 4,
+                "checkpoint": checkpoint,
+                "delivery_id": "RUN-BATCH",
+            })
+            return results, sink.messages
+        finally:
+            await sink.stop()
+    
+    print_test_case("Six recipients, two domains, three per envelope")
+    with tempfile.TemporaryDirectory() as tmp:
+        results, envelopes = asyncio.run(_deliver(os.path.join(tmp, "shard-000.jsonl")))
+    sent = sum(1 for entry in results if entry["status"] == "sent")
+    if sent == len(emails) and envelopes == 2:
+        print_pass(f"{sent} sent in {envelopes} envelopes")
+        passed += 1
+    else:
+        print_fail("Envelopes", (sent, envelopes), (len(emails), 2))
+        failed += 1
+    print()
+    
+    return passed, failed
+
+def test_spanish_rule_pack():
+    """Test that the Spanish pack credits only issuing bodies as the source"""
+    print_header("Spanish Rule Pack Tests")
+    
+    passed = 0
+    failed = 0
+    
+    pack = RulePackManager("rules/es.json", cache_dir=None).current
+    test_cases = [
+        ("ALERTA: Inundación en el centro. Evacúe ahora.", None, "Alert-type header"),
+        ("Advertencia de tornado para la zona norte hasta las 8 PM.", None, "Warning in the headline"),
+        ("Bomberos: incendio forestal en la zona norte. Evacúe ahora.", "Bomberos", "Issuing body"),
+    ]
+    
+    for message, expected, name in test_cases:
+        print_test_case(name)
+        source = pack.match_fema(message)["source"]
+        if source == expected:
+            print_pass(f"Source: {source}")
+            passed += 1
+        else:
+            print_fail("Source", source, expected)
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_send_ledger():
+    """Test exactly-once claims in the send ledger"""
+    print_header("Send Ledger Tests")
+    
+    passed = 0
+    failed = 0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = SendLedger(os.path.join(tmp, "send_ledger.db"))
+        recipients = [("sms", f"+1555000{i:04d}") for i in range(50)]
+        
+        print_test_case("Concurrent claims hand each recipient to one caller")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            claims = list(pool.map(lambda _: ledger.claim("ALERT-1", recipients), range(8)))
+        owned = [recipient for claim in claims for recipient in claim]
+        if len(owned) == len(recipients) and set(owned) == set(recipients):
+            print_pass(f"{len(owned)} claims across {sum(1 for c in claims if c)} callers")
+            passed += 1
+        else:
+            print_fail("Claimed recipients", len(owned), len(recipients))
+            failed += 1
+        print()
+        
+        print_test_case("Sent recipients are never claimed again; failed ones are")
+        ledger.record("ALERT-1", [(r, "sent", None) for _, r in recipients[1:]]
+                      + [(recipients[0][1], "failed", "timeout")])
+        reclaimed = ledger.claim("ALERT-1", recipients)
+        ledger.record("ALERT-1", [(recipients[1][1], "failed", "late duplicate report")])
+        status = ledger.status("ALERT-1")
+        if reclaimed == [recipients[0]] and status["sent"] == len(recipients) - 1:
+            print_pass(f"Reclaimed {reclaimed[0][1]}; {status['sent']} stay sent")
+            passed += 1
+        else:
+            print_fail("Reclaimed", reclaimed, [recipients[0]])
+            failed += 1
+        print()
+        
+        print_test_case("A rerun of a sent alert is refused; a confirmed resend goes out")
+        session = {}
+        alert = {"phone": [r for _, r in recipients[:3]], "email": []}
+        base = alert_key("Boil water notice.", "City Water", alert)
+        first = alert_key("Boil water notice.", "City Water", alert, send_nonce(session, base))
+        ledger.claim(first, channel_recipients(alert))
+        mark_send_used(session)
+        ledger.record(first, [(r, "sent", None) for r in alert["phone"]])
+        rerun = alert_key("Boil water notice.", "City Water", alert, send_nonce(session, base))
+        refused = ledger.claim(rerun, channel_recipients(alert))
+        resend = alert_key("Boil water notice.", "City Water", alert, send_nonce(session, base, resend=True))
+        resent = ledger.claim(resend, channel_recipients(alert))
+        mark_send_used(session)
+        repeat = send_nonce(session, base, resend=True)
+        if (rerun == first and not refused and len(resent) == 3
+                and alert_key("Boil water notice.", "City Water", alert, repeat) == resend):
+            print_pass(f"Rerun refused; resend claimed {len(resent)} recipients under a new key")
+            passed += 1
+        else:
+            print_fail("Claims (rerun, resend)", (len(refused), len(resent)), (0, 3))
+            failed += 1
+        print()
+        ledger.close()
+    
+    return passed, failed
+
+def test_audit_log():
+    """Test the hash-chained audit log across segment rotation"""
+    print_header("Audit Log Tests")
+    
+    passed = 0
+    failed = 0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        audit = AuditLog(tmp, segment_bytes=2048, fsync_seconds=0)
+        for i in range(40):
+            audit.append("delivery", f"MSG-{i % 10}", {"attempt": i // 10})
+        head = audit.head()
+        
+        print_test_case("Records in sealed and active segments are found by message_id")
+        found = audit.find("MSG-3")
+        segments = len(audit.segments())
+        if segments > 1 and [r["data"]["attempt"] for r in found] == [0, 1, 2, 3]:
+            print_pass(f"{len(found)} records for MSG-3 across {segments} segments")
+            passed += 1
+        else:
+            print_fail("Attempts found", [r["data"]["attempt"] for r in found], [0, 1, 2, 3])
+            failed += 1
+        print()
+        audit.close()
+        
+        print_test_case("The chain verifies, survives reopening and detects an edit")
+        reopened = AuditLog(tmp, segment_bytes=2048, fsync_seconds=0)
+        reopened.append("delivery", "MSG-10")
+        reopened.close()
+        intact = verify(tmp)
+        segment = reopened.segments()[0]
+        data = segment.read_bytes()
+        segment.write_bytes(data.replace(b'"attempt":0', b'"attempt":9', 1))
+        tampered = verify(tmp)
+        if intact["ok"] and intact["records"] == 41 and head["seq"] == 40 and not tampered["ok"]:
+            print_pass(f"{intact['records']} records verified; edit reported: {tampered['error']}")
+            passed += 1
+        else:
+            print_fail("Verification", (intact["ok"], tampered["ok"]), (True, False))
+            failed += 1
+        print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        print_test_case("Read-only queries leave a live writer's segment and index untouched")
+        writer = AuditLog(tmp, segment_bytes=4096, fsync_every=8, fsync_seconds=0)
+        reader = AuditReader(tmp)
+        seen = []
+        for i in range(70):
+            writer.append("delivery", f"MSG-{i % 7}")
+            if i % 10 == 9:
+                seen.append(len(reader.find("MSG-3")))
+                list(reader.between(0, float("inf")))
+        writer.sync()
+        active = writer.segments()[-1]
+        with open(active, "ab") as handle:
+            handle.write(b"torn")  # a half-written record the reader must not repair
+        found = reader.find("MSG-3")
+        in_range = list(reader.between(0, float("inf")))
+        head = reader.head()
+        indexed = sum(os.path.getsize(p.with_suffix(".idx")) for p in writer.segments()) // 24
+        torn_kept = active.read_bytes().endswith(b"torn")
+        writer.close()
+        if (len(found) == 10 and len(in_range) == 70 and head["seq"] == 70 and indexed == 70
+                and torn_kept and seen == sorted(seen)):
+            print_pass(f"{len(in_range)} records read, {indexed} index entries, torn tail left alone")
+            passed += 1
+        else:
+            print_fail("Found / in range / index entries", (len(found), len(in_range), indexed), (10, 70, 70))
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_geo_index():
+    """Test area resolution against a brute-force scan of the contacts"""
+    print_header("Geo Index Tests")
+    
+    passed = 0
+    failed = 0
+    
+    contacts = [
+        Contact(f"Contact {i}", f"+1555{i:07d}", "", 37.70 + (i % 40) * 0.005, -122.50 + (i // 40) * 0.005,
+                ("Harbor",) if i % 7 == 0 else ())
+        for i in range(1600)
+    ]
+    polygon = [[37.72, -122.48], [37.80, -122.46], [37.76, -122.36]]
+    areas = [
+        {"name": "Downtown", "center": [37.79, -122.40], "radius_km": 2.0, "aliases": ["city center"]},
+        {"name": "Mission Flats", "polygon": polygon},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        geo = GeoIndex(os.path.join(tmp, "contacts.csv"), os.path.join(tmp, "gazetteer.json"))
+        geo.build(contacts, areas)
+        
+        print_test_case("Radius, polygon and zone areas match a full scan")
+        expected = {
+            "downtown": [i for i, c in enumerate(contacts) if haversine_km(37.79, -122.40, c.lat, c.lon) <= 2.0],
+            "mission flats": [i for i, c in enumerate(contacts) if _in_polygon(c.lat, c.lon, polygon)],
+            "harbor": [i for i, c in enumerate(contacts) if "Harbor" in c.zones],
+        }
+        mismatched = [name for name, members in expected.items() if geo.resolve(name) != members]
+        if not mismatched and all(expected.values()):
+            print_pass(", ".join(f"{name}: {len(members)}" for name, members in expected.items()))
+            passed += 1
+        else:
+            print_fail("Areas differing from the scan", mismatched, [])
+            failed += 1
+        print()
+        
+        print_test_case("Areas named in the text, nearest the location phrase first")
+        found = [area["name"] for area in geo.detect_areas(
+            "Gas leak near the harbor. Avoid the city center until noon.", location_hint="city center")]
+        if found == ["Downtown", "Harbor"]:
+            print_pass(f"Detected: {found}")
+            passed += 1
+        else:
+            print_fail("Detected areas", found, ["Downtown", "Harbor"])
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_wea_segmenter():
+    """Test WEA segment limits, numbering and headers"""
+    print_header("WEA Segmenter Tests")
+    
+    passed = 0
+    failed = 0
+    
+    segmenter = WEASegmenter()
+    sentences = [f"Shelter {i} at the Lincoln High School gym is open to residents of zone {i} with pets."
+                 for i in range(1, 60)]
+    message = "County Emergency Management: Flood warning for the river valley. " + " ".join(sentences)
+    segments = segmenter.split(message, {"source": "County Emergency Management", "hazard": "Flood"})
+    
+    print_test_case("Every segment fits the limit, numbered past the counter widening")
+    total = len(segments)
+    numbered = all(segment.startswith(f"({i}/{total}) ") for i, segment in enumerate(segments, 1))
+    longest = max(len(segment) for segment in segments)
+    if total >= 10 and numbered and longest <= WEA_LONG_LIMIT:
+        print_pass(f"{total} segments, longest {longest} characters")
+        passed += 1
+    else:
+        print_fail("Segments (count, numbered, longest)", (total, numbered, longest),
+                   (">= 10", True, f"<= {WEA_LONG_LIMIT}"))
+        failed += 1
+    print()
+    
+    print_test_case("Continuations repeat the header and keep every sentence in order")
+    header = "County Emergency Management - Flood: "
+    bodies = [segment.split(") ", 1)[1] for segment in segments]
+    rejoined = " ".join([bodies[0]] + [body[len(header):] for body in bodies[1:]])
+    if all(body.startswith(header) for body in bodies[1:]) and rejoined == message:
+        print_pass(f"Header: {header.strip()}")
+        passed += 1
+    else:
+        print_fail("Rejoined segments match the message", rejoined == message, True)
+        failed += 1
+    print()
+    
+    return passed, failed
+
+def test_analyzer_routing():
+    """Test the scoring analyzers the app builds against the TESTING.md reference messages"""
+    print_header("Analyzer Routing Tests")
+    
+    analyzers = build_analyzers("rules/en.json", "rules/es.json")
+    passed = 0
+    failed = 0
+    
+    for test_id, test_data in test_messages.items():
+        print_test_case(f"{test_data['description']} FEMA elements")
+        routed = select_analyzers(detect_language(test_data['text']), analyzers)
+        detected = routed["fema"].analyze(test_data['text'])['elements_present']
+        if detected == test_data['expected_fema']:
+            print_pass(f"Detected {detected} FEMA elements")
+            passed += 1
+        else:
+            print_fail("FEMA elements count", detected, test_data['expected_fema'])
+            failed += 1
+        print()
+    
+    print_test_case("Recorded version names what produced the result")
+    spanish = select_analyzers("es", analyzers)
+    versions = (analysis_version(analyzers), analysis_version(spanish))
+    if versions == (BUILTIN_ANALYSIS_VERSION, spanish["rules"].version):
+        print_pass(f"English: {versions[0]}, Spanish: {versions[1]}")
+        passed += 1
+    else:
+        print_fail("Versions", versions, (BUILTIN_ANALYSIS_VERSION, spanish["rules"].version))
+        failed += 1
+    print()
+    
+    return passed, failed
+
+def test_corpus_linter():
+    """Test template extraction and analysis-error reports in the corpus linter"""
+    print_header("Corpus Linter Tests")
+    
+    passed = 0
+    failed = 0
+    
+    class FailingAnalyzer:
+        def analyze(self, message):
+            raise ValueError("analyzer crashed")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        library = os.path.join(tmp, "library.json")
+        with open(library, "w", encoding="utf-8") as handle:
+            json.dump({"templates": [
+                {"id": "flood", "text": "{agency}: Flood warning for {area}.", "sample": {"agency": "County EM"}},
+            ]}, handle)
+        
+        print_test_case("Slots are filled from sample values; unfilled ones are noted")
+        messages = corpus_linter.extract_messages(Path(library))
+        if (messages[0]["text"] == "County EM: Flood warning for [area]."
+                and messages[0]["notes"] == ["No sample value for slot(s): area"]):
+            print_pass(f"{messages[0]['label']}: {messages[0]['text']}")
+            passed += 1
+        else:
+            print_fail("Extracted message", messages, "County EM: Flood warning for [area].")
+            failed += 1
+        print()
+        
+        print_test_case("An analysis error is reported with no score and is not cached")
+        previous = corpus_linter._ANALYZERS
+        corpus_linter._ANALYZERS = {"fema": FailingAnalyzer(), "wea": FailingAnalyzer(),
+                                    "readability": FailingAnalyzer(), "confusion": FailingAnalyzer()}
+        try:
+            report = corpus_linter.lint_file(library)
+        finally:
+            corpus_linter._ANALYZERS = previous
+        message = report["messages"][0]
+        if message["score"] is None and message["failures"] and not corpus_linter.cacheable(report):
+            print_pass(message["failures"][0])
+            passed += 1
+        else:
+            print_fail("Score / cacheable", (message.get("score"), corpus_linter.cacheable(report)), (None, False))
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_bilingual_pair():
+    """Test that a bilingual pair is scored as one unit and gated on its weaker message"""
+    print_header("Bilingual Pair Tests")
+    
+    passed = 0
+    failed = 0
+    
+    class StubScorer:
+        def calculate_overall_score(self, analysis):
+            score = analysis["score"]
+            return {"overall_score": score, "safety_level": "SAFE" if score >= 70 else "UNSAFE",
+                    "is_ready_to_send": score >= 70}
+    
+    scores = {
+        "Tsunami warning for Waikiki. Move to higher ground now.": 90,
+        "Alerta de tsunami para Waikiki. Suba a terreno alto ahora.": 85,
+        "Alerta de tsunami.": 40,
+    }
+    analyze = lambda text: {"score": scores[text], "language": "es" if text.startswith("Alerta") else "en"}
+    
+    test_cases = [
+        ("Tsunami warning for Waikiki. Move to higher ground now.",
+         "Alerta de tsunami para Waikiki. Suba a terreno alto ahora.", 85, True, "Both messages pass"),
+        ("Tsunami warning for Waikiki. Move to higher ground now.",
+         "Alerta de tsunami.", 40, False, "Weak translation blocks the pair"),
+    ]
+    
+    for primary, secondary, expected_score, expected_ready, name in test_cases:
+        print_test_case(name)
+        pair = analyze_pair(primary, secondary, analyze, StubScorer())
+        if (pair["overall_score"] == expected_score and pair["is_ready_to_send"] == expected_ready
+                and pair["languages"] == ["en", "es"]):
+            print_pass(f"Score: {pair['overall_score']}, ready: {pair['is_ready_to_send']}")
+            passed += 1
+        else:
+            print_fail("Pair", (pair["overall_score"], pair["is_ready_to_send"]), (expected_score, expected_ready))
+            failed += 1
+        print()
+    
+    pack = RulePackManager("rules/es.json", cache_dir=None).current
+    location_cases = [
+        ("Bomberos: este incendio obliga a evacuar ahora.", False, "Demonstrative 'este'"),
+        ("Bomberos: incendio al este del río. Evacúe ahora.", True, "Cardinal 'al este'"),
+    ]
+    
+    for message, expected, name in location_cases:
+        print_test_case(name)
+        location = bool(pack.match_fema(message)["location"])
+        if location == expected:
+            print_pass(f"Location: {location}")
+            passed += 1
+        else:
+            print_fail("Location", location, expected)
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def test_what_if_simulator():
+    """Test that what-if scores come from the scorer built with the trial weights"""
+    print_header("What-If Simulator Tests")
+    
+    passed = 0
+    failed = 0
+    
+    calls = []
+    
+    class StubAnalyzer:
+        def __init__(self, name):
+            self.name = name
+        
+        def analyze(self, message):
+            calls.append(self.name)
+            text = str(message)
+            return {"score": 100.0 if self.name in text.lower() else 50.0,
+                    "elements_present": 1 if "gate" in text else 5}
+    
+    class StubScorer:
+        """Weighted sum with a FEMA gate that caps the score, like the app's scorer"""
+        def __init__(self, weights, threshold):
+            self.weights = weights
+            self.threshold = threshold
+        
+        def calculate_overall_score(self, analysis):
+            score = round(sum(self.weights[name] * analysis[name]["score"] for name in self.weights), 1)
+            gate = analysis["fema"]["elements_present"] >= 3
+            if not gate:
+                score = min(score, 40.0)
+            return {"overall_score": score, "is_ready_to_send": gate and score >= self.threshold,
+                    "fema_gate_passed": gate, "min_threshold": self.threshold}
+    
+    analyzers = {name: StubAnalyzer(name) for name in what_if_simulator.COMPONENTS}
+    analyzers["scorer"] = StubScorer(what_if_simulator.APP_WEIGHTS, 75)
+    simulator = what_if_simulator.WhatIfSimulator(analyzers, make_scorer=StubScorer)
+    simulator.add_messages([
+        ("A-1", "fema wea readability confusion"),
+        ("A-2", "fema only"),
+        ("A-3", "fema wea readability confusion gate"),
+    ])
+    
+    print_test_case("Scores come from the scorer, gate and cap included")
+    scores = simulator.scores([[0.4, 0.2, 0.2, 0.2], [1.0, 0.0, 0.0, 0.0]])
+    expected = [[100.0, 100.0], [70.0, 100.0], [40.0, 40.0]]
+    if scores.tolist() == expected:
+        print_pass(f"Scores: {scores.tolist()}")
+        passed += 1
+    else:
+        print_fail("Scores", scores.tolist(), expected)
+        failed += 1
+    print()
+    
+    print_test_case("Status changes between weight sets")
+    changes = simulator.status_changes({"fema": 1.0}, 75)
+    ready = simulator.readiness([[0.4, 0.2, 0.2, 0.2]], [60, 75])
+    if ([row["alert_id"] for row in changes["newly_ready"]] == ["A-2"] and not changes["newly_blocked"]
+            and ready[:, 0, :].tolist() == [[True, True], [True, False], [False, False]]):
+        print_pass(f"Newly ready: A-2; ready rate {changes['new_ready_rate']:.0%}")
+        passed += 1
+    else:
+        print_fail("Changes", changes, "A-2 newly ready")
+        failed += 1
+    print()
+    
+    print_test_case("Cached results are reused unless the analyzers changed")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "what_if.json")
+        simulator.save_cache(cache)
+        reloaded = what_if_simulator.WhatIfSimulator(analyzers, make_scorer=StubScorer)
+        loaded = reloaded.load_cache(cache)
+        calls.clear()
+        added = reloaded.add_messages([("A-1", "fema wea readability confusion"), ("A-4", "wea")])
+        with open(cache, encoding="utf-8") as f:
+            data = json.load(f)
+        for row in data["rows"]:
+            row["results"]["rule_pack_version"] = "en-2000.1"
+        with open(cache, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        stale = what_if_simulator.WhatIfSimulator(analyzers, make_scorer=StubScorer).load_cache(cache)
+    if loaded == 3 and added == 1 and len(calls) == 4 and stale == 0:
+        print_pass(f"Loaded {loaded}, analyzed 1 new message, dropped {3 - stale} stale rows")
+        passed += 1
+    else:
+        print_fail("Cache", (loaded, added, len(calls), stale), (3, 1, 4, 0))
+        failed += 1
+    print()
+    
+    return passed, failed
+
+def test_result_types():
+    """Test that compact results round-trip to the original dicts"""
+    print_header("Compact Result Types Tests")
+    
+    passed = 0
+    failed = 0
+    
+    analysis = {
+        "fema": {"source": True, "hazard": True, "location": False, "time": False, "instruction": True,
+                 "elements_present": 3, "missing_elements": ["Location", "Time"],
+                 "compliance_percentage": 60.0, "matched_phrases": {"source": ["NWS"]},
+                 "rule_pack_version": "en-builtin"},
+        "wea": {"character_count": 52, "compliant_90": True, "compliant_360": True, "chars_over_long": 0,
+                "recommendation": "Fits in a standard 90-character WEA"},
+        "readability": {"average_grade_level": 5.2, "is_compliant": True, "compliance_score": 100,
+                        "flesch_kincaid_grade": 4.9, "flesch_reading_ease": 78.1, "gunning_fog_index": 6.0,
+                        "smog_index": 5.1, "automated_readability_index": 4.8, "recommendations": []},
+        "confusion": {"risk_score": 20, "compliance_score": 80,
+                      "identified_issues": [{"type": "Vague time", "text": "soon", "reason": "No clock time",
+                                             "start": 30, "end": 34}],
+                      "recommendations": ["Give a clock time"], "confidence": 0.9},
+        "alert_type": {"primary_type": "flood", "checks": []},
+        "language": "en",
+        "rule_pack_version": "en-builtin",
+    }
+    overall = {"overall_score": 71.5, "safety_level": "NEEDS REVIEW", "is_ready_to_send": False,
+               "component_scores": {"fema": 60.0, "wea": 100.0, "readability": 100.0, "confusion": 80.0},
+               "priority_fixes": [{"issue": "Add a location", "impact": "high"}], "min_threshold": 75}
+    delivery = {"success": True, "message": "Sent", "message_id": "MSG-1", "recipient_count": 2,
+                "sender": "County EM", "method": "Email",
+                "email_delivery_status": {"attempted": True, "details": [
+                    {"recipient": "a@example.org", "status": "sent"},
+                    {"recipient": "b@example.org", "status": "failed", "error": "421 Try again"}]}}
+    
+    print_test_case("Analysis results round-trip")
+    compact = compact_analysis(analysis)
+    if (expand_analysis(compact) == analysis and isinstance(compact["fema"], CompactResult)
+            and compact["confusion"]["identified_issues"][0]["text"] == "soon"
+            and compact["confusion"]["confidence"] == 0.9 and compact_analysis(compact)["wea"] is compact["wea"]):
+        print_pass("expand_analysis(compact_analysis(x)) == x; unknown keys kept")
+        passed += 1
+    else:
+        print_fail("Round trip", expand_analysis(compact), analysis)
+        failed += 1
+    print()
+    
+    print_test_case("Overall score and delivery result round-trip through pickle and JSON")
+    compact_score = pickle.loads(pickle.dumps(compact_overall(overall)))
+    compact_result = compact_delivery(delivery)
+    if (expand_overall(compact_score) == overall
+            and json.loads(json.dumps(compact_result.to_dict())) == delivery
+            and compact_result["email_delivery_status"]["details"][1].get("error") == "421 Try again"):
+        print_pass(f"Score {compact_score['overall_score']}; {len(compact_result['email_delivery_status']['details'])} delivery details")
+        passed += 1
+    else:
+        print_fail("Round trip", (expand_overall(compact_score), compact_result), (overall, delivery))
+        failed += 1
+    print()
+    
+    print_test_case("Compact results are read-only")
+    try:
+        compact["fema"].source = False
+        print_fail("Read-only", "assignment allowed", "AttributeError")
+        failed += 1
+    except AttributeError:
+        print_pass("Assignment rejected")
+        passed += 1
+    print()
+    
+    return passed, failed
+
+def test_text_preprocessor():
+    """Test shared tokenization, offsets, sentence spans and digests"""
+    print_header("Text Preprocessor Tests")
+    
+    passed = 0
+    failed = 0
+    
+    print_test_case("Tokens are lower-cased and offsets index the original text")
+    text = "NWS: Don't drive into 2 ft of water_level. Café closed."
+    prepared = prepare(text)
+    originals = [prepared.token_at(i) for i in range(len(prepared.tokens))]
+    if (prepared.tokens == ("nws", "don't", "drive", "into", "2", "ft", "of", "water", "level", "café", "closed")
+            and originals == [text[start:end] for start, end in prepared.offsets]
+            and originals[1] == "Don't" and prepared.word_count == 10):
+        print_pass(f"{len(prepared.tokens)} tokens, {prepared.word_count} words")
+        passed += 1
+    else:
+        print_fail("Tokens", (prepared.tokens, originals), "lower-cased tokens over original spans")
+        failed += 1
+    print()
+    
+    sentence_cases = [
+        ("Flooding on St. Mary's Rd. near the school. Evacuate now!",
+         ["Flooding on St. Mary's Rd. near the school.", "Evacuate now!"], "Saint and road abbreviations"),
+        ("Shelter in place until 6 p.m. tonight. Stay indoors.",
+         ["Shelter in place until 6 p.m. tonight.", "Stay indoors."], "p.m. inside a sentence"),
+        ("Shelter until 6 p.m. Move inland if you can.",
+         ["Shelter until 6 p.m.", "Move inland if you can."], "p.m. closing a sentence"),
+        ("Avoid 5th St. Use Hwy. 1 instead.",
+         ["Avoid 5th St.", "Use Hwy. 1 instead."], "Street name closing a sentence"),
+        ("Expect 2.5 inches of rain. Visit weather.gov or call the U.S. Coast Guard.",
+         ["Expect 2.5 inches of rain.", "Visit weather.gov or call the U.S. Coast Guard."], "Decimals, domains, initialisms"),
+        ('Officials said "Leave now." ¿Está listo? ¡Evacúe ahora!',
+         ['Officials said "Leave now."', "¿Está listo?", "¡Evacúe ahora!"], "Closing quotes and Spanish marks"),
+    ]
+    
+    for text, expected, name in sentence_cases:
+        print_test_case(name)
+        prepared = prepare(text)
+        sentences = prepared.sentence_texts()
+        spans_ok = all(text[start:end] == sentence for (start, end), sentence in zip(prepared.sentences, sentences))
+        if sentences == expected and spans_ok and prepared.sentence_count == len(expected):
+            print_pass(f"{len(sentences)} sentence(s)")
+            passed += 1
+        else:
+            print_fail("Sentences", sentences, expected)
+            failed += 1
+        print()
+    
+    print_test_case("Digest identifies the exact text; prepare() is reused")
+    first = prepare("Evacuate now.")
+    if (first.digest == PreparedText("Evacuate now.").digest and first.digest != prepare("Evacuate now!").digest
+            and prepare("Evacuate now.") is first and prepare(first) is first and first == "Evacuate now."):
+        print_pass(f"Digest {first.digest}")
+        passed += 1
+    else:
+        print_fail("Digest", first.digest, "stable per text, cached instance reused")
+        failed += 1
+    print()
+    
+    return passed, failed
+
+def test_load_test():
+    """Test load test capacity rows, recommendation and curve output"""
+    print_header("Load Test Harness Tests")
+    # load_test reads resource usage through the Unix-only resource module
+    import load_test
+    
+    passed = 0
+    failed = 0
+    
+    class _App:
+        @staticmethod
+        def run_analysis(text, analyzers):
+            if text.startswith("Fail"):
+                raise ValueError("analysis failed")
+            return {"text": text}
+    
+    class _Scorer:
+        def calculate_overall_score(self, results):
+            return {"overall_score": 80}
+    
+    def _harness(messages):
+        # Built without __init__: no app import, SMTP sink or working-directory change
+        harness = load_test.LoadTest.__new__(load_test.LoadTest)
+        harness.delivery, harness.keystrokes, harness.think_time, harness.seed = "none", 2, 0.001, 1
+        harness.messages, harness.app, harness.analyzers = messages, _App(), {"scorer": _Scorer()}
+        harness.coordinator = harness.sink = None
+        return harness
+    
+    print_test_case("Concurrency level reports throughput, tail latency and errors")
+    row = _harness(["Evacuate now."]).run_level(concurrency=3, duration=0.2)
+    failing = _harness(["Fail to shelter."]).run_level(concurrency=2, duration=0.1)
+    if (row["concurrency"] == 3 and row["analysis_count"] > 0 and row["analysis_errors"] == 0
+            and row["delivery_count"] == 0 and 0 <= row["analysis_p50_ms"] <= row["analysis_p99_ms"]
+            and failing["analysis_errors"] == failing["analysis_count"] > 0):
+        print_pass(f"{row['analysis_count']} analyses at p95 {row['analysis_p95_ms']} ms; "
+                   f"{failing['analysis_errors']} failures counted")
+        passed += 1
+    else:
+        print_fail("Level row", (row, failing), "analyses counted, failures as errors")
+        failed += 1
+    print()
+    
+    print_test_case("Recommendation is the largest level within the SLO and error-free")
+    rows = [
+        {"concurrency": 4, "analysis_p95_ms": 120.0, "analysis_errors": 0, "cpu_cores": 0.9, "rss_mb": 80.0},
+        {"concurrency": 8, "analysis_p95_ms": 380.0, "analysis_errors": 0, "cpu_cores": 1.8, "rss_mb": 95.0},
+        {"concurrency": 16, "analysis_p95_ms": 390.0, "analysis_errors": 3, "cpu_cores": 2.0, "rss_mb": 110.0},
+        {"concurrency": 32, "analysis_p95_ms": 900.0, "analysis_errors": 0, "cpu_cores": 2.0, "rss_mb": 140.0},
+    ]
+    summary = load_test.recommend(rows, slo_ms=400)
+    if (summary["max_sessions_per_instance"] == 8 and summary["rss_mb_at_max"] == 95.0
+            and load_test.recommend(rows, slo_ms=50)["max_sessions_per_instance"] == 0
+            and load_test.percentile([5.0, 1.0, 3.0, 2.0, 4.0], 50) == 3.0 and load_test.percentile([], 95) == 0.0):
+        print_pass(f"{summary['max_sessions_per_instance']} sessions per instance at p95 <= 400 ms")
+        passed += 1
+    else:
+        print_fail("Recommendation", summary, "8 sessions")
+        failed += 1
+    print()
+    
+    print_test_case("Capacity curve written as CSV and JSON")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, json_path = os.path.join(tmp, "curve.csv"), os.path.join(tmp, "curve.json")
+        load_test.write_curve(rows, summary, csv_path)
+        load_test.write_curve(rows, summary, json_path)
+        with open(csv_path, encoding="utf-8") as f:
+            csv_rows = f.read().splitlines()
+        with open(json_path, encoding="utf-8") as f:
+            curve = json.load(f)
+    if (csv_rows[0].startswith("concurrency,") and len(csv_rows) == len(rows) + 1
+            and curve["levels"] == rows and curve["recommendation"] == summary):
+        print_pass(f"{len(rows)} levels in each format")
+        passed += 1
+    else:
+        print_fail("Curve output", (csv_rows[:2], curve.get("recommendation")), "header + rows, same JSON")
+        failed += 1
+    print()
+    
+    return passed, failed
+
+def test_email_service():
+    """Test Email Service Configuration"""
+    print_header("Email Service Configuration Check")
+    
+    passed = 0
+    failed = 0
+    
+    # Check if environment variables are set
+    sender_email = os.getenv("SENDER_EMAIL", "")
+    sender_password = os.getenv("SENDER_PASSWORD", "")
+    smtp_server = os.getenv("SMTP_SERVER", "")
+    
+    print_test_case("Email Service Configuration")
+    
+    if sender_email:
+        print_pass(f"SENDER_EMAIL configured: {sender_email}")
+        passed += 1
+    else:
+        print_fail("SENDER_EMAIL not configured")
+        failed += 1
+    
+    if sender_password:
+        print_pass(f"SENDER_PASSWORD configured (hidden)")
+        passed += 1
+    else:
+        print_fail("SENDER_PASSWORD not configured")
+        failed += 1
+    
+    if smtp_server:
+        print_pass(f"SMTP_SERVER configured: {smtp_server}")
+        passed += 1
+    else:
+        print_info("SMTP_SERVER using default: smtp.gmail.com")
+    
+    print()
+    return passed, failed
+
+def test_edge_cases():
+    """Test Edge Cases"""
+    print_header("Edge Case Tests")
+    
+    analyzer = ReadabilityAnalyzer()
+    wea = WEAAnalyzer()
+    passed = 0
+    failed = 0
+    
+    edge_tests = {
+        "empty_string": {
+            "text": "",
+            "description": "Empty Message"
+        },
+        "only_numbers": {
+            "text": "123 456 789",
+            "description": "Only Numbers"
+        },
+        "only_symbols": {
+            "text": "!!! ### $$$",
+            "description": "Only Symbols"
+        },
+        "very_long": {
+            "text": "Warning " * 100,
+            "description": "Very Long Message (800+ chars)"
+        }
+    }
+    
+    for test_id, test_data in edge_tests.items():
+        print_test_case(test_data['description'])
+        try:
+            result = analyzer.analyze(test_data['text'])
+            result_wea = wea.analyze(test_data['text'])
+            print_pass(f"Handled without errors")
+            print_info(f"Characters: {result_wea['character_count']}")
+            if test_data['text']:
+                print_info(f"Grade: {result['flesch_kincaid_grade']:.2f}")
+            passed += 1
+        except Exception as e:
+            print_fail(f"Error handling edge case: {str(e)}")
+            failed += 1
+        print()
+    
+    return passed, failed
+
+def main():
+    """Run all tests and generate report"""
+    print_header("AI Message Compliance Checker - Comprehensive Test Suite")
+    
+    print(f"{Colors.BOLD}Running all functional tests...{Colors.END}\n")
+    
+    total_passed = 0
+    total_failed = 0
+    
+    # Run all test suites
+    p, f = test_fema_analyzer()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_wea_analyzer()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_readability_analyzer()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_confusion_detector()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_confusion_index()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_alert_type_classifier()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_sms_encoding()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_safety_scorer()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_score_explanation()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_history_index()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_async_email_transport()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_retry_scheduler()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_template_library()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_edit_search()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_near_duplicate_index()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_background_analysis()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_throughput_estimator()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_delivery_coordinator_resume()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_delivery_coordinator_batching()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_spanish_rule_pack()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_send_ledger()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_audit_log()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_geo_index()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_wea_segmenter()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_analyzer_routing()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_corpus_linter()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_bilingual_pair()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_what_if_simulator()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_result_types()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_text_preprocessor()
+    total_passed += p
+    total_failed += f
+    
+    p, f = test_load_test()
     total_passed += p
     total_failed += f
     
@@ -0,0 +1,347 @@
+"""
+Async Email Transport
+asyncio SMTP client with persistent, pipelined connections for bulk alert delivery
+"""
+
+import asyncio
+import base64
+import os
+import ssl
+from collections import OrderedDict
+from typing import Optional
+
+from utils.delivery_coordinator import TransportConfigurationError
+from utils.prepared_email import SMTP_MAX_RECIPIENTS, PreparedAlertEmail, group_envelopes
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SENDER_EMAIL = os.getenv("SENDER_EMAIL", "")
+SENDER_PASSWORD = os.getenv("SENDER_PASSWORD", "")
+
+
+class SMTPResponseError(Exception):
+    """Server answered with an unexpected status code"""
+
+    def __init__(self, code: int, text: str):
+        super().__init__(f"{code} {text}")
+        self.code = code
+        self.text = text
+
+
+class AsyncSMTPConnection:
+    """One SMTP session: EHLO, optional STARTTLS and AUTH, then many transactions"""
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 starttls: bool = True, implicit_tls: bool = False,
+                 ssl_context: Optional[ssl.SSLContext] = None, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.implicit_tls = implicit_tls
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.timeout = timeout
+        self.extensions: dict[str, str] = {}
+        self.messages_sent = 0
+        # Set once the message body is on the wire; after that a failure has an unknown outcome
+        self.data_started = False
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _read_reply(self) -> tuple[int, str]:
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                raise ConnectionError("SMTP server closed the connection")
+            text = line.decode("utf-8", "replace").rstrip("\r\n")
+            lines.append(text[4:])
+            if len(text) < 4 or text[3] != "-":
+                return int(text[:3]), "\n".join(lines)
+
+    async def _command(self, line: str, expect: tuple = (250,)) -> tuple[int, str]:
+        self._writer.write(line.encode("utf-8") + b"\r\n")
+        await self._writer.drain()
+        code, text = await self._read_reply()
+        if code not in expect:
+            raise SMTPResponseError(code, text)
+        return code, text
+
+    async def _ehlo(self) -> None:
+        _, text = await self._command("EHLO alert-checker.local")
+        self.extensions = {}
+        for line in text.split("\n")[1:]:
+            name, _, params = line.partition(" ")
+            self.extensions[name.upper()] = params
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port,
+                ssl=self.ssl_context if self.implicit_tls else None,
+            ),
+            self.timeout,
+        )
+        code, text = await self._read_reply()
+        if code != 220:
+            raise SMTPResponseError(code, text)
+        await self._ehlo()
+
+        if self.starttls and not self.implicit_tls:
+            if "STARTTLS" not in self.extensions:
+                # Never fall back to plaintext: a stripped STARTTLS would expose the AUTH credentials
+                await self.close()
+                raise SMTPResponseError(530, f"{self.host} did not offer STARTTLS")
+            await self._command("STARTTLS", expect=(220,))
+            # TLS is negotiated once per pooled connection and reused for every message
+            await self._start_tls()
+            await self._ehlo()
+
+        if self.username and self.password:
+            await self._login()
+
+    async def _start_tls(self) -> None:
+        if hasattr(self._writer, "start_tls"):
+            await self._writer.start_tls(self.ssl_context, server_hostname=self.host)
+            return
+        # StreamWriter.start_tls is Python 3.11+; older interpreters upgrade the transport on
+        # the loop and point the existing writer at it, as start_tls itself does
+        protocol = self._writer.transport.get_protocol()
+        transport = await asyncio.wait_for(
+            asyncio.get_running_loop().start_tls(
+                self._writer.transport, protocol, self.ssl_context, server_hostname=self.host
+            ),
+            self.timeout,
+        )
+        self._writer._transport = transport
+        protocol._over_ssl = True
+
+
+    async def _login(self) -> None:
+        mechanisms = self.extensions.get("AUTH", "").upper().split()
+        if "PLAIN" not in mechanisms and "LOGIN" not in mechanisms:
+            # Sending credentials to a server that did not ask for them (or cannot take them) never works
+            await self.close()
+            offered = f"only {' '.join(mechanisms)}" if mechanisms else "no AUTH"
+            raise TransportConfigurationError(
+                f"{self.host} offers {offered} (PLAIN or LOGIN needed); remove the SMTP credentials "
+                "or use the server's authenticated submission port"
+            )
+        if "PLAIN" in mechanisms:
+            token = base64.b64encode(f"\0{self.username}\0{self.password}".encode()).decode()
+            await self._command(f"AUTH PLAIN {token}", expect=(235,))
+        else:
+            await self._command("AUTH LOGIN", expect=(334,))
+
+            await self._command(base64.b64encode(self.username.encode()).decode(), expect=(334,))
+            await self._command(base64.b64encode(self.password.encode()).decode(), expect=(235,))
+
+    async def send(self, mail_from: str, recipients: list[str], data: bytes) -> dict[str, dict]:
+        """One SMTP transaction; returns {recipient: {"status", "error"?}}
+
+        With PIPELINING the MAIL, RCPT and DATA commands go out in one write and
+        the replies are read back in order (RFC 2920).
+        """
+        self.data_started = False
+        commands = [f"MAIL FROM:<{mail_from}>"] + [f"RCPT TO:<{r}>" for r in recipients] + ["DATA"]
+        if "PIPELINING" in self.extensions:
+            self._writer.write("".join(c + "\r\n" for c in commands).encode("utf-8"))
+            await self._writer.drain()
+            replies = [await self._read_reply() for _ in commands]
+        else:
+            replies = []
+            for command in commands:
+                self._writer.write(command.encode("utf-8") + b"\r\n")
+                await self._writer.drain()
+                replies.append(await self._read_reply())
+                if command.startswith("MAIL") and replies[-1][0] != 250:
+                    break
+
+        mail_code, mail_text = replies[0]
+        if mail_code != 250:
+            await self._reset()
+            return {r: {"status": "failed", "error": f"{mail_code} {mail_text}"} for r in recipients}
+
+        results, accepted = {}, []
+        for recipient, (code, text) in zip(recipients, replies[1:len(recipients) + 1]):
+            if code in (250, 251):
+                accepted.append(recipient)
+                results[recipient] = {"status": "sent"}
+            else:
+                results[recipient] = {"status": "failed", "error": f"{code} {text}"}
+
+        data_code, data_text = replies[-1] if len(replies) == len(commands) else (503, "DATA not sent")
+        if data_code != 354:
+            await self._reset()
+            for recipient in accepted:
+                results[recipient] = {"status": "failed", "error": f"{data_code} {data_text}"}
+            return results
+
+        self.data_started = True
+        self._writer.write(_dot_stuff(data) + b".\r\n")
+        await self._writer.drain()
+        code, text = await self._read_reply()
+        if code != 250:
+            for recipient in accepted:
+                results[recipient] = {"status": "failed", "error": f"{code} {text}"}
+        self.messages_sent += 1
+        return results
+
+    async def _reset(self) -> None:
+        try:
+            await self._command("RSET")
+        except (SMTPResponseError, ConnectionError, asyncio.TimeoutError):
+            await self.close()
+
+    async def close(self) -> None:
+        if not self.connected:
+            return
+        try:
+            self._writer.write(b"QUIT\r\n")
+            await self._writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError, ssl.SSLError):
+            pass
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    data = data.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+    if data.startswith(b"."):
+        data = b"." + data
+    data = data.replace(b"\r\n.", b"\r\n..")
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data
+
+
+class AsyncSMTPPool:
+    """A handful of persistent SMTP connections shared by many concurrent sends"""
+
+    def __init__(self, size: int = 4, max_messages_per_connection: int = 1000, **connection_options):
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.connection_options = connection_options
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def start(self) -> None:
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(AsyncSMTPConnection(**self.connection_options))
+
+    async def send(self, mail_from: str, recipients: list[str], data: bytes) -> dict[str, dict]:
+        connection = await self._idle.get()
+        try:
+            for attempt in range(2):
+                try:
+                    if not connection.connected:
+                        await connection.connect()
+                    return await connection.send(mail_from, recipients, data)
+                except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    ambiguous = connection.data_started
+                    await connection.close()
+                    connection = AsyncSMTPConnection(**self.connection_options)
+                    if ambiguous:
+                        # The body was sent: the server may have queued it, so resending could duplicate
+                        return {
+                            r: {"status": "failed", "ambiguous": True,
+                                "error": f"Outcome unknown after DATA: {e or type(e).__name__}"}
+                            for r in recipients
+                        }
+                    # Failed before DATA (stale pooled connection): reconnect once, then give up
+                    if attempt:
+                        return {r: {"status": "failed", "error": str(e)} for r in recipients}
+                except SMTPResponseError as e:
+                    await connection.close()
+                    connection = AsyncSMTPConnection(**self.connection_options)
+                    return {r: {"status": "failed", "error": str(e)} for r in recipients}
+        finally:
+            if connection.messages_sent >= self.max_messages_per_connection:
+                await connection.close()
+                connection = AsyncSMTPConnection(**self.connection_options)
+            self._idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        while self._idle is not None and not self._idle.empty():
+            await self._idle.get_nowait().close()
+
+
+class AsyncEmailTransport:
+    """Email transport for DeliveryCoordinator; SMS can share the same event loop"""
+
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT,
+                 username: str = SENDER_EMAIL, password: str = SENDER_PASSWORD,
+                 sender_email: str = SENDER_EMAIL, connections: int = 4,
+                 starttls: bool = True, implicit_tls: bool = False,
+                 max_recipients: int = SMTP_MAX_RECIPIENTS,
+                 sms_transport: Optional[str] = None, **sms_options):
+        """sms_transport is an optional "module:attribute" factory for the SMS channel"""
+        self.sender_email = sender_email or username
+        self.batch_size = max(1, max_recipients)
+        self._prepared: OrderedDict[tuple, PreparedAlertEmail] = OrderedDict()
+        self.pool = AsyncSMTPPool(
+            size=connections, host=host, port=port, username=username, password=password,
+            starttls=starttls, implicit_tls=implicit_tls,
+        )
+        self.sms = None
+        if sms_transport:
+            from utils.delivery_coordinator import load_transport
+            self.sms = load_transport(sms_transport)(**sms_options)
+
+    async def start(self) -> None:
+        await self.pool.start()
+        if self.sms:
+            await self.sms.start()
+
+    async def send(self, channel: str, recipient: str, message: str, sender: str) -> dict:
+        if channel != "email":
+            if self.sms is None:
+                raise TransportConfigurationError(
+                    f"No SMS transport configured for {channel}; pass sms_transport=\"module:attribute\""
+                )
+            return await self.sms.send(channel, recipient, message, sender)
+        prepared = self._prepare(message, sender)
+        results = await self.pool.send(self.sender_email, [recipient], prepared.for_recipient(recipient))
+        return results[recipient]
+
+    def _prepare(self, message: str, sender: str) -> PreparedAlertEmail:
+        """MIME content rendered once per (alert, sender), shared by all its recipients"""
+        key = (message, sender)
+        prepared = self._prepared.get(key)
+        if prepared is None:
+            prepared = PreparedAlertEmail(self.sender_email, sender, message)
+            self._prepared[key] = prepared
+            if len(self._prepared) > 8:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    async def send_batch(self, channel: str, recipients: list[str], message: str,
+                         sender: str) -> dict[str, dict]:
+        """Send to many recipients using multi-RCPT envelopes; returns per-recipient outcomes"""
+        if channel != "email":
+            outcomes = await asyncio.gather(*(self.send(channel, r, message, sender) for r in recipients))
+            return dict(zip(recipients, outcomes))
+
+        prepared = self._prepare(message, sender)
+        envelopes = group_envelopes(recipients, self.batch_size)
+        replies = await asyncio.gather(*(
+            self.pool.send(self.sender_email, envelope, prepared.for_envelope(envelope))
+            for envelope in envelopes
+        ))
+        results: dict[str, dict] = {}
+        for reply in replies:
+            results.update(reply)
+        return results
+
+    async def close(self) -> None:
+        await self.pool.close()
+        if self.sms:
+            await self.sms.close()
@@ -0,0 +1,485 @@
+"""
+Delivery Audit Log
+Append-only, hash-chained segment files with batched fsync and sidecar offset indexes
+for lookup by message_id or time, plus a streaming verifier
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "delivery_logs/audit")
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(32 * 1024 * 1024)))
+# Group commit: fsync after this many records or this many seconds, whichever comes first
+AUDIT_FSYNC_EVERY = int(os.getenv("AUDIT_FSYNC_EVERY", "64"))
+AUDIT_FSYNC_SECONDS = float(os.getenv("AUDIT_FSYNC_SECONDS", "1.0"))
+
+GENESIS_HASH = "0" * 64
+
+# Time index, appended per record: (timestamp, seq, byte offset)
+_TIME_ENTRY = struct.Struct("<dQQ")
+# Id index, written sorted when a segment is sealed: (message_id key, byte offset)
+_ID_ENTRY = struct.Struct("<8sQ")
+
+
+def _id_key(message_id: str) -> bytes:
+    return hashlib.blake2b(message_id.encode("utf-8"), digest_size=8).digest()
+
+
+def chain_hash(prev_hash: str, body: bytes) -> str:
+    return hashlib.sha256(prev_hash.encode("ascii") + body).hexdigest()
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:06d}.log"
+
+
+class _FixedIndex:
+    """Read-only view of a fixed-width index file"""
+
+    def __init__(self, path: Path, entry: struct.Struct):
+        self.entry = entry
+        self._data = b""
+        size = path.stat().st_size if path.exists() else 0
+        if size >= entry.size:
+            with open(path, "rb") as handle:
+                self._data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = size // entry.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> tuple:
+        return self.entry.unpack_from(self._data, index * self.entry.size)
+
+    def lower_bound(self, key) -> int:
+        """First position whose leading field is >= key"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid][0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+
+def _parse_line(line: bytes) -> tuple[str, bytes]:
+    """(record hash, JSON body) from one "<hash>\\t<body>\\n" line"""
+    digest, _, body = line.rstrip(b"\n").partition(b"\t")
+    return digest.decode("ascii"), body
+
+
+def _segment_number(segment: Path) -> int:
+    return int(segment.stem.split("-")[1])
+
+
+def _sealed_offsets(segment: Path, key: bytes) -> list[int]:
+    """Offsets of one message_id's records in a sealed segment, from its sorted id index"""
+    index = _FixedIndex(segment.with_suffix(".ids"), _ID_ENTRY)
+    offsets = []
+    position = index.lower_bound(key)
+    while position < len(index) and index[position][0] == key:
+        offsets.append(index[position][1])
+        position += 1
+    index.close()
+    return offsets
+
+
+def _scan(segment: Path, offset: int = 0) -> Iterator[tuple[int, dict]]:
+    """(offset, record) for each complete line from offset on; a torn final line is not returned"""
+    with open(segment, "rb") as handle:
+        handle.seek(offset)
+        for line in handle:
+            if not line.endswith(b"\n"):
+                return
+            digest, body = _parse_line(line)
+            yield offset, {**json.loads(body), "hash": digest}
+            offset += len(line)
+
+
+class AuditLog:
+    """Single-writer audit log: records chain sha256(prev_hash + body) across segments
+
+    A sealed segment never changes. Editing, removing or reordering any record
+    breaks every hash after it; publish head() somewhere else now and then to
+    also catch truncation of the newest records. Opening one recovers the active
+    segment, so other processes query through AuditReader instead.
+    """
+
+    def __init__(self, directory: str = AUDIT_LOG_DIR, segment_bytes: int = AUDIT_SEGMENT_BYTES,
+                 fsync_every: int = AUDIT_FSYNC_EVERY, fsync_seconds: float = AUDIT_FSYNC_SECONDS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_seconds = fsync_seconds
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._pending = 0
+        self._seq = 0
+        self._head = GENESIS_HASH
+        self._last_ts = 0.0
+        self._active_ids: dict[bytes, list[int]] = {}
+        self._open()
+
+    # --- Opening and recovery ---
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob("segment-*.log"))
+
+    def _open(self) -> None:
+        segments = self.segments()
+        for segment in segments[:-1]:
+            if not segment.with_suffix(".ids").exists():
+                self._write_id_index(segment)  # crashed while sealing
+        if not segments:
+            self._number = 1
+        else:
+            self._number = int(segments[-1].stem.split("-")[1])
+            self._recover(segments[-1])
+        path = self.directory / _segment_name(self._number)
+        self._log = open(path, "ab")
+        self._time_index = open(path.with_suffix(".idx"), "ab")
+
+    def _tail_of(self, segment: Path) -> tuple[str, int]:
+        last = None
+        with open(segment, "rb") as handle:
+            for line in handle:
+                last = line
+        if last is None:
+            return GENESIS_HASH, 0
+        digest, body = _parse_line(last)
+        return digest, json.loads(body)["seq"]
+
+    def _recover(self, segment: Path) -> None:
+        """Drop a torn final line, then rebuild the active segment's time index and id map"""
+        with open(segment, "rb+") as handle:
+            data = handle.read()
+            good = data.rfind(b"\n") + 1
+            if good < len(data):
+                handle.truncate(good)
+                data = data[:good]
+
+        entries = []
+        offset = 0
+        for line in data.splitlines(keepends=True):
+            digest, body = _parse_line(line)
+            record = json.loads(body)
+            entries.append(_TIME_ENTRY.pack(record["ts"], record["seq"], offset))
+            self._active_ids.setdefault(_id_key(record["message_id"]), []).append(offset)
+            self._head, self._seq, self._last_ts = digest, record["seq"], record["ts"]
+            offset += len(line)
+        # The index is derived data, so rewriting it is always safe
+        segment.with_suffix(".idx").write_bytes(b"".join(entries))
+        if not entries and self._number > 1:
+            self._head, self._seq = self._tail_of(self.directory / _segment_name(self._number - 1))
+
+    # --- Writing ---
+
+    def append(self, event: str, message_id: str, data: Optional[dict] = None) -> dict:
+        """Add one record; durable after the next group fsync (or sync())"""
+        with self._lock:
+            # Timestamps never go backwards within the log, so the time index stays sorted
+            ts = max(time.time(), self._last_ts)
+            record = {
+                "seq": self._seq + 1,
+                "ts": ts,
+                "time": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                "event": event,
+                "message_id": message_id,
+                "data": data or {},
+            }
+            body = json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            digest = chain_hash(self._head, body)
+            line = digest.encode("ascii") + b"\t" + body + b"\n"
+
+            if self._log.tell() and self._log.tell() + len(line) > self.segment_bytes:
+                self._rotate()
+            offset = self._log.tell()
+            self._log.write(line)
+            self._time_index.write(_TIME_ENTRY.pack(ts, record["seq"], offset))
+            self._active_ids.setdefault(_id_key(message_id), []).append(offset)
+            self._head, self._seq, self._last_ts = digest, record["seq"], ts
+
+            self._pending += 1
+            if self._pending >= self.fsync_every:
+                self.sync()
+            elif self._pending == 1 and self.fsync_seconds > 0:
+                # A lone record is not left waiting for the next batch
+                self._timer = threading.Timer(self.fsync_seconds, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+        return {**record, "hash": digest}
+
+    def record_delivery(self, result: dict, message: str) -> dict:
+        """Audit summary of a deliver_message()/coordinator result (no recipient addresses)"""
+        data = {
+            "success": result.get("success"),
+            "sender": result.get("sender"),
+            "method": result.get("method"),
+            "recipient_count": result.get("recipient_count"),
+            "message_sha256": hashlib.sha256(message.encode("utf-8")).hexdigest(),
+        }
+        for channel in ("sms", "email"):
+            status = result.get(f"{channel}_delivery_status")
+            if status:
+                details = status.get("details", [])
+                data[channel] = {
+                    "attempted": status.get("attempted"),
+                    "sent": status.get("sent", sum(1 for d in details if d.get("status") == "sent")),
+                    "failed": status.get("failed", sum(1 for d in details if d.get("status") != "sent")),
+                }
+        return self.append("delivery", result.get("message_id", ""), data)
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            self._log.flush()
+            self._time_index.flush()
+            os.fsync(self._log.fileno())
+            os.fsync(self._time_index.fileno())
+            self._pending = 0
+
+    def _rotate(self) -> None:
+        self.sync()
+        self._log.close()
+        self._time_index.close()
+        self._write_id_index(self.directory / _segment_name(self._number))
+        self._active_ids = {}
+        self._number += 1
+        path = self.directory / _segment_name(self._number)
+        self._log = open(path, "ab")
+        self._time_index = open(path.with_suffix(".idx"), "ab")
+
+    def _write_id_index(self, segment: Path) -> None:
+        entries = []
+        offset = 0
+        with open(segment, "rb") as handle:
+            for line in handle:
+                _, body = _parse_line(line)
+                entries.append((_id_key(json.loads(body)["message_id"]), offset))
+                offset += len(line)
+        entries.sort()
+        tmp = segment.with_suffix(".ids.tmp")
+        with open(tmp, "wb") as handle:
+            handle.write(b"".join(_ID_ENTRY.pack(key, off) for key, off in entries))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, segment.with_suffix(".ids"))
+
+    def head(self) -> dict:
+        """Latest sequence number and chain hash (publish externally to anchor the chain)"""
+        with self._lock:
+            return {"seq": self._seq, "hash": self._head}
+
+    def close(self) -> None:
+        with self._lock:
+            self.sync()
+            self._log.close()
+            self._time_index.close()
+
+    # --- Reading ---
+
+    @staticmethod
+    def _read_at(segment: Path, offsets: list[int]) -> list[dict]:
+        records = []
+        with open(segment, "rb") as handle:
+            for offset in offsets:
+                handle.seek(offset)
+                digest, body = _parse_line(handle.readline())
+                records.append({**json.loads(body), "hash": digest})
+        return records
+
+    def find(self, message_id: str) -> list[dict]:
+        """Every record for a message_id: binary search in each sealed segment's id index"""
+        key = _id_key(message_id)
+        with self._lock:
+            self._log.flush()
+            active = self._number
+            active_offsets = list(self._active_ids.get(key, []))
+
+        found = []
+        for segment in self.segments():
+            offsets = active_offsets if _segment_number(segment) == active else _sealed_offsets(segment, key)
+            if offsets:
+                found.extend(r for r in self._read_at(segment, sorted(offsets)) if r["message_id"] == message_id)
+        return found
+
+    def between(self, start_ts: float, end_ts: float) -> Iterator[dict]:
+        """Records with start_ts <= ts < end_ts, in order, via each segment's time index"""
+        with self._lock:
+            self.sync()
+        for segment in self.segments():
+            index = _FixedIndex(segment.with_suffix(".idx"), _TIME_ENTRY)
+            if not len(index) or index[len(index) - 1][0] < start_ts:
+                index.close()
+                continue
+            if index[0][0] >= end_ts:
+                index.close()
+                break
+            offset = index[index.lower_bound(start_ts)][2]
+            index.close()
+            with open(segment, "rb") as handle:
+                handle.seek(offset)
+                for line in handle:
+                    digest, body = _parse_line(line)
+                    record = json.loads(body)
+                    if record["ts"] >= end_ts:
+                        return
+                    yield {**record, "hash": digest}
+
+
+class AuditReader:
+    """Read-only queries for processes other than the writer (CLI, reports)
+
+    Never truncates, recovers or rewrites a file, so it is safe while the app's
+    AuditLog appends to the active segment. Records still buffered in the writer
+    are not visible yet; a torn final line is skipped, not repaired.
+    """
+
+    def __init__(self, directory: str = AUDIT_LOG_DIR):
+        self.directory = Path(directory)
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob("segment-*.log"))
+
+    def find(self, message_id: str) -> list[dict]:
+        """Sealed segments through their id index; the active one (no index yet) by a scan"""
+        key = _id_key(message_id)
+        segments = self.segments()
+        found = []
+        for number, segment in enumerate(segments, 1):
+            if number < len(segments) and segment.with_suffix(".ids").exists():
+                offsets = _sealed_offsets(segment, key)
+                if offsets:
+                    found.extend(r for r in AuditLog._read_at(segment, offsets) if r["message_id"] == message_id)
+            else:
+                found.extend(record for _, record in _scan(segment) if record["message_id"] == message_id)
+        return found
+
+    def between(self, start_ts: float, end_ts: float) -> Iterator[dict]:
+        """Records with start_ts <= ts < end_ts, in order
+
+        The active segment's time index can lag its log, so that segment is read
+        on from its last indexed record before start_ts rather than skipped.
+        """
+        segments = self.segments()
+        for number, segment in enumerate(segments, 1):
+            active = number == len(segments)
+            index = _FixedIndex(segment.with_suffix(".idx"), _TIME_ENTRY)
+            try:
+                if len(index) and index[0][0] >= end_ts:
+                    return
+                position = index.lower_bound(start_ts)
+                if position < len(index):
+                    offset = index[position][2]
+                elif active and len(index):
+                    offset = index[len(index) - 1][2]
+                elif active:
+                    offset = 0
+                else:
+                    continue
+            finally:
+                index.close()
+            for _, record in _scan(segment, offset):
+                if record["ts"] >= end_ts:
+                    return
+                if record["ts"] >= start_ts:
+                    yield record
+
+    def head(self) -> dict:
+        """Latest complete record's sequence number and chain hash"""
+        for segment in reversed(self.segments()):
+            last = None
+            for _, record in _scan(segment):
+                last = record
+            if last is not None:
+                return {"seq": last["seq"], "hash": last["hash"]}
+        return {"seq": 0, "hash": GENESIS_HASH}
+
+
+def verify(directory: str = AUDIT_LOG_DIR, expected_head: Optional[str] = None) -> dict:
+    """Stream every segment and recompute the chain; only the hashes are checked, so no JSON parsing"""
+    previous = GENESIS_HASH
+    records = 0
+    segments = sorted(Path(directory).glob("segment-*.log"))
+    for segment in segments:
+        with open(segment, "rb", buffering=1024 * 1024) as handle:
+            for line_number, line in enumerate(handle, 1):
+                if not line.endswith(b"\n"):
+                    return {"ok": False, "records": records, "segments": len(segments),
+                            "error": f"{segment.name}:{line_number}: torn final record"}
+                digest, body = _parse_line(line)
+                if chain_hash(previous, body) != digest:
+                    return {"ok": False, "records": records, "segments": len(segments),
+                            "error": f"{segment.name}:{line_number}: hash mismatch (record altered, "
+                                     f"removed or reordered)"}
+                previous = digest
+                records += 1
+    if expected_head and expected_head != previous:
+        return {"ok": False, "records": records, "segments": len(segments),
+                "error": "Chain does not end at the published head (records truncated)"}
+    return {"ok": True, "records": records, "segments": len(segments), "head": previous, "error": None}
+
+
+def _parse_time(value: str) -> float:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and verify the delivery audit log")
+    parser.add_argument("--dir", default=AUDIT_LOG_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser("verify", help="Recompute the hash chain over every segment")
+    check.add_argument("--head", default=None, help="Previously published head hash")
+    find = commands.add_parser("find", help="Records for one message_id")
+    find.add_argument("message_id")
+    between = commands.add_parser("between", help="Records in a time range (ISO 8601)")
+    between.add_argument("since")
+    between.add_argument("until")
+    commands.add_parser("head", help="Print the current chain head")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        started = time.perf_counter()
+        report = verify(args.dir, args.head)
+        status = "OK" if report["ok"] else f"FAILED: {report['error']}"
+        print(f"{report['records']:,} records in {report['segments']} segments "
+              f"({time.perf_counter() - started:.2f}s): {status}")
+        sys.exit(0 if report["ok"] else 1)
+
+    # Read-only: the app's AuditLog is the only writer and the only one that recovers segments
+    reader = AuditReader(args.dir)
+    if args.command == "find":
+        records = reader.find(args.message_id)
+    elif args.command == "between":
+        records = list(reader.between(_parse_time(args.since), _parse_time(args.until)))
+    else:
+        records = [reader.head()]
+    for record in records:
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Background Analysis Worker
+Runs message analysis off the Streamlit script thread and keeps only the newest request
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class AnalysisSnapshot:
+    """A completed analysis for one exact message text"""
+    message: str
+    analysis_results: dict
+    overall: dict
+    generation: int
+
+
+class BackgroundAnalyzer:
+    """Per-session worker: newest text wins, superseded requests are cancelled or dropped"""
+
+    def __init__(self, analyze: Callable[[str], tuple[dict, dict]], executor: ThreadPoolExecutor):
+        """analyze(message) must return (analysis_results, overall)"""
+        self._analyze = analyze
+        self._executor = executor
+        self._lock = threading.Lock()
+        # Signalled whenever the newest request finishes or is superseded
+        self._changed = threading.Condition(self._lock)
+        self._generation = 0
+        self._settled = 0
+        self._pending: Optional[Future] = None
+        self._pending_message: Optional[str] = None
+        self._latest: Optional[AnalysisSnapshot] = None
+        self._failed_message: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def submit(self, message: str) -> None:
+        """Queue analysis for message unless it is already done or in flight"""
+        with self._lock:
+            if self._pending is not None and self._pending_message == message and not self._pending.done():
+                return
+            if (self._latest is not None and self._latest.message == message) or message == self._failed_message:
+                # Back to text that is already settled (A -> B -> A): B must not land afterwards
+                if self._pending is not None and not self._pending.done():
+                    self._supersede()
+                return
+            self._supersede()
+            generation = self._generation
+            self._pending_message = message
+            self._pending = self._executor.submit(self._run, message, generation)
+
+    def _supersede(self) -> None:
+        """Drop the pending request (caller holds the lock) and wake anyone waiting on it"""
+        if self._pending is not None:
+            # Not-yet-started work is cancelled; running work is dropped on completion
+            self._pending.cancel()
+        self._generation += 1
+        self._pending = None
+        self._pending_message = None
+        self._changed.notify_all()
+
+    def _run(self, message: str, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+        try:
+            analysis_results, overall = self._analyze(message)
+        except Exception as e:
+            with self._lock:
+                if generation == self._generation:
+                    self._failed_message = message
+                    self.last_error = str(e)
+                    self._settled = generation
+                    self._changed.notify_all()
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._latest = AnalysisSnapshot(message, analysis_results, overall, generation)
+                self._failed_message = None
+                self.last_error = None
+                self._settled = generation
+                self._changed.notify_all()
+
+    def latest(self) -> Optional[AnalysisSnapshot]:
+        """Last completed analysis, possibly for older text"""
+        return self._latest
+
+    def is_current(self, message: str) -> bool:
+        snapshot = self._latest
+        return snapshot is not None and snapshot.message == message
+
+    def failed(self, message: str) -> bool:
+        """True if the last attempt to analyze this exact text raised"""
+        return message == self._failed_message
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the newest request finishes; True if it finished within timeout
+
+        Returns False early when the request is superseded or reset while waiting.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            generation = self._generation
+            # The future is marked done only after _run returns, so settle on state _run sets
+            while self._pending is not None and self._settled != generation:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+                if self._generation != generation:
+                    return False
+            return True
+
+    def reset(self) -> None:
+        """Forget results, e.g. when the form is cleared"""
+        with self._lock:
+            self._supersede()
+            self._latest = None
+            self._failed_message = None
+            self.last_error = None
@@ -0,0 +1,297 @@
+"""
+Template Corpus Linter
+Analyzes a directory of alert templates in parallel and fails on non-compliant ones (for CI gates)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from analysis.language_router import (
+    BUILTIN_ANALYSIS_VERSION, build_analyzers, detect_language, select_analyzers
+)
+from analysis.rule_packs import RulePackManager
+from analysis.text_preprocessor import prepare
+
+# Bump when lint rules change so cached results are recomputed
+LINTER_VERSION = 1
+SUPPORTED_SUFFIXES = (".txt", ".md", ".json")
+WEA_LONG_LIMIT = 360
+
+_FENCE_RE = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+_SLOT_RE = re.compile(r"\{(\w+)\}")
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _fill_slots(text: str, sample: Optional[dict]) -> tuple[str, list[str]]:
+    """Render {slot} placeholders from sample values; unfilled slots are returned"""
+    missing = []
+
+    def _value(match):
+        value = (sample or {}).get(match.group(1), "").strip()
+        if not value:
+            missing.append(match.group(1))
+            return f"[{match.group(1)}]"
+        return value
+
+    return _SLOT_RE.sub(_value, text), missing
+
+
+def extract_messages(path: Path) -> list[dict]:
+    """Alert texts in a template file: [{label, text, notes}]
+
+    .txt is one message; .md uses each fenced block (or the body without headings);
+    .json accepts the template library format, a list, or objects with text/message/body.
+    """
+    raw = path.read_text(encoding="utf-8")
+    suffix = path.suffix.lower()
+
+    if suffix == ".txt":
+        return [{"label": path.name, "text": raw.strip(), "notes": []}] if raw.strip() else []
+
+    if suffix == ".md":
+        blocks = [block.strip() for block in _FENCE_RE.findall(raw) if block.strip()]
+        if not blocks:
+            body = "\n".join(line for line in raw.splitlines() if not line.lstrip().startswith("#")).strip()
+            blocks = [body] if body else []
+        return [
+            {"label": path.name if len(blocks) == 1 else f"{path.name}#{i + 1}", "text": block, "notes": []}
+            for i, block in enumerate(blocks)
+        ]
+
+    data = json.loads(raw)
+    if isinstance(data, dict):
+        data = data.get("templates", [data])
+    if not isinstance(data, list):
+        data = [data]
+
+    messages = []
+    for i, item in enumerate(data):
+        if isinstance(item, str):
+            text, label, sample = item, f"{path.name}[{i}]", None
+        elif isinstance(item, dict):
+            text = item.get("text") or item.get("message") or item.get("body") or ""
+            label, sample = f"{path.name}:{item.get('id', i)}", item.get("sample")
+        else:
+            continue
+        text, unfilled = _fill_slots(text, sample)
+        notes = [f"No sample value for slot(s): {', '.join(unfilled)}"] if unfilled else []
+        if text.strip():
+            messages.append({"label": label, "text": text.strip(), "notes": notes})
+    return messages
+
+
+# --- Worker process state (built once per process by the pool initializer) ---
+
+_ANALYZERS: Optional[dict] = None
+
+
+def _init_worker(rules_path: str, spanish_rules_path: str) -> None:
+    global _ANALYZERS
+    _ANALYZERS = build_analyzers(rules_path, spanish_rules_path)
+
+
+def _analyze(text: str) -> tuple[dict, dict]:
+    """Same routing as the app's run_analysis, without the session caches"""
+    message = prepare(text)
+    language = detect_language(message)
+    routed = select_analyzers(language, _ANALYZERS)
+    results = {
+        "fema": routed["fema"].analyze(message),
+        "wea": routed["wea"].analyze(message),
+        "readability": routed["readability"].analyze(message),
+        "confusion": routed["confusion"].analyze(message),
+        "language": language,
+    }
+    return results, _ANALYZERS["scorer"].calculate_overall_score(results)
+
+
+def lint_file(path: str, strict_fema: bool = False) -> dict:
+    """Lint every message in one file; failures list why each message cannot ship"""
+    target = Path(path)
+    report = {"path": path, "messages": [], "error": None}
+    try:
+        messages = extract_messages(target)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        report["error"] = f"Could not read: {e}"
+        return report
+
+    for message in messages:
+        try:
+            results, overall = _analyze(message["text"])
+        except Exception as e:
+            report["messages"].append({
+                "label": message["label"],
+                "language": None,
+                "score": None,
+                "characters": len(message["text"]),
+                "fema_missing": [],
+                "notes": message["notes"],
+                "failures": [f"Analysis error: {e}"],
+                "analysis_error": True,
+            })
+            continue
+
+        fema, wea = results["fema"], results["wea"]
+        characters = wea.get("character_count", len(message["text"]))
+        failures = []
+        if not overall.get("fema_gate_passed", True) or (strict_fema and fema["missing_elements"]):
+            failures.append(f"FEMA missing: {', '.join(fema['missing_elements'])}")
+        if characters > WEA_LONG_LIMIT:
+            failures.append(f"{characters} characters (over {WEA_LONG_LIMIT} by {characters - WEA_LONG_LIMIT})")
+        if not overall["is_ready_to_send"]:
+            failures.append(f"Score {overall['overall_score']} below {overall['min_threshold']}")
+
+        report["messages"].append({
+            "label": message["label"],
+            "language": results["language"],
+            "score": overall["overall_score"],
+            "characters": characters,
+            "fema_missing": list(fema["missing_elements"]),
+            "notes": message["notes"],
+            "failures": failures,
+        })
+    return report
+
+
+def cacheable(report: dict) -> bool:
+    """Only clean results are cached; unreadable files and analysis errors are retried next run"""
+    return report["error"] is None and not any(m.get("analysis_error") for m in report["messages"])
+
+
+class LintCache:
+    """path -> {digest, key, report}; a file is re-linted only when its bytes or the rules change"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self.entries: dict[str, dict] = {}
+        if self.path and self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def get(self, path: str, digest: str, key: str) -> Optional[dict]:
+        entry = self.entries.get(path)
+        if entry and entry["digest"] == digest and entry["key"] == key:
+            return entry["report"]
+        return None
+
+    def put(self, path: str, digest: str, key: str, report: dict) -> None:
+        self.entries[path] = {"digest": digest, "key": key, "report": report}
+
+    def save(self, keep: set[str]) -> None:
+        if not self.path:
+            return
+        entries = {path: entry for path, entry in self.entries.items() if path in keep}
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(entries), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def find_templates(root: str) -> list[Path]:
+    base = Path(root)
+    if base.is_file():
+        return [base]
+    return sorted(
+        p for p in base.rglob("*")
+        if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES
+        and not any(part.startswith(".") for part in p.relative_to(base).parts)
+        and not p.name.endswith(".snapshots.json")
+    )
+
+
+def lint_corpus(root: str, rules_path: str = "rules/en.json", spanish_rules_path: str = "rules/es.json",
+                workers: Optional[int] = None, cache_path: Optional[str] = ".lint_cache.json",
+                strict_fema: bool = False) -> dict:
+    """Lint every template under root, reusing cached reports for unchanged files"""
+    files = find_templates(root)
+    cache = LintCache(cache_path)
+    cache_key = "|".join([
+        str(LINTER_VERSION), str(strict_fema), BUILTIN_ANALYSIS_VERSION,
+        RulePackManager(rules_path).version, RulePackManager(spanish_rules_path).version,
+    ])
+
+    reports, todo = {}, []
+    for path in files:
+        digest = file_digest(path)
+        cached = cache.get(str(path), digest, cache_key)
+        if cached is not None:
+            reports[str(path)] = cached
+        else:
+            todo.append((str(path), digest))
+
+    if todo:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(rules_path, spanish_rules_path)) as pool:
+            futures = [pool.submit(lint_file, path, strict_fema) for path, _ in todo]
+            for (path, digest), future in zip(todo, futures):
+                report = future.result()
+                reports[path] = report
+                if cacheable(report):
+                    cache.put(path, digest, cache_key, report)
+    cache.save(keep={str(p) for p in files})
+
+    ordered = [reports[str(p)] for p in files]
+    failing = [
+        (report["path"], message) for report in ordered for message in report["messages"]
+        if message["failures"]
+    ]
+    return {
+        "files": len(files),
+        "linted": len(todo),
+        "cached": len(files) - len(todo),
+        "messages": sum(len(r["messages"]) for r in ordered),
+        "errors": [r for r in ordered if r["error"]],
+        "failing": failing,
+        "reports": ordered,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lint a directory of alert templates for compliance")
+    parser.add_argument("root", help="Directory (or file) of .txt, .md and .json templates")
+    parser.add_argument("--rules", default="rules/en.json")
+    parser.add_argument("--spanish-rules", default="rules/es.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=".lint_cache.json", help="Result cache file ('' disables it)")
+    parser.add_argument("--strict-fema", action="store_true", help="Fail on any missing FEMA element")
+    parser.add_argument("--json", dest="json_output", default=None, help="Write the full report here")
+    args = parser.parse_args()
+
+    summary = lint_corpus(args.root, args.rules, args.spanish_rules, args.workers,
+                          args.cache or None, args.strict_fema)
+
+    for report in summary["errors"]:
+        print(f"ERROR {report['path']}: {report['error']}")
+    for path, message in summary["failing"]:
+        score = message["score"] if message["score"] is not None else "n/a"
+        print(f"FAIL  {message['label']} ({path}) score {score}")
+        for failure in message["failures"]:
+            print(f"      - {failure}")
+        for note in message["notes"]:
+            print(f"      note: {note}")
+
+    print(f"\n{summary['files']} files, {summary['messages']} messages "
+          f"({summary['linted']} linted, {summary['cached']} from cache): "
+          f"{len(summary['failing'])} failing, {len(summary['errors'])} unreadable")
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
+
+    sys.exit(1 if summary["failing"] or summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
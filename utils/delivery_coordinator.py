@@ -0,0 +1,284 @@
+"""
+Sharded Delivery Coordinator
+Fans a recipient list out to worker processes, each with its own asyncio transport loop,
+and merges per-recipient results into one delivery record with resumable checkpoints
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from utils.prepared_email import group_envelopes
+from utils.send_ledger import SendLedger
+
+DEFAULT_WORKERS = int(os.getenv("DELIVERY_WORKERS", "4"))
+DEFAULT_CONCURRENCY = int(os.getenv("DELIVERY_CONCURRENCY_PER_WORKER", "50"))
+
+# Ledger outcomes are committed in groups of this size (and always at the end of a shard)
+LEDGER_COMMIT_EVERY = 64
+
+
+class TransportConfigurationError(RuntimeError):
+    """The transport cannot serve a channel at all (e.g. no SMS provider configured)
+
+    Raised instead of per-recipient failures so the send stops loudly rather
+    than queueing retries or dead-lettering addresses that were never tried.
+    """
+
+
+def shard_for(recipient: str, shard_count: int) -> int:
+    """Stable shard for a recipient so a resumed run sends it from the same shard"""
+    digest = hashlib.blake2b(recipient.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def load_transport(spec: str):
+    """Import a transport factory from "module:attribute" """
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LoggingTransport:
+    """Transport that reports every send as delivered without contacting a provider
+
+    For tests and dry runs only; it must be named explicitly, never used as a default.
+    """
+
+    def __init__(self, **_):
+        pass
+
+    async def start(self):
+        pass
+
+    async def send(self, channel: str, recipient: str, message: str, sender: str) -> dict:
+        return {"status": "sent"}
+
+    async def close(self):
+        pass
+
+
+def _read_checkpoint(path: Path) -> dict[str, dict]:
+    done = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a torn last line; that recipient is retried
+                    continue
+                done[entry["recipient"]] = entry
+    return done
+
+
+async def _run_shard_async(job: dict) -> list[dict]:
+    checkpoint = Path(job["checkpoint"])
+    done = _read_checkpoint(checkpoint)
+    results = [entry for entry in done.values() if entry["status"] == "sent"]
+    todo = [
+        (channel, recipient) for channel, recipient in job["recipients"]
+        if done.get(recipient, {}).get("status") != "sent"
+    ]
+
+    ledger = SendLedger(job["ledger"]) if job.get("ledger") else None
+    if ledger:
+        # Only recipients this shard could claim are sent; others are done or owned by another run
+        claimed = set(ledger.claim(job["delivery_id"], job["recipients"]))
+        # Sends the checkpoint saw but the ledger missed (crash between the two) are settled
+        ledger.record(job["delivery_id"], [(e["recipient"], "sent", None) for e in results])
+        todo = [item for item in todo if item in claimed]
+        # Delivered by an earlier run that used another checkpoint directory
+        delivered = ledger.delivered(job["delivery_id"])
+        sent_here = {entry["recipient"] for entry in results}
+        results.extend(
+            {"channel": channel, "recipient": recipient, "status": "sent", "shard": job["shard"]}
+            for channel, recipient in job["recipients"]
+            if recipient in delivered and recipient not in sent_here
+        )
+    if not todo:
+        return results
+
+    transport = load_transport(job["transport"])(**job.get("transport_options", {}))
+    await transport.start()
+    semaphore = asyncio.Semaphore(job["concurrency"])
+
+    # Transports with send_batch() get whole groups (e.g. multi-RCPT email envelopes)
+    batch_size = getattr(transport, "batch_size", 1) if hasattr(transport, "send_batch") else 1
+    batches: list[tuple[str, list[str]]] = [(c, [r]) for c, r in todo if c == "sms"]
+    emails = [r for c, r in todo if c == "email"]
+    # Grouped by domain across the whole shard first, so each batch is one full envelope
+    batches.extend(("email", envelope) for envelope in group_envelopes(emails, batch_size))
+
+    pending: list[tuple] = []
+
+    def _commit_ledger() -> None:
+        if ledger and pending:
+            ledger.record(job["delivery_id"], pending)
+            pending.clear()
+
+    with open(checkpoint, "a", encoding="utf-8") as log:
+        async def _send(channel: str, batch: list[str]) -> list[dict]:
+            async with semaphore:
+                try:
+                    if len(batch) > 1:
+                        outcomes = await transport.send_batch(channel, batch, job["message"], job["sender"])
+                    else:
+                        outcomes = {batch[0]: await transport.send(channel, batch[0], job["message"], job["sender"])}
+                except TransportConfigurationError:
+                    raise
+                except Exception as e:
+                    outcomes = {r: {"status": "failed", "error": str(e)} for r in batch}
+            entries = [
+                {"channel": channel, "recipient": r, **outcomes.get(r, {"status": "failed", "error": "No reply"}),
+                 "shard": job["shard"]}
+                for r in batch
+            ]
+            # Written and flushed as soon as the provider answers, before anything else
+            log.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            log.flush()
+            pending.extend((e["recipient"], e["status"], e.get("error")) for e in entries)
+            if len(pending) >= LEDGER_COMMIT_EVERY:
+                _commit_ledger()
+            return entries
+
+        try:
+            for entries in await asyncio.gather(*(_send(c, b) for c, b in batches)):
+                results.extend(entries)
+        finally:
+            os.fsync(log.fileno())
+            _commit_ledger()
+            await transport.close()
+    return results
+
+
+def run_shard(job: dict) -> list[dict]:
+    """Worker-process entry point: one event loop per shard"""
+    return asyncio.run(_run_shard_async(job))
+
+
+class DeliveryCoordinator:
+    """Shards recipients across a process pool and merges their results"""
+
+    def __init__(self, transport: str, workers: int = DEFAULT_WORKERS, concurrency: int = DEFAULT_CONCURRENCY,
+                 checkpoint_dir: str = "delivery_checkpoints", transport_options: Optional[dict] = None,
+                 ledger_path: Optional[str] = None):
+        """transport is a "module:attribute" factory so worker processes can import it; it is
+        required so no run can fall back to a transport that reports sends it never made.
+        ledger_path enables the shared SendLedger so concurrent runs never double-send; a
+        resume reclaims recipients left "sending" by a crashed run on this host at once, and
+        those of a run on another host once the ledger lease expires"""
+        self.transport = transport
+        self.workers = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.transport_options = transport_options or {}
+        self.ledger_path = ledger_path
+
+    def _shard_count(self, run_dir: Path) -> int:
+        """Shard count of the run, fixed by its first attempt so a resume reads the same checkpoints"""
+        run_file = run_dir / "run.json"
+        if run_file.exists():
+            try:
+                return max(1, int(json.loads(run_file.read_text(encoding="utf-8"))["shards"]))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        tmp_file = run_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({"shards": self.workers}), encoding="utf-8")
+        os.replace(tmp_file, run_file)
+        return self.workers
+
+    def _jobs(self, delivery_id: str, message: str, sender: str, recipients: dict) -> list[dict]:
+        run_dir = self.checkpoint_dir / delivery_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        # Resumed with a different worker count: shards stay as recorded, the pool size changes
+        shard_count = self._shard_count(run_dir)
+        shards: list[list] = [[] for _ in range(shard_count)]
+        for channel, key in (("sms", "phone"), ("email", "email")):
+            for recipient in recipients.get(key, []):
+                shards[shard_for(recipient, shard_count)].append((channel, recipient))
+        return [
+            {
+                "shard": index,
+                "recipients": shard,
+                "message": message,
+                "sender": sender,
+                "transport": self.transport,
+                "transport_options": self.transport_options,
+                "concurrency": self.concurrency,
+                "checkpoint": str(run_dir / f"shard-{index:03d}.jsonl"),
+                "delivery_id": delivery_id,
+                "ledger": self.ledger_path,
+            }
+            for index, shard in enumerate(shards) if shard
+        ]
+
+    def deliver(self, message: str, sender: str, recipients: dict,
+                delivery_id: Optional[str] = None) -> dict:
+        """Send to every recipient; pass the same delivery_id to resume a crashed run"""
+        delivery_id = delivery_id or f"MSG-{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        jobs = self._jobs(delivery_id, message, sender, recipients)
+        started = time.monotonic()
+
+        results, shard_errors = [], []
+        if len(jobs) == 1:
+            results.extend(run_shard(jobs[0]))
+        elif jobs:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                futures = {pool.submit(run_shard, job): job["shard"] for job in jobs}
+                for future in as_completed(futures):
+                    try:
+                        results.extend(future.result())
+                    except Exception as e:
+                        # The shard's checkpoint keeps what it sent; rerun with this delivery_id
+                        shard_errors.append({"shard": futures[future], "error": str(e)})
+
+        return self._merge(delivery_id, sender, recipients, results, shard_errors,
+                           time.monotonic() - started)
+
+    def _merge(self, delivery_id: str, sender: str, recipients: dict, results: list[dict],
+               shard_errors: list[dict], duration: float) -> dict:
+        by_channel: dict[str, list[dict]] = {"sms": [], "email": []}
+        for entry in results:
+            detail = {"recipient": entry["recipient"], "status": entry["status"]}
+            if entry.get("error"):
+                detail["error"] = entry["error"]
+            by_channel.setdefault(entry["channel"], []).append(detail)
+
+        def _status(channel: str, key: str) -> dict:
+            details = by_channel.get(channel, [])
+            return {
+                "attempted": bool(recipients.get(key)),
+                "sent": sum(1 for d in details if d["status"] == "sent"),
+                "failed": sum(1 for d in details if d["status"] != "sent"),
+                "details": details,
+            }
+
+        total = len(recipients.get("phone", [])) + len(recipients.get("email", []))
+        sent = sum(1 for entry in results if entry["status"] == "sent")
+        complete = not shard_errors and sent == total
+        return {
+            "success": sent > 0 and not shard_errors,
+            "complete": complete,
+            "message_id": delivery_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "sender": sender,
+            "method": recipients.get("method"),
+            "recipient_count": total,
+            "sms_delivery_status": _status("sms", "phone"),
+            "email_delivery_status": _status("email", "email"),
+            "shard_errors": shard_errors,
+            "workers": self.workers,
+            "duration_seconds": round(duration, 3),
+            "message": (
+                f"Delivered to {sent}/{total} recipients"
+                + ("" if not shard_errors else f"; {len(shard_errors)} shard(s) need resume")
+            ),
+        }
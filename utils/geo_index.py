@@ -0,0 +1,284 @@
+"""
+Geographic Targeting Index
+Geohash grid over a contact store plus a gazetteer of named areas, so an alert's location
+resolves to the recipients inside it instead of the whole list
+"""
+
+import csv
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from analysis.text_preprocessor import prepare
+
+CONTACTS_PATH = os.getenv("CONTACTS_PATH", "contacts/contacts.csv")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "contacts/gazetteer.json")
+
+# Precision 5 cells are about 4.9 km x 4.9 km at the equator
+GEOHASH_PRECISION = 5
+# Beyond this many cells a query just scans every located contact
+MAX_QUERY_CELLS = 4096
+
+EARTH_RADIUS_KM = 6371.0088
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _grid_bits(precision: int) -> tuple[int, int]:
+    """(latitude bits, longitude bits); geohash interleaves starting with longitude"""
+    bits = precision * 5
+    return bits // 2, (bits + 1) // 2
+
+
+def _cell_index(lat: float, lon: float, precision: int) -> tuple[int, int]:
+    lat_bits, lon_bits = _grid_bits(precision)
+    lat_i = int((lat + 90.0) / 180.0 * (1 << lat_bits))
+    lon_i = int((lon + 180.0) / 360.0 * (1 << lon_bits))
+    return min(max(lat_i, 0), (1 << lat_bits) - 1), min(max(lon_i, 0), (1 << lon_bits) - 1)
+
+
+def _encode_index(lat_i: int, lon_i: int, precision: int) -> str:
+    lat_bits, lon_bits = _grid_bits(precision)
+    value = 0
+    for bit in range(precision * 5):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((lon_i >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_i >> lat_bits) & 1)
+    return "".join(_BASE32[(value >> shift) & 31] for shift in range(precision * 5 - 5, -1, -5))
+
+
+def geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    return _encode_index(*_cell_index(lat, lon, precision), precision)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _in_polygon(lat: float, lon: float, polygon: list) -> bool:
+    """Ray casting on [lat, lon] vertices (fine at county scale)"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            crossing = lon_i + (lat - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if lon < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+@dataclass(frozen=True)
+class Contact:
+    """One recipient with an optional position and zone memberships"""
+    name: str
+    phone: str
+    email: str
+    lat: Optional[float]
+    lon: Optional[float]
+    zones: tuple[str, ...]
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _contact(row: dict) -> Contact:
+    zones = row.get("zones", row.get("zone", ""))
+    if isinstance(zones, str):
+        zones = [z for z in zones.split(";")]
+    return Contact(
+        name=str(row.get("name", "")).strip(),
+        phone=str(row.get("phone", "") or "").strip(),
+        email=str(row.get("email", "") or "").strip(),
+        lat=_float(row.get("lat", row.get("latitude"))),
+        lon=_float(row.get("lon", row.get("lng", row.get("longitude")))),
+        zones=tuple(z.strip() for z in zones if z and z.strip()),
+    )
+
+
+def load_contacts(path: Path) -> list[Contact]:
+    """Contacts from CSV (header row) or JSON (a list, or {"contacts": [...]})"""
+    if path.suffix.lower() == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        rows = data.get("contacts", []) if isinstance(data, dict) else data
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+    contacts = [_contact(row) for row in rows if isinstance(row, dict)]
+    return [c for c in contacts if c.phone or c.email]
+
+
+class GeoIndex:
+    """Contacts bucketed by geohash cell and zone; areas resolved by cell cover plus an exact test"""
+
+    def __init__(self, contacts_path: str = CONTACTS_PATH, gazetteer_path: str = GAZETTEER_PATH,
+                 precision: int = GEOHASH_PRECISION):
+        self.contacts_path = Path(contacts_path)
+        self.gazetteer_path = Path(gazetteer_path)
+        self.precision = precision
+        self.contacts: list[Contact] = []
+        self.areas: dict[str, dict] = {}
+        self._cells: dict[str, list[int]] = {}
+        self._zones: dict[str, list[int]] = {}
+        self._located: list[int] = []
+        self._phrases: dict[str, list[tuple[tuple[str, ...], str]]] = {}
+        self._mtimes: tuple = ()
+        self.refresh()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.contacts)
+
+    def _file_mtimes(self) -> tuple:
+        return tuple(p.stat().st_mtime if p.exists() else None for p in (self.contacts_path, self.gazetteer_path))
+
+    def refresh(self) -> bool:
+        """Rebuild when the contact store or gazetteer changed on disk"""
+        mtimes = self._file_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        contacts = load_contacts(self.contacts_path) if self.contacts_path.exists() else []
+        areas = []
+        if self.gazetteer_path.exists():
+            data = json.loads(self.gazetteer_path.read_text(encoding="utf-8"))
+            areas = data.get("areas", []) if isinstance(data, dict) else data
+        self.build(contacts, areas)
+        return True
+
+    def build(self, contacts: list[Contact], areas: list[dict]) -> None:
+        self.contacts = contacts
+        self._cells, self._zones, self._located = {}, {}, []
+        zone_names: dict[str, str] = {}
+        for i, contact in enumerate(contacts):
+            if contact.lat is not None and contact.lon is not None:
+                self._cells.setdefault(geohash(contact.lat, contact.lon, self.precision), []).append(i)
+                self._located.append(i)
+            for zone in contact.zones:
+                self._zones.setdefault(zone.lower(), []).append(i)
+                zone_names.setdefault(zone.lower(), zone)
+
+        # Every zone is an area by itself (named as first spelled in the contacts); gazetteer
+        # entries can add shapes, zone lists and aliases
+        self.areas = {key: {"name": name, "zones": [name]} for key, name in zone_names.items()}
+        for area in areas:
+            if area.get("name"):
+                self.areas[area["name"].lower()] = area
+
+        self._phrases = {}
+        for key, area in self.areas.items():
+            for name in [area["name"], *area.get("aliases", [])]:
+                phrase = prepare(name).tokens
+                if phrase:
+                    self._phrases.setdefault(phrase[0], []).append((phrase, key))
+        for entries in self._phrases.values():
+            entries.sort(key=lambda entry: -len(entry[0]))
+
+    def area_names(self) -> list[str]:
+        return sorted((area["name"] for area in self.areas.values()), key=str.lower)
+
+    # --- Area detection ---
+
+    def detect_areas(self, text: str, location_hint: Optional[str] = None) -> list[dict]:
+        """Gazetteer areas named in the text, closest to the FEMA location phrase first"""
+        prepared = prepare(text)
+        tokens, offsets = prepared.tokens, prepared.offsets
+        found, seen = [], set()
+        i = 0
+        while i < len(tokens):
+            step = 1
+            for phrase, key in self._phrases.get(tokens[i], []):
+                if tokens[i:i + len(phrase)] == phrase:
+                    if key not in seen:
+                        seen.add(key)
+                        start, end = offsets[i][0], offsets[i + len(phrase) - 1][1]
+                        found.append({"name": self.areas[key]["name"], "text": str(prepared)[start:end],
+                                      "start": start})
+                    step = len(phrase)
+                    break
+            i += step
+
+        anchor = str(prepared).lower().find(location_hint.lower()) if location_hint else -1
+        if anchor >= 0:
+            found.sort(key=lambda match: abs(match["start"] - anchor))
+        return found
+
+    # --- Spatial queries ---
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> list[int]:
+        """Contacts in the geohash cells covering a bounding box"""
+        lat_lo, lon_lo = _cell_index(south, west, self.precision)
+        lat_hi, lon_hi = _cell_index(north, east, self.precision)
+        if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > MAX_QUERY_CELLS:
+            return self._located
+        candidates = []
+        for lat_i in range(lat_lo, lat_hi + 1):
+            for lon_i in range(lon_lo, lon_hi + 1):
+                candidates.extend(self._cells.get(_encode_index(lat_i, lon_i, self.precision), ()))
+        return candidates
+
+    def query_bbox(self, south: float, west: float, north: float, east: float) -> list[int]:
+        return [
+            i for i in self._candidates(south, west, north, east)
+            if south <= self.contacts[i].lat <= north and west <= self.contacts[i].lon <= east
+        ]
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> list[int]:
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        return [
+            i for i in self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+            if haversine_km(lat, lon, self.contacts[i].lat, self.contacts[i].lon) <= radius_km
+        ]
+
+    def query_polygon(self, polygon: list) -> list[int]:
+        lats = [p[0] for p in polygon]
+        lons = [p[1] for p in polygon]
+        return [
+            i for i in self._candidates(min(lats), min(lons), max(lats), max(lons))
+            if _in_polygon(self.contacts[i].lat, self.contacts[i].lon, polygon)
+        ]
+
+    def resolve(self, area_name: str) -> list[int]:
+        """Contact indices inside a named area (union of its zones and shape)"""
+        area = self.areas.get(area_name.lower())
+        if area is None:
+            return []
+        members: set[int] = set()
+        for zone in area.get("zones", []):
+            members.update(self._zones.get(zone.lower(), ()))
+        if area.get("bbox"):
+            members.update(self.query_bbox(*area["bbox"]))
+        if area.get("center") and area.get("radius_km"):
+            members.update(self.query_radius(*area["center"], area["radius_km"]))
+        if area.get("polygon"):
+            members.update(self.query_polygon(area["polygon"]))
+        return sorted(members)
+
+    def recipients(self, area_names: list[str]) -> dict:
+        """Phones and emails of every contact in any of the areas, de-duplicated"""
+        started = time.perf_counter()
+        members = sorted({i for name in area_names for i in self.resolve(name)})
+        phones = list(dict.fromkeys(self.contacts[i].phone for i in members if self.contacts[i].phone))
+        emails = list(dict.fromkeys(self.contacts[i].email for i in members if self.contacts[i].email))
+        return {
+            "phone": phones,
+            "email": emails,
+            "contacts": len(members),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
@@ -0,0 +1,226 @@
+"""
+Delivery History Index
+Fixed-width (timestamp, offset, score, status) records over the per-message delivery logs,
+memory-mapped so the sidebar's latest-N, totals and range queries never parse log bodies
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+HISTORY_LOG_DIR = os.getenv("HISTORY_LOG_DIR", "delivery_logs")
+
+STATUS_FAILED, STATUS_SENT = 0, 1
+
+# The directory listing is cached only once its mtime is older than this
+MTIME_SETTLE_NS = 2_000_000_000
+
+# One 32-byte entry per log file; name_offset/name_length point into the names file
+ENTRY_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("name_offset", "<u8"),
+    ("name_length", "<u4"),
+    ("score", "<f4"),
+    ("recipients", "<u4"),
+    ("status", "u1"),
+    ("_pad", "V3"),
+])
+
+
+def _timestamp(record: dict, path: Path) -> float:
+    value = record.get("timestamp")
+    if value:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            pass
+    return path.stat().st_mtime
+
+
+def summarize(path: Path) -> Optional[tuple]:
+    """Index fields for one delivery log, or None when it is not a delivery record"""
+    try:
+        record = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(record, dict) or "message_id" not in record:
+        return None
+    score = record.get("safety_score", record.get("overall_score"))
+    return (
+        _timestamp(record, path),
+        float(score) if isinstance(score, (int, float)) else float("nan"),
+        int(record.get("recipient_count") or 0),
+        STATUS_SENT if record.get("success", True) else STATUS_FAILED,
+    )
+
+
+class HistoryIndex:
+    """Sorted-by-time entries in <log_dir>/.history.idx; only new log files are ever parsed"""
+
+    def __init__(self, log_dir: str = HISTORY_LOG_DIR):
+        self.log_dir = Path(log_dir)
+        self.index_path = self.log_dir / ".history.idx"
+        self.names_path = self.log_dir / ".history.names"
+        self._lock = threading.Lock()
+        self._entries = np.empty(0, dtype=ENTRY_DTYPE)
+        self._mmap: Optional[mmap.mmap] = None
+        self._names: dict[str, int] = {}
+        self._dir_mtime: Optional[int] = None
+        self._loaded = False
+
+    # --- Maintenance ---
+
+    def _load(self) -> None:
+        """Map the existing index and read the indexed names (names only, never log bodies)"""
+        self._loaded = True
+        if not self.index_path.exists() or not self.names_path.exists():
+            return
+        self._map()
+        # Names come from the index entries: a name written before a crash, with no entry, is re-indexed
+        names = self.names_path.read_bytes()
+        for offset, length in zip(self._entries["name_offset"].tolist(), self._entries["name_length"].tolist()):
+            self._names[names[offset:offset + length].decode("utf-8")] = offset
+
+    def _unmap(self) -> None:
+        # Drop the numpy view first; an mmap with exported buffers cannot be closed
+        self._entries = np.empty(0, dtype=ENTRY_DTYPE)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # a caller still holds a slice; the map is released with it
+            self._mmap = None
+
+    def _map(self) -> None:
+        self._unmap()
+        size = self.index_path.stat().st_size if self.index_path.exists() else 0
+        count = size // ENTRY_DTYPE.itemsize
+        if not count:
+            self._entries = np.empty(0, dtype=ENTRY_DTYPE)
+            return
+        with open(self.index_path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._entries = np.frombuffer(self._mmap, dtype=ENTRY_DTYPE, count=count)
+
+    def refresh(self) -> int:
+        """Index log files added since the last call; a no-op unless the directory changed"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            try:
+                mtime = self.log_dir.stat().st_mtime_ns
+            except FileNotFoundError:
+                return 0
+            if mtime == self._dir_mtime:
+                return 0
+
+            new_paths = [
+                Path(entry.path) for entry in os.scandir(self.log_dir)
+                if entry.name.endswith(".json") and not entry.name.startswith(".")
+                and entry.name not in self._names
+            ]
+            rows, added, chunks = [], {}, []
+            names_size = self.names_path.stat().st_size if self.names_path.exists() else 0
+            for path in new_paths:
+                summary = summarize(path)
+                if summary is None:
+                    continue
+                encoded = path.name.encode("utf-8")
+                chunks.append(encoded + b"\n")
+                added[path.name] = names_size
+                timestamp, score, recipients, status = summary
+                rows.append((timestamp, names_size, len(encoded), score, recipients, status, b""))
+                names_size += len(encoded) + 1
+
+            if rows:
+                # Names first, entries second: an interrupted refresh leaves only unused name bytes
+                with open(self.names_path, "ab") as names:
+                    names.write(b"".join(chunks))
+                self._append(np.array(rows, dtype=ENTRY_DTYPE))
+                self._names.update(added)
+            # mtime has coarse granularity: a file created in the same tick would not change it again
+            self._dir_mtime = mtime if time.time_ns() - mtime > MTIME_SETTLE_NS else None
+            return len(rows)
+
+    def _append(self, rows: np.ndarray) -> None:
+        rows = np.sort(rows, order="timestamp", kind="stable")
+        if len(self._entries) and rows["timestamp"][0] < self._entries["timestamp"][-1]:
+            # Out-of-order arrivals (rare): rewrite the whole index sorted, atomically
+            merged = np.concatenate([self._entries, rows])
+            merged = merged[np.argsort(merged["timestamp"], kind="stable")]
+            tmp = self.index_path.with_suffix(".tmp")
+            tmp.write_bytes(merged.tobytes())
+            self._unmap()
+            os.replace(tmp, self.index_path)
+        else:
+            with open(self.index_path, "ab") as handle:
+                handle.write(rows.tobytes())
+        self._map()
+
+    # --- Queries (index only) ---
+
+    def _view(self, entries: np.ndarray) -> list[dict]:
+        with open(self.names_path, "rb") as names:
+            views = []
+            for entry in entries:
+                names.seek(int(entry["name_offset"]))
+                name = names.read(int(entry["name_length"])).decode("utf-8")
+                score = float(entry["score"])
+                views.append({
+                    "message_id": name[:-len(".json")],
+                    "file": name,
+                    "timestamp": datetime.fromtimestamp(float(entry["timestamp"]), timezone.utc).isoformat(),
+                    "safety_score": None if np.isnan(score) else round(score),
+                    "recipient_count": int(entry["recipients"]),
+                    "success": int(entry["status"]) == STATUS_SENT,
+                })
+            return views
+
+    def total_messages(self) -> int:
+        return int(len(self._entries))
+
+    def total_delivered(self) -> int:
+        return int(np.count_nonzero(self._entries["status"] == STATUS_SENT))
+
+    def latest(self, n: int = 10) -> list[dict]:
+        """Newest first"""
+        return self._view(self._entries[::-1][:n]) if n > 0 else []
+
+    def _range(self, start_ts: float, end_ts: float) -> np.ndarray:
+        timestamps = self._entries["timestamp"]
+        lo = int(np.searchsorted(timestamps, start_ts, side="left"))
+        hi = int(np.searchsorted(timestamps, end_ts, side="left"))
+        return self._entries[lo:hi]
+
+    def between(self, start_ts: float, end_ts: float) -> list[dict]:
+        """Entries with start_ts <= timestamp < end_ts, oldest first"""
+        return self._view(self._range(start_ts, end_ts))
+
+    def stats(self, start_ts: float = float("-inf"), end_ts: float = float("inf")) -> dict:
+        """Counts, recipients and average score over a time range, vectorized over the mapped entries"""
+        window = self._range(start_ts, end_ts)
+        scores = window["score"][~np.isnan(window["score"])]
+        return {
+            "messages": int(len(window)),
+            "delivered": int(np.count_nonzero(window["status"] == STATUS_SENT)),
+            "recipients": int(window["recipients"].sum(dtype=np.uint64)),
+            "average_score": round(float(scores.mean()), 1) if len(scores) else None,
+        }
+
+    # --- Full records (parsed on demand) ---
+
+    def record(self, entry: dict) -> Optional[dict]:
+        try:
+            return json.loads((self.log_dir / entry["file"]).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
@@ -0,0 +1,304 @@
+"""
+Near-Duplicate Alert Index
+SimHash fingerprints with banded lookup for reusing prior analyses and catching duplicate sends.
+Fingerprints live in a fixed-width file next to a JSON-lines payload file, so a restart reloads
+the index with a few vectorized passes instead of re-fingerprinting every alert
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from analysis.result_types import compact_analysis, expand_analysis
+from analysis.text_preprocessor import prepare
+
+DEDUPE_INDEX_DIR = os.getenv("DEDUPE_INDEX_DIR", "delivery_logs/dedupe")
+
+HASH_BITS = 64
+# 4 bands x 16 bits. Probing each band plus its 16 one-bit neighbours finds every
+# fingerprint within 7 bits: by pigeonhole some band differs in at most one bit.
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Entries added since the band tables were last sorted; merged once the tail grows past this
+TAIL_MERGE_SIZE = 1024
+
+# One 24-byte record per alert; offset is where its line starts in the payload file
+RECORD_DTYPE = np.dtype([
+    ("fingerprint", "<u8"),
+    ("text_hash", "<u8"),
+    ("offset", "<u8"),
+])
+
+_PROBE_MASKS = np.array([0] + [1 << bit for bit in range(BAND_BITS)], dtype=np.uint64)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def normalize(text: str) -> list[str]:
+    return list(prepare(text).tokens)
+
+
+def simhash(tokens: list[str], shingle: int = 1) -> int:
+    """64-bit SimHash over word shingles (single words survive small edits best)"""
+    if len(tokens) < shingle:
+        features = tokens or [""]
+    else:
+        features = [" ".join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)]
+    hashes = np.array([_hash64(f) for f in features], dtype=">u8")
+    # One row of 64 bits per feature; a bit is set when most features set it
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(-1, HASH_BITS)
+    votes = bits.sum(axis=0) * 2 > len(features)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def hamming(fingerprints: np.ndarray, fingerprint: int) -> np.ndarray:
+    """Bit distance from one fingerprint to each of an array of them, via a byte lookup table"""
+    diff = np.ascontiguousarray(fingerprints ^ np.uint64(fingerprint))
+    return _POPCOUNT[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def recipient_key(recipient: str) -> int:
+    """Stable key for a phone/email so lists compare regardless of formatting"""
+    cleaned = recipient.strip().lower()
+    if "@" not in cleaned:
+        cleaned = re.sub(r"\D", "", cleaned)
+    return _hash64(cleaned)
+
+
+@dataclass
+class _Entry:
+    alert_id: str
+    text: str
+    analysis: Optional[dict]
+    recipients: frozenset
+    delivered_at: Optional[str]
+
+
+@dataclass
+class NearDuplicateMatch:
+    """A stored alert close to the queried text"""
+    alert_id: str
+    distance: int
+    exact: bool
+    analysis: Optional[dict]
+    delivered_at: Optional[str]
+    delta: dict
+
+
+class NearDuplicateIndex:
+    """SimHash index over analyzed and delivered alerts, persisted under index_dir
+
+    Band tables are sorted (key, entry id) arrays probed with searchsorted; the
+    candidates' distances are computed in one vectorized popcount. Payloads (text,
+    analysis, recipients) are read from disk only for entries that match.
+    """
+
+    def __init__(self, max_distance: int = 7, index_dir: Optional[str] = DEDUPE_INDEX_DIR):
+        """max_distance above 7 can miss matches because lookups are banded; index_dir=None keeps it in memory"""
+        self.max_distance = max_distance
+        self.index_dir = Path(index_dir) if index_dir else None
+        self._records = np.empty(0, dtype=RECORD_DTYPE)
+        self._size = 0
+        self._band_keys: list[np.ndarray] = [np.empty(0, dtype=np.uint64) for _ in range(BANDS)]
+        self._band_ids: list[np.ndarray] = [np.empty(0, dtype=np.int64) for _ in range(BANDS)]
+        self._sorted = 0
+        self._tail: list[dict[int, list[int]]] = [{} for _ in range(BANDS)]
+        self._exact: dict[int, int] = {}
+        self._payloads: dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        if self.index_dir:
+            self.records_path = self.index_dir / "dedupe.idx"
+            self.payload_path = self.index_dir / "dedupe.jsonl"
+            self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    # --- Storage ---
+
+    def _load(self) -> None:
+        if not self.records_path.exists() or not self.payload_path.exists():
+            return
+        payload_size = self.payload_path.stat().st_size
+        records = np.fromfile(self.records_path, dtype=RECORD_DTYPE)
+        # A record whose payload was never fully written (crash between the two appends) is dropped
+        records = records[records["offset"] < payload_size]
+        self._records = records.copy()
+        self._size = len(records)
+        self._exact = dict(zip(records["text_hash"].tolist(), range(self._size)))
+        self._sort_bands()
+
+    def _sort_bands(self) -> None:
+        fingerprints = self._records["fingerprint"][:self._size]
+        for band in range(BANDS):
+            keys = (fingerprints >> np.uint64(band * BAND_BITS)) & np.uint64(BAND_MASK)
+            order = np.argsort(keys, kind="stable")
+            self._band_keys[band] = keys[order]
+            self._band_ids[band] = order.astype(np.int64)
+        self._sorted = self._size
+        self._tail = [{} for _ in range(BANDS)]
+
+    def _append_record(self, record: tuple) -> int:
+        if self._size == len(self._records):
+            grown = np.empty(max(1024, 2 * len(self._records)), dtype=RECORD_DTYPE)
+            grown[:self._size] = self._records[:self._size]
+            self._records = grown
+        entry_id = self._size
+        self._records[entry_id] = record
+        self._size += 1
+        return entry_id
+
+    def _entry(self, entry_id: int) -> _Entry:
+        entry = self._payloads.get(entry_id)
+        if entry is None:
+            with open(self.payload_path, "rb") as handle:
+                handle.seek(int(self._records["offset"][entry_id]))
+                item = json.loads(handle.readline())
+            entry = _Entry(
+                alert_id=item["alert_id"],
+                text=item["text"],
+                analysis=compact_analysis(item["analysis"]) if item.get("analysis") else None,
+                recipients=frozenset(item.get("recipients", ())),
+                delivered_at=item.get("delivered_at"),
+            )
+            self._payloads[entry_id] = entry
+        return entry
+
+    # --- Updates ---
+
+    def add(self, alert_id: str, text: str, analysis: Optional[dict] = None,
+            recipients: Iterable[str] = (), delivered_at: Optional[str] = None) -> None:
+        """Store an alert with its analysis and (if delivered) its recipients"""
+        fingerprint = simhash(normalize(text))
+        text_hash = _hash64(text)
+        entry = _Entry(
+            alert_id=alert_id,
+            text=text,
+            # Kept for the life of the process, so stored in the compact form
+            analysis=compact_analysis(analysis) if analysis else None,
+            recipients=frozenset(recipient_key(r) for r in recipients),
+            delivered_at=delivered_at,
+        )
+        with self._lock:
+            offset = 0
+            if self.index_dir:
+                # Payload first, record second: an interrupted add leaves only an unused payload line
+                self.index_dir.mkdir(parents=True, exist_ok=True)
+                line = json.dumps({
+                    "alert_id": alert_id,
+                    "text": text,
+                    "analysis": expand_analysis(entry.analysis) if entry.analysis else None,
+                    "recipients": sorted(entry.recipients),
+                    "delivered_at": delivered_at,
+                }, default=str).encode("utf-8") + b"\n"
+                with open(self.payload_path, "ab") as handle:
+                    offset = handle.tell()
+                    handle.write(line)
+            record = (fingerprint, text_hash, offset)
+            if self.index_dir:
+                with open(self.records_path, "ab") as handle:
+                    handle.write(np.array([record], dtype=RECORD_DTYPE).tobytes())
+            entry_id = self._append_record(record)
+            self._payloads[entry_id] = entry
+            self._exact[text_hash] = entry_id
+            if self._size - self._sorted >= TAIL_MERGE_SIZE:
+                self._sort_bands()
+            else:
+                for band in range(BANDS):
+                    key = (fingerprint >> (band * BAND_BITS)) & BAND_MASK
+                    self._tail[band].setdefault(key, []).append(entry_id)
+
+    # --- Queries ---
+
+    def _candidates(self, fingerprint: int) -> np.ndarray:
+        parts = []
+        for band in range(BANDS):
+            key = (fingerprint >> (band * BAND_BITS)) & BAND_MASK
+            probes = np.uint64(key) ^ _PROBE_MASKS
+            keys, ids = self._band_keys[band], self._band_ids[band]
+            lo = np.searchsorted(keys, probes, side="left")
+            hi = np.searchsorted(keys, probes, side="right")
+            for start, end in zip(lo.tolist(), hi.tolist()):
+                if end > start:
+                    parts.append(ids[start:end])
+            tail = self._tail[band]
+            if tail:
+                for probe in probes.tolist():
+                    if probe in tail:
+                        parts.append(np.array(tail[probe], dtype=np.int64))
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def _matches(self, text: str) -> list[tuple[int, _Entry]]:
+        fingerprint = simhash(normalize(text))
+        text_hash = _hash64(text)
+        with self._lock:
+            exact_id = self._exact.get(text_hash)
+            candidates = self._candidates(fingerprint)
+            distances = hamming(self._records["fingerprint"][candidates], fingerprint)
+            close = [
+                (int(distance), int(entry_id))
+                for entry_id, distance in zip(candidates, distances)
+                if distance <= self.max_distance and entry_id != exact_id
+            ]
+            if exact_id is not None:
+                close.append((0, exact_id))
+            close.sort(key=lambda item: (item[0], int(self._records["text_hash"][item[1]]) != text_hash))
+            return [(distance, self._entry(entry_id)) for distance, entry_id in close]
+
+    def lookup(self, text: str) -> Optional[NearDuplicateMatch]:
+        """Closest stored alert within max_distance, with a word-level delta"""
+        matches = self._matches(text)
+        if not matches:
+            return None
+        distance, entry = matches[0]
+        # Exact means byte-identical text; case or punctuation edits still change WEA/readability
+        exact = entry.text == text
+        return NearDuplicateMatch(
+            alert_id=entry.alert_id,
+            distance=distance,
+            exact=exact,
+            analysis=entry.analysis,
+            delivered_at=entry.delivered_at,
+            delta={} if exact else text_delta(entry.text, text),
+        )
+
+    def find_duplicate_sends(self, text: str, recipients: Iterable[str]) -> list[dict]:
+        """Delivered near-duplicates that already reached some of these recipients"""
+        keys = {recipient_key(r) for r in recipients}
+        duplicates = []
+        for distance, entry in self._matches(text):
+            overlap = len(keys & entry.recipients)
+            if entry.delivered_at and overlap:
+                duplicates.append({
+                    "alert_id": entry.alert_id,
+                    "distance": distance,
+                    "delivered_at": entry.delivered_at,
+                    "overlapping_recipients": overlap,
+                })
+        return duplicates
+
+
+def text_delta(old: str, new: str) -> dict:
+    """Words added and removed between two versions of an alert"""
+    old_words, new_words = old.split(), new.split()
+    added, removed = [], []
+    matcher = difflib.SequenceMatcher(a=old_words, b=new_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.append(" ".join(old_words[i1:i2]))
+        if tag in ("replace", "insert"):
+            added.append(" ".join(new_words[j1:j2]))
+    return {"added": added, "removed": removed, "similarity": round(matcher.ratio(), 3)}
@@ -0,0 +1,79 @@
+"""
+Pre-Rendered Alert Email
+Renders subject, plain and HTML bodies once per alert and stamps per-recipient headers onto the shared bytes
+"""
+
+import html
+import os
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formatdate, make_msgid
+
+# Many servers accept 100 RCPT per transaction; stay below to be safe. 1 disables grouping.
+SMTP_MAX_RECIPIENTS = int(os.getenv("SMTP_MAX_RECIPIENTS", "50"))
+
+_HTML_TEMPLATE = (
+    '<html><body style="font-family:Arial,sans-serif;">'
+    '<div style="border-left:6px solid #dc3545;padding:12px 16px;">'
+    '<h2 style="margin:0 0 8px 0;color:#c82333;">{subject}</h2>'
+    '<p style="font-size:16px;line-height:1.5;margin:0;">{body}</p>'
+    '<p style="font-size:12px;color:#757575;margin-top:12px;">Issued by {sender}</p>'
+    '</div></body></html>'
+)
+
+
+class PreparedAlertEmail:
+    """One alert's MIME content, encoded once and shared by every recipient"""
+
+    def __init__(self, sender_email: str, sender_name: str, message: str):
+        """Encode the multipart/alternative body and common headers"""
+        self.sender_email = sender_email
+        self.subject = f"Emergency Alert from {sender_name}" if sender_name else "Emergency Alert"
+
+        msg = EmailMessage(policy=SMTP)
+        msg["From"] = f"{sender_name} <{sender_email}>" if sender_name else sender_email
+        msg["Subject"] = self.subject
+        msg.set_content(message)
+        msg.add_alternative(
+            _HTML_TEMPLATE.format(
+                subject=html.escape(self.subject),
+                body=html.escape(message).replace("\n", "<br>"),
+                sender=html.escape(sender_name or sender_email),
+            ),
+            subtype="html",
+        )
+        # Everything except To/Date/Message-ID; header order does not matter to receivers
+        self._shared = msg.as_bytes()
+        self._domain = sender_email.rpartition("@")[2] or "localhost"
+
+    def _stamp(self, to_header: str) -> bytes:
+        headers = (
+            f"To: {to_header}\r\n"
+            f"Date: {formatdate(localtime=True)}\r\n"
+            f"Message-ID: {make_msgid(domain=self._domain)}\r\n"
+        )
+        return headers.encode("utf-8") + self._shared
+
+    def for_recipient(self, recipient: str) -> bytes:
+        """Wire bytes addressed to a single recipient"""
+        return self._stamp(recipient)
+
+    def for_envelope(self, recipients: list[str]) -> bytes:
+        """Wire bytes for a multi-recipient envelope; recipients do not see each other"""
+        if len(recipients) == 1:
+            return self._stamp(recipients[0])
+        return self._stamp("undisclosed-recipients:;")
+
+
+def group_envelopes(recipients: list[str], max_recipients: int = SMTP_MAX_RECIPIENTS) -> list[list[str]]:
+    """Split recipients into envelopes of at most max_recipients, keeping domains together"""
+    max_recipients = max(1, max_recipients)
+    by_domain: dict[str, list[str]] = {}
+    for recipient in recipients:
+        by_domain.setdefault(recipient.rpartition("@")[2].lower(), []).append(recipient)
+
+    envelopes = []
+    for domain_recipients in by_domain.values():
+        for i in range(0, len(domain_recipients), max_recipients):
+            envelopes.append(domain_recipients[i:i + max_recipients])
+    return envelopes
@@ -0,0 +1,400 @@
+"""
+Retry Scheduler
+Retries failed recipients with exponential backoff and jitter per provider, and dead-letters permanent failures
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from utils.delivery_coordinator import TransportConfigurationError
+
+RETRY_DB_PATH = os.getenv("RETRY_DB_PATH", "delivery_logs/retry_queue.db")
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "30"))
+RETRY_CAP_SECONDS = float(os.getenv("RETRY_CAP_SECONDS", "3600"))
+# A worker that dies mid-batch leaves its claimed rows "retrying"; they become due again after this
+RETRY_LEASE_SECONDS = float(os.getenv("RETRY_LEASE_SECONDS", "300"))
+
+# Only a rejected address is permanent: 550/551/553 replies or a 5.1.x enhanced code (RFC 3463).
+# Other 5xx replies (policy, auth, TLS, message content) say nothing about the address itself.
+_PERMANENT_SMTP = re.compile(r"^\s*55[013]\b|\b5\.1\.\d{1,3}\b")
+
+# SQLite's default bound-parameter limit is 999 on older builds
+SQL_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS retries (
+    message_id TEXT NOT NULL,
+    recipient  TEXT NOT NULL,
+    channel    TEXT NOT NULL,
+    provider   TEXT NOT NULL,
+    message    TEXT NOT NULL,
+    sender     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL,
+    next_at    REAL NOT NULL,
+    last_error TEXT,
+    state      TEXT NOT NULL DEFAULT 'queued',
+    lease_until REAL,
+    PRIMARY KEY (message_id, recipient)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS retries_due ON retries (next_at);
+CREATE TABLE IF NOT EXISTS exhausted (
+    message_id TEXT NOT NULL,
+    recipient  TEXT NOT NULL,
+    channel    TEXT NOT NULL,
+    attempts   INTEGER NOT NULL,
+    error      TEXT,
+    gave_up_at REAL NOT NULL,
+    PRIMARY KEY (message_id, recipient)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dead_letters (
+    recipient  TEXT PRIMARY KEY,
+    channel    TEXT NOT NULL,
+    message_id TEXT,
+    attempts   INTEGER NOT NULL,
+    error      TEXT,
+    dead_at    REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# send(channel, recipients, message, sender) -> {recipient: {"status", "error"?}}
+SendFunction = Callable[[str, list[str], str, str], dict[str, dict]]
+
+
+def provider_for(channel: str, recipient: str) -> str:
+    """Retry group: the email domain (one MX per group) or the SMS gateway"""
+    if channel == "email":
+        return "email:" + recipient.rpartition("@")[2].lower()
+    return channel
+
+
+def _chunks(items: list, size: int = SQL_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def is_permanent(error: Optional[str]) -> bool:
+    return bool(error) and bool(_PERMANENT_SMTP.match(error))
+
+
+def failed_recipients(result: dict) -> list[dict]:
+    """[{channel, recipient, error}] for every failed detail in a delivery result
+
+    Ambiguous failures (connection lost after the body was sent) are left out:
+    the provider may have delivered them, and a retry could send the alert twice.
+    """
+    failures = []
+    for channel, key in (("sms", "sms_delivery_status"), ("email", "email_delivery_status")):
+        for detail in result.get(key, {}).get("details", []):
+            if detail.get("status") != "sent" and not detail.get("ambiguous"):
+                failures.append({
+                    "channel": channel,
+                    "recipient": detail["recipient"],
+                    "error": detail.get("error", "Unknown"),
+                    "permanent": detail.get("permanent", False),
+                })
+    return failures
+
+
+class RetryScheduler:
+    """Persistent retry queue and dead-letter store shared by the app and the retry worker"""
+
+    def __init__(self, path: str = RETRY_DB_PATH, max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_SECONDS, max_delay: float = RETRY_CAP_SECONDS,
+                 lease: float = RETRY_LEASE_SECONDS, rng: Optional[random.Random] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self.rng = rng or random.Random()
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(retries)")}
+        if "state" not in columns:
+            # Queues created before due retries were claimed
+            conn.execute("ALTER TABLE retries ADD COLUMN state TEXT NOT NULL DEFAULT 'queued'")
+            conn.execute("ALTER TABLE retries ADD COLUMN lease_until REAL")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(cap, base * 2^attempt)] so retries do not arrive in waves"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    # --- Scheduling ---
+
+    def collect(self, message_id: str, message: str, sender: str, result: dict) -> dict:
+        """Queue the failed recipients of a delivery result; returns {"scheduled", "dead_lettered"}"""
+        now = time.time()
+        retries, dead = [], []
+        for failure in failed_recipients(result):
+            if failure["permanent"] or is_permanent(failure["error"]):
+                dead.append((failure["recipient"], failure["channel"], message_id, 1, failure["error"], now))
+            else:
+                retries.append((
+                    message_id, failure["recipient"], failure["channel"],
+                    provider_for(failure["channel"], failure["recipient"]),
+                    message, sender, 1, now + self.backoff(1), failure["error"],
+                ))
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO retries (message_id, recipient, channel, provider, message, "
+                "sender, attempts, next_at, last_error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                retries,
+            )
+            conn.executemany("INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?, ?)", dead)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"scheduled": len(retries), "dead_lettered": len(dead)}
+
+    def due(self, now: Optional[float] = None, limit: int = 1000) -> dict[tuple, list[str]]:
+        """Claim due retries, grouped by (provider, channel, message_id, message, sender)
+
+        Claimed rows are marked "retrying" under a lease in the same write transaction
+        that selects them, so a second worker (or a manual run) does not send them again.
+        Rows whose lease ran out (the worker died) are due again.
+        """
+        clock = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT provider, channel, message_id, message, sender, recipient FROM retries "
+                "WHERE next_at <= ? AND (state = 'queued' OR lease_until <= ?) ORDER BY next_at LIMIT ?",
+                (clock if now is None else now, clock, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE retries SET state = 'retrying', lease_until = ? WHERE message_id = ? AND recipient = ?",
+                [(clock + self.lease, row[2], row[5]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        groups: dict[tuple, list[str]] = {}
+        for provider, channel, message_id, message, sender, recipient in rows:
+            groups.setdefault((provider, channel, message_id, message, sender), []).append(recipient)
+        return groups
+
+    def release(self, groups: dict[tuple, list[str]]) -> None:
+        """Return claimed retries to the queue unsent"""
+        self._connection().executemany(
+            "UPDATE retries SET state = 'queued', lease_until = NULL WHERE message_id = ? AND recipient = ?",
+            [(key[2], recipient) for key, recipients in groups.items() for recipient in recipients],
+        )
+
+    def pending(self) -> dict:
+        conn = self._connection()
+        queued, next_at = conn.execute("SELECT COUNT(*), MIN(next_at) FROM retries").fetchone()
+        (dead,) = conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()
+        (gave_up,) = conn.execute("SELECT COUNT(*) FROM exhausted").fetchone()
+        return {"queued": queued, "next_at": next_at, "dead_letters": dead, "gave_up": gave_up}
+
+    # --- Running ---
+
+    def run_due(self, send: SendFunction, now: Optional[float] = None, providers_in_parallel: int = 4,
+                on_sent: Optional[Callable[[str, list[str]], None]] = None) -> dict:
+        """Retry everything due; providers run in parallel, each provider's recipients as one batch
+
+        When a provider fails every recipient in its batch (an outage, not bad
+        addresses) all of its queued retries are pushed back together.
+        """
+        groups = self.due(now)
+        totals = {"sent": 0, "rescheduled": 0, "dead_lettered": 0, "gave_up": 0}
+        if not groups:
+            return totals
+
+        def _attempt(item):
+            (provider, channel, message_id, message, sender), recipients = item
+            try:
+                return item, send(channel, recipients, message, sender)
+            except TransportConfigurationError:
+                raise
+            except Exception as e:
+                return item, {r: {"status": "failed", "error": str(e)} for r in recipients}
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, providers_in_parallel)) as pool:
+                outcomes = list(pool.map(_attempt, groups.items()))
+        except TransportConfigurationError:
+            self.release(groups)
+            raise
+
+        for ((provider, channel, message_id, _, _), recipients), results in outcomes:
+            counts = self._settle(provider, message_id, recipients, results, on_sent)
+            for key in totals:
+                totals[key] += counts[key]
+        return totals
+
+    def _settle(self, provider: str, message_id: str, recipients: list[str], results: dict,
+                on_sent: Optional[Callable[[str, list[str]], None]]) -> dict:
+        now = time.time()
+        conn = self._connection()
+        attempts = {}
+        for chunk in _chunks(recipients):
+            attempts.update(conn.execute(
+                f"SELECT recipient, attempts FROM retries WHERE message_id = ? "
+                f"AND recipient IN ({','.join('?' * len(chunk))})",
+                (message_id, *chunk),
+            ).fetchall())
+
+        channel = provider.partition(":")[0]
+        sent, reschedule, dead, exhausted = [], [], [], []
+        for recipient in recipients:
+            outcome = results.get(recipient, {"status": "failed", "error": "No result"})
+            attempt = attempts.get(recipient, 1) + 1
+            if outcome.get("status") == "sent":
+                sent.append(recipient)
+            elif outcome.get("ambiguous"):
+                # May have been delivered; stop retrying but do not blame the address
+                exhausted.append((message_id, recipient, channel, attempt - 1, outcome.get("error"), now))
+            elif outcome.get("permanent") or is_permanent(outcome.get("error")):
+                dead.append((recipient, channel, message_id, attempt - 1, outcome.get("error"), now))
+            elif attempt > self.max_attempts:
+                # Out of attempts for this alert only; the address stays usable for future alerts
+                exhausted.append((message_id, recipient, channel, attempt - 1, outcome.get("error"), now))
+            else:
+                reschedule.append((attempt, now + self.backoff(attempt), outcome.get("error"),
+                                   message_id, recipient))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM retries WHERE message_id = ? AND recipient = ?",
+                             [(message_id, r) for r in sent] + [(message_id, d[0]) for d in dead]
+                             + [(message_id, e[1]) for e in exhausted])
+            conn.executemany("INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?, ?)", dead)
+            conn.executemany("INSERT OR REPLACE INTO exhausted VALUES (?, ?, ?, ?, ?, ?)", exhausted)
+            conn.executemany(
+                "UPDATE retries SET attempts = ?, next_at = ?, last_error = ?, state = 'queued', "
+                "lease_until = NULL WHERE message_id = ? AND recipient = ?",
+                reschedule,
+            )
+
+            if reschedule and not sent and not dead and not exhausted:
+                # Whole batch failed transiently: back the provider off as a unit
+                backoff_until = max(row[1] for row in reschedule)
+                conn.execute(
+                    "UPDATE retries SET next_at = MAX(next_at, ?) WHERE provider = ?",
+                    (backoff_until, provider),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if sent and on_sent:
+            on_sent(message_id, sent)
+        return {"sent": len(sent), "rescheduled": len(reschedule), "dead_lettered": len(dead),
+                "gave_up": len(exhausted)}
+
+    # --- Dead letters ---
+
+    def dead_lettered(self, recipients: list[str]) -> set[str]:
+        """Recipients whose address was rejected permanently, looked up in chunks"""
+        conn = self._connection()
+        found = set()
+        for chunk in _chunks(list(recipients)):
+            rows = conn.execute(
+                f"SELECT recipient FROM dead_letters WHERE recipient IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update(recipient for (recipient,) in rows)
+        return found
+
+    def filter_recipients(self, recipients: dict) -> tuple[dict, list[str]]:
+        """Drop dead-lettered phones/emails from an app recipients dict; returns (kept, skipped)"""
+        skipped = self.dead_lettered(recipients.get("phone", []) + recipients.get("email", []))
+        kept = dict(recipients)
+        kept["phone"] = [p for p in recipients.get("phone", []) if p not in skipped]
+        kept["email"] = [e for e in recipients.get("email", []) if e not in skipped]
+        return kept, sorted(skipped)
+
+    def dead_letters(self, limit: int = 100) -> list[dict]:
+        rows = self._connection().execute(
+            "SELECT recipient, channel, message_id, attempts, error, dead_at FROM dead_letters "
+            "ORDER BY dead_at DESC LIMIT ?",
+            (limit,),
+        )
+        keys = ("recipient", "channel", "message_id", "attempts", "error", "dead_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def revive(self, recipient: str) -> bool:
+        """Remove a recipient from the dead-letter store (address fixed, number ported back)"""
+        cursor = self._connection().execute("DELETE FROM dead_letters WHERE recipient = ?", (recipient,))
+        return cursor.rowcount > 0
+
+
+def transport_sender(spec: str, options: Optional[dict] = None) -> SendFunction:
+    """SendFunction backed by a DeliveryCoordinator-style async transport ("module:attribute")"""
+    from utils.delivery_coordinator import load_transport
+
+    def _send(channel: str, recipients: list[str], message: str, sender: str) -> dict[str, dict]:
+        async def _run():
+            transport = load_transport(spec)(**(options or {}))
+            await transport.start()
+            try:
+                if hasattr(transport, "send_batch"):
+                    return await transport.send_batch(channel, recipients, message, sender)
+                outcomes = await asyncio.gather(*(transport.send(channel, r, message, sender) for r in recipients))
+                return dict(zip(recipients, outcomes))
+            finally:
+                await transport.close()
+        return asyncio.run(_run())
+
+    return _send
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run due delivery retries")
+    parser.add_argument("--db", default=RETRY_DB_PATH)
+    parser.add_argument("--transport", default="utils.async_email_transport:AsyncEmailTransport",
+                        help='"module:attribute" transport factory')
+    parser.add_argument("--transport-options", default="{}", help="JSON keyword arguments for the transport")
+    parser.add_argument("--ledger", default=None, help="SendLedger path to mark retried recipients as sent")
+    parser.add_argument("--loop", action="store_true", help="Keep polling instead of one pass")
+    parser.add_argument("--interval", type=float, default=10.0)
+    args = parser.parse_args()
+
+    scheduler = RetryScheduler(args.db)
+    send = transport_sender(args.transport, json.loads(args.transport_options))
+    on_sent = None
+    if args.ledger:
+        from utils.send_ledger import SendLedger
+        ledger = SendLedger(args.ledger)
+        on_sent = lambda message_id, sent: ledger.record(message_id, [(r, "sent", None) for r in sent])
+
+    while True:
+        totals = scheduler.run_due(send, on_sent=on_sent)
+        if any(totals.values()):
+            print(f"Retried: {totals} | pending: {scheduler.pending()}")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
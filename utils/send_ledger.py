@@ -0,0 +1,276 @@
+"""
+Send Ledger
+SQLite record of every (message_id, recipient) delivery with atomic queued/sending/sent/failed transitions
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, MutableMapping, Optional
+
+SEND_LEDGER_PATH = os.getenv("SEND_LEDGER_PATH", "delivery_logs/send_ledger.db")
+
+# A recipient left in "sending" longer than this may be claimed again (sooner when its owner
+# process on this host has exited; see owner_gone)
+DEFAULT_LEASE_SECONDS = 300
+
+STATES = ("queued", "sending", "sent", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    message_id TEXT NOT NULL,
+    recipient  TEXT NOT NULL,
+    channel    TEXT NOT NULL,
+    state      TEXT NOT NULL CHECK (state IN ('queued', 'sending', 'sent', 'failed')),
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    updated_at REAL NOT NULL,
+    error      TEXT,
+    owner      TEXT,
+    PRIMARY KEY (message_id, recipient)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sends_state ON sends (message_id, state);
+"""
+
+
+def alert_key(message: str, sender: str, recipients: dict, nonce: str = "") -> str:
+    """Deterministic id for one send attempt, so a rerun or double click maps to the same rows
+
+    Without a nonce the key identifies the alert itself (message, sender, recipients);
+    the nonce from send_nonce() tells one deliberate send of it from the next.
+    """
+    payload = json.dumps(
+        {
+            "message": message.strip(),
+            "sender": sender.strip(),
+            "phone": sorted(recipients.get("phone", [])),
+            "email": sorted(r.lower() for r in recipients.get("email", [])),
+            "nonce": nonce,
+        },
+        sort_keys=True,
+    )
+    return "ALERT-" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def send_nonce(state: MutableMapping, alert: str, resend: bool = False) -> str:
+    """Nonce for the send being armed, kept in state (the app's session state) under "send_attempt"
+
+    Reruns and repeated clicks get the same nonce until the alert changes. Once the
+    nonce has been used, a confirmed resend (resend turning True) gets a fresh one.
+    """
+    attempt = state.get("send_attempt")
+    if (attempt is None or attempt["alert"] != alert
+            or (resend and attempt["used"] and not attempt["resend"])):
+        attempt = {"alert": alert, "nonce": uuid.uuid4().hex, "used": False, "resend": resend}
+        state["send_attempt"] = attempt
+    attempt["resend"] = resend
+    return attempt["nonce"]
+
+
+def mark_send_used(state: MutableMapping) -> None:
+    """Record that the armed nonce went to the ledger; only a confirmed resend replaces it now"""
+    if state.get("send_attempt"):
+        state["send_attempt"]["used"] = True
+
+
+def process_owner() -> str:
+    """Claim owner for this process: "<host>:<pid>" """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_gone(owner: Optional[str]) -> bool:
+    """True when a claim's owner was a process on this host that has exited
+
+    Owners on other hosts (or on Windows, where probing a pid is not safe) are
+    never judged gone; their claims wait for the lease instead.
+    """
+    host, _, pid = (owner or "").rpartition(":")
+    if os.name == "nt" or host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False  # exists but belongs to another user
+    return False
+
+
+def channel_recipients(recipients: dict) -> list[tuple[str, str]]:
+    """[(channel, recipient)] for the app's {"phone": [...], "email": [...]} shape"""
+    return ([("sms", p) for p in recipients.get("phone", [])]
+            + [("email", e) for e in recipients.get("email", [])])
+
+
+class SendLedger:
+    """Exactly-once bookkeeping for deliveries; safe across threads and processes (WAL mode)"""
+
+    def __init__(self, path: str = SEND_LEDGER_PATH, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sends)")}
+            if "owner" not in columns:
+                # Ledgers created before claims recorded their owner
+                conn.execute("ALTER TABLE sends ADD COLUMN owner TEXT")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def claim(self, message_id: str, recipients: Iterable[tuple[str, str]],
+              owner: Optional[str] = None) -> list[tuple[str, str]]:
+        """Move recipients to "sending" and return the ones this caller now owns
+
+        Recipients already sent, or being sent by someone else within the lease,
+        are left out. A "sending" row whose owner process has exited (a crashed
+        run on this host) is reclaimed at once rather than after the lease.
+        The check and the update run in one write transaction.
+        """
+        recipients = list(dict.fromkeys(recipients))
+        if not recipients:
+            return []
+        owner = owner or process_owner()
+        now = time.time()
+        stale_before = now - self.lease_seconds
+
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO sends (message_id, recipient, channel, state, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?)",
+                [(message_id, recipient, channel, now) for channel, recipient in recipients],
+            )
+            current = {
+                recipient: (state, claimed_at or 0.0, holder)
+                for recipient, state, claimed_at, holder in conn.execute(
+                    "SELECT recipient, state, claimed_at, owner FROM sends WHERE message_id = ?",
+                    (message_id,),
+                )
+            }
+
+            claimed = []
+            gone: dict[Optional[str], bool] = {}
+            for channel, recipient in recipients:
+                state, claimed_at, holder = current[recipient]
+                if state == "sending" and claimed_at >= stale_before:
+                    if holder not in gone:
+                        gone[holder] = owner_gone(holder)
+                    if not gone[holder]:
+                        continue
+                if state in ("queued", "failed", "sending"):
+                    claimed.append((channel, recipient))
+            conn.executemany(
+                "UPDATE sends SET state = 'sending', claimed_at = ?, updated_at = ?, owner = ?, "
+                "attempts = attempts + 1 WHERE message_id = ? AND recipient = ?",
+                [(now, now, owner, message_id, recipient) for _, recipient in claimed],
+            )
+        return claimed
+
+    def record(self, message_id: str, outcomes: Iterable[tuple[str, str, Optional[str]]]) -> int:
+        """Store (recipient, "sent"|"failed", error) results in one batched commit
+
+        A "sent" row is never downgraded, so late or duplicate reports are harmless.
+        Returns the number of rows updated.
+        """
+        now = time.time()
+        rows = [
+            (status, error, now, message_id, recipient)
+            for recipient, status, error in outcomes
+            if status in ("sent", "failed")
+        ]
+        if not rows:
+            return 0
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE sends SET state = ?, error = ?, claimed_at = NULL, updated_at = ? "
+                "WHERE message_id = ? AND recipient = ? AND state != 'sent'",
+                rows,
+            )
+            return conn.total_changes - before
+
+    def record_delivery(self, message_id: str, claimed: list[tuple[str, str]], result: dict) -> int:
+        """Record a deliver_message() result for the recipients that were claimed
+
+        Per-recipient details are used where the delivery system reports them;
+        otherwise the overall success flag applies to the whole channel.
+        """
+        details = {}
+        for key in ("sms_delivery_status", "email_delivery_status"):
+            for detail in result.get(key, {}).get("details", []):
+                details[detail["recipient"]] = detail
+
+        outcomes = []
+        for _, recipient in claimed:
+            detail = details.get(recipient)
+            if detail is not None:
+                status = "sent" if detail.get("status") == "sent" else "failed"
+                outcomes.append((recipient, status, detail.get("error")))
+            elif result.get("success"):
+                outcomes.append((recipient, "sent", None))
+            else:
+                outcomes.append((recipient, "failed", result.get("message")))
+        return self.record(message_id, outcomes)
+
+    def release(self, message_id: str, recipients: Iterable[tuple[str, str]]) -> None:
+        """Return claimed recipients to "queued" (e.g. the send raised before reaching a provider)"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE sends SET state = 'queued', claimed_at = NULL, updated_at = ? "
+                "WHERE message_id = ? AND recipient = ? AND state = 'sending'",
+                [(now, message_id, recipient) for _, recipient in recipients],
+            )
+
+    def delivered(self, message_id: str) -> set[str]:
+        rows = self._connection().execute(
+            "SELECT recipient FROM sends WHERE message_id = ? AND state = 'sent'", (message_id,)
+        )
+        return {recipient for (recipient,) in rows}
+
+    def status(self, message_id: str) -> dict:
+        counts = dict.fromkeys(STATES, 0)
+        rows = self._connection().execute(
+            "SELECT state, COUNT(*) FROM sends WHERE message_id = ? GROUP BY state", (message_id,)
+        )
+        counts.update(dict(rows.fetchall()))
+        counts["total"] = sum(counts[s] for s in STATES)
+        return counts
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error; takes the write lock up front"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
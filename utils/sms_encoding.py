@@ -0,0 +1,119 @@
+"""
+SMS Encoding and Segment Costing
+GSM-7 / UCS-2 detection, extended-character escapes and concatenated-segment counts for alert text
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+SMS_PRICE_PER_SEGMENT = float(os.getenv("SMS_PRICE_PER_SEGMENT", "0.0079"))
+
+# GSM 03.38 default alphabet (ESC 0x1B excluded; it only introduces extension characters)
+GSM7_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table: each costs two septets (ESC + character)
+GSM7_EXTENDED = "\f^{}\\[~]|€"
+
+# Single-part and per-part (after the concatenation header) capacities
+GSM7_SINGLE, GSM7_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+# str.translate tables: the C loop replaces a per-character Python branch
+_DELETE_GSM7 = str.maketrans("", "", GSM7_BASIC + GSM7_EXTENDED)
+_DELETE_EXTENDED = str.maketrans("", "", GSM7_EXTENDED)
+
+
+@dataclass(frozen=True)
+class SMSEncoding:
+    """Encoding-aware size of one message"""
+    encoding: str
+    characters: int
+    length: int
+    segments: int
+    per_segment: int
+    extended_chars: int
+    non_gsm_chars: tuple[str, ...]
+
+    @property
+    def remaining_in_segment(self) -> int:
+        """Units left before another segment is needed"""
+        if self.segments <= 1:
+            single = GSM7_SINGLE if self.encoding == "GSM-7" else UCS2_SINGLE
+            return single - self.length
+        return self.segments * self.per_segment - self.length
+
+
+def _count_parts(units: list[int], capacity: int) -> int:
+    """Parts needed when multi-unit characters (escapes, surrogate pairs) cannot straddle a part"""
+    parts, used = 1, 0
+    for size in units:
+        if used + size > capacity:
+            parts += 1
+            used = 0
+        used += size
+    return parts
+
+
+@lru_cache(maxsize=1024)
+def measure(text: str) -> SMSEncoding:
+    """Encoding, length in septets or UTF-16 units, and concatenated-segment count"""
+    leftovers = text.translate(_DELETE_GSM7)
+
+    if not leftovers:
+        extended = len(text) - len(text.translate(_DELETE_EXTENDED))
+        length = len(text) + extended
+        if length <= GSM7_SINGLE:
+            segments = 1 if text else 0
+        elif extended:
+            segments = _count_parts([2 if ch in GSM7_EXTENDED else 1 for ch in text], GSM7_MULTI)
+        else:
+            segments = -(-length // GSM7_MULTI)
+        return SMSEncoding("GSM-7", len(text), length, segments,
+                           GSM7_SINGLE if segments <= 1 else GSM7_MULTI, extended, ())
+
+    length = len(text.encode("utf-16-le")) // 2
+    if length <= UCS2_SINGLE:
+        segments = 1
+    elif length != len(text):
+        # Astral characters (most emoji) are surrogate pairs and stay in one part
+        segments = _count_parts([2 if ord(ch) > 0xFFFF else 1 for ch in text], UCS2_MULTI)
+    else:
+        segments = -(-length // UCS2_MULTI)
+    offenders = tuple(dict.fromkeys(leftovers))[:10]
+    return SMSEncoding("UCS-2", len(text), length, segments,
+                       UCS2_SINGLE if segments <= 1 else UCS2_MULTI, 0, offenders)
+
+
+def estimate_cost(text: str, phone_count: int, price_per_segment: float = SMS_PRICE_PER_SEGMENT) -> dict:
+    """Carrier segments and cost for sending `text` to phone_count numbers"""
+    info = measure(text)
+    total_segments = info.segments * phone_count
+    gsm_segments = measure(to_gsm7(text)).segments if info.encoding == "UCS-2" else info.segments
+    return {
+        "encoding": info.encoding,
+        "segments_per_message": info.segments,
+        "total_segments": total_segments,
+        "estimated_cost": round(total_segments * price_per_segment, 4),
+        "non_gsm_chars": list(info.non_gsm_chars),
+        # What replacing the offending characters would save
+        "segments_if_gsm7": gsm_segments * phone_count,
+    }
+
+
+# Common look-alikes that force UCS-2 when pasted from word processors
+_GSM7_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "“": '"', "”": '"', "„": '"',
+    "–": "-", "—": "-", "…": "...", " ": " ", "•": "-", "′": "'", "″": '"',
+})
+
+
+def to_gsm7(text: str) -> str:
+    """Text with typographic look-alikes replaced and remaining non-GSM characters removed"""
+    text = text.translate(_GSM7_REPLACEMENTS)
+    leftovers = text.translate(_DELETE_GSM7)
+    if leftovers:
+        text = text.translate(str.maketrans("", "", leftovers))
+    return text
@@ -0,0 +1,90 @@
+"""
+Local SMTP Sink
+Minimal asyncio SMTP server that accepts and counts messages, for offline benchmarks and load tests
+"""
+
+import asyncio
+from typing import Optional
+
+
+class LocalSMTPSink:
+    """Accepts every message (optionally rejecting some recipients) and keeps counters"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reject_domains: tuple = (),
+                 latency: float = 0.0):
+        """port=0 picks a free port; latency is added before each DATA reply"""
+        self.host = host
+        self.port = port
+        self.reject_domains = tuple(d.lower() for d in reject_domains)
+        self.latency = latency
+        self.messages = 0
+        self.recipients = 0
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> "LocalSMTPSink":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+
+        def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 localhost sink ready")
+        rcpts = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command[:4].upper()
+                if verb in ("EHLO", "HELO"):
+                    reply("250-localhost")
+                    reply("250-PIPELINING")
+                    reply("250-8BITMIME")
+                    reply("250 SIZE 10485760")
+                elif verb == "MAIL":
+                    rcpts = 0
+                    reply("250 OK")
+                elif verb == "RCPT":
+                    address = command.partition(":")[2].strip("<> ").lower()
+                    if address.rpartition("@")[2] in self.reject_domains:
+                        reply("550 No such user")
+                    else:
+                        rcpts += 1
+                        reply("250 OK")
+                elif verb == "DATA":
+                    if not rcpts:
+                        reply("554 No valid recipients")
+                        continue
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.messages += 1
+                    self.recipients += rcpts
+                    reply("250 Queued")
+                elif verb in ("RSET", "NOOP"):
+                    rcpts = 0 if verb == "RSET" else rcpts
+                    reply("250 OK")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
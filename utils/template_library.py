@@ -0,0 +1,231 @@
+"""
+Pre-Approved Template Library
+Agency alert templates with {slot} placeholders and precomputed analysis snapshots
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from analysis.language_router import analysis_version, select_analyzers
+from analysis.result_types import compact_analysis, expand_analysis
+from analysis.text_preprocessor import prepare
+
+_SLOT_RE = re.compile(r"\{(\w+)\}")
+
+# Filled-in texts remembered so run_analysis() can pick them up instantly
+FILLED_CACHE_SIZE = 256
+
+# The snapshot's readability is reused only when the filled text has the sample rendering's
+# sentence count and its word count and mean word length are within this fraction
+READABILITY_SHAPE_TOLERANCE = 0.10
+
+
+def same_shape(sample: str, message: str) -> bool:
+    """Whether message reads like sample closely enough to share its readability grade"""
+    before, after = prepare(sample), prepare(message)
+    if before.sentence_count != after.sentence_count or not before.word_count or not after.word_count:
+        return False
+    mean_before = sum(len(w) for w in before.words) / before.word_count
+    mean_after = sum(len(w) for w in after.words) / after.word_count
+    return (abs(after.word_count - before.word_count) <= READABILITY_SHAPE_TOLERANCE * before.word_count
+            and abs(mean_after - mean_before) <= READABILITY_SHAPE_TOLERANCE * mean_before)
+
+
+@dataclass
+class Template:
+    """One pre-approved alert template"""
+    id: str
+    name: str
+    category: str
+    text: str
+    language: str = "en"
+    sample: dict = field(default_factory=dict)
+
+    @property
+    def slots(self) -> list[str]:
+        seen = []
+        for slot in _SLOT_RE.findall(self.text):
+            if slot not in seen:
+                seen.append(slot)
+        return seen
+
+    @property
+    def text_sha(self) -> str:
+        payload = json.dumps([self.text, self.sample], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def render(self, values: dict) -> str:
+        return _SLOT_RE.sub(lambda m: values.get(m.group(1), "").strip(), self.text)
+
+
+class TemplateLibrary:
+    """Loads templates and keeps one analysis snapshot per template"""
+
+    def __init__(self, path: str = "templates/library.json", snapshot_path: Optional[str] = None):
+        """Load templates and any snapshots saved next to them"""
+        self.path = Path(path)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else self.path.with_suffix(".snapshots.json")
+        self.templates: dict[str, Template] = {}
+        self.snapshots: dict[str, dict] = {}
+        self._filled: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self.templates = {
+            item["id"]: Template(
+                id=item["id"],
+                name=item.get("name", item["id"]),
+                category=item.get("category", "other"),
+                text=item["text"],
+                language=item.get("language", "en"),
+                sample=item.get("sample", {}),
+            )
+            for item in data.get("templates", [])
+        }
+        if self.snapshot_path.exists():
+            try:
+                self.snapshots = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self.snapshots = {}
+
+    def ids(self) -> list[str]:
+        return list(self.templates)
+
+    def get(self, template_id: str) -> Template:
+        return self.templates[template_id]
+
+    def _is_fresh(self, template: Template, rule_pack_version: str) -> bool:
+        snapshot = self.snapshots.get(template.id)
+        return bool(
+            snapshot
+            and snapshot.get("text_sha") == template.text_sha
+            and snapshot.get("rule_pack_version") == rule_pack_version
+        )
+
+    def snapshot(self, template_id: str, analyze: Callable[[str], dict],
+                 rule_pack_version: Optional[str] = None) -> dict:
+        """Invariant analysis for a template, computed once per template/rule-pack version"""
+        template = self.templates[template_id]
+        with self._lock:
+            if rule_pack_version and self._is_fresh(template, rule_pack_version):
+                return self.snapshots[template_id]
+
+        sample_analysis = analyze(template.render(template.sample))
+        snapshot = {
+            "text_sha": template.text_sha,
+            "rule_pack_version": rule_pack_version or sample_analysis.get("rule_pack_version"),
+            "sample_analysis": sample_analysis,
+        }
+        with self._lock:
+            self.snapshots[template_id] = snapshot
+        return snapshot
+
+    def precompute(self, analyze: Callable[[str], dict], analyzers: dict) -> int:
+        """Build snapshots that are missing or stale, then persist them; returns count built
+
+        Run at app startup and by the CLI, so a template is never first analyzed in a click.
+        """
+        built = 0
+        for template in self.templates.values():
+            version = analysis_version(select_analyzers(template.language, analyzers))
+            if not self._is_fresh(template, version):
+                self.snapshot(template.id, analyze, version)
+                built += 1
+        if built:
+            self.save_snapshots()
+        return built
+
+    def save_snapshots(self) -> None:
+        # Written under the lock so two sessions saving at once never share the temp file
+        with self._lock:
+            payload = json.dumps(self.snapshots, indent=1, default=str)
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            tmp_path.write_text(payload, encoding="utf-8")
+            os.replace(tmp_path, self.snapshot_path)
+
+    def fill(self, template_id: str, values: dict, analyzers: dict,
+             analyze: Callable[[str], dict]) -> tuple[str, dict]:
+        """Render a template and assemble its analysis from the snapshot
+
+        FEMA elements, clarity issues and WEA length are analyzed on the filled-in
+        text itself, so a slot only counts when what was typed into it does.
+        Readability comes from the snapshot only while the filled text keeps the
+        sample's shape (same_shape); longer or shorter slot values are re-graded.
+        """
+        template = self.templates[template_id]
+        routed = select_analyzers(template.language, analyzers)
+        version = analysis_version(routed)
+        built = not self._is_fresh(template, version)
+        snapshot = self.snapshot(template_id, analyze, version)
+        if built:
+            self.save_snapshots()
+
+        message = template.render(values)
+        results = dict(snapshot["sample_analysis"])
+        results.update({
+            "fema": routed["fema"].analyze(message),
+            "wea": routed["wea"].analyze(message),
+            "confusion": routed["confusion"].analyze(message),
+            "template_id": template_id,
+        })
+        if not same_shape(template.render(template.sample), message):
+            results["readability"] = routed["readability"].analyze(message)
+        if "alert_types" in analyzers:
+            results["alert_type"] = analyzers["alert_types"].classify(message)
+        with self._lock:
+            self._filled[message] = compact_analysis(results)
+            self._filled.move_to_end(message)
+            while len(self._filled) > FILLED_CACHE_SIZE:
+                self._filled.popitem(last=False)
+        return message, results
+
+    def cached_analysis(self, message: str) -> Optional[dict]:
+        """Analysis assembled by fill() for exactly this text, if any"""
+        with self._lock:
+            cached = self._filled.get(message)
+        return expand_analysis(cached) if cached is not None else None
+
+
+def main():
+    """Precompute snapshots for every template in the library"""
+    import argparse
+    from analysis.language_router import build_analyzers, detect_language
+
+    parser = argparse.ArgumentParser(description="Precompute template analysis snapshots")
+    parser.add_argument("--library", default="templates/library.json")
+    parser.add_argument("--rules", default="rules/en.json")
+    parser.add_argument("--spanish-rules", default="rules/es.json")
+    args = parser.parse_args()
+
+    analyzers = build_analyzers(args.rules, args.spanish_rules)
+
+    def analyze(text: str) -> dict:
+        language = detect_language(text)
+        routed = select_analyzers(language, analyzers)
+        return {
+            "fema": routed["fema"].analyze(text),
+            "wea": routed["wea"].analyze(text),
+            "readability": routed["readability"].analyze(text),
+            "confusion": routed["confusion"].analyze(text),
+            "language": language,
+            "rule_pack_version": analysis_version(routed),
+        }
+
+    library = TemplateLibrary(args.library)
+    built = library.precompute(analyze, analyzers)
+    print(f"Templates: {len(library.templates)}, snapshots built: {built}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Delivery Throughput Estimator
+Predicts how long a send will take from recipient counts, SMS segments, measured past throughput
+and provider rate limits, and recommends a worker count before the send starts
+"""
+
+import json
+import math
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils.sms_encoding import measure
+
+# Provider ceilings: SMS in segments/s, email in recipients/s (0 = no configured limit)
+SMS_RATE_LIMIT_PER_SECOND = float(os.getenv("SMS_RATE_LIMIT_PER_SECOND", "100"))
+EMAIL_RATE_LIMIT_PER_SECOND = float(os.getenv("EMAIL_RATE_LIMIT_PER_SECOND", "0"))
+DELIVERY_MAX_WORKERS = int(os.getenv("DELIVERY_MAX_WORKERS", str(os.cpu_count() or 4)))
+THROUGHPUT_LOG_PATH = os.getenv("THROUGHPUT_LOG_PATH", "delivery_logs/throughput.jsonl")
+
+# Per-worker rates used until real deliveries have been observed
+DEFAULT_PER_WORKER = {"sms": 25.0, "email": 200.0}
+# Process pool start-up, paid once per send when more than one worker is used
+WORKER_STARTUP_SECONDS = 0.5
+# Most recent samples kept per channel; older deliveries say little about today's provider
+SAMPLE_WINDOW = 50
+# A larger pool must beat the best ETA by this much to be worth its processes
+WORKER_GAIN_THRESHOLD = 0.05
+# The sample log is re-read at most this often (other processes append to it too)
+RELOAD_SECONDS = 60.0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = max(0, int(math.ceil(seconds)))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+def sample_from_record(record: dict, segments: Optional[int] = None) -> Optional[dict]:
+    """Per-worker throughput observed in one delivery record, or None without timing data
+
+    Single-channel sends give that channel's rate; mixed sends give a combined
+    rate that only fills in for channels with no single-channel samples.
+    """
+    duration = record.get("duration_seconds")
+    if not duration or duration <= 0:
+        return None
+    workers = max(1, int(record.get("workers") or 1))
+    if segments is None:
+        text = record.get("message_text") or record.get("message_body") or ""
+        segments = measure(text).segments if text else 1
+    sent = {}
+    for channel in ("sms", "email"):
+        status = record.get(f"{channel}_delivery_status") or {}
+        if "sent" in status:
+            sent[channel] = status["sent"]
+        else:
+            sent[channel] = sum(1 for d in status.get("details", []) if d.get("status") == "sent")
+    if not any(sent.values()):
+        return None
+    worker_seconds = duration * workers
+    channels = [channel for channel, count in sent.items() if count]
+    # SMS throughput is tracked in segments: that is what providers meter
+    units = sent["sms"] * max(1, segments) + sent["email"]
+    return {
+        "channel": channels[0] if len(channels) == 1 else "mixed",
+        "per_worker": units / worker_seconds,
+        "timestamp": record.get("timestamp"),
+    }
+
+
+class ThroughputEstimator:
+    """ETA and worker recommendation from per-channel, per-worker throughput"""
+
+    def __init__(self, log_path: str = THROUGHPUT_LOG_PATH,
+                 sms_rate_limit: float = SMS_RATE_LIMIT_PER_SECOND,
+                 email_rate_limit: float = EMAIL_RATE_LIMIT_PER_SECOND,
+                 max_workers: int = DELIVERY_MAX_WORKERS):
+        """log_path holds the samples recorded by observe(), one small JSON line per delivery"""
+        self.log_path = Path(log_path)
+        self.rate_limits = {"sms": sms_rate_limit, "email": email_rate_limit}
+        self.max_workers = max(1, max_workers)
+        self._samples: dict[str, list[float]] = {"sms": [], "email": [], "mixed": []}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # --- Measured throughput ---
+
+    def _load(self) -> None:
+        """Samples from the throughput log only; per-message delivery logs are never parsed here"""
+        samples: list[dict] = []
+        if self.log_path.exists():
+            with open(self.log_path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        samples.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted write
+
+        samples.sort(key=lambda s: s.get("timestamp") or "")
+        by_channel: dict[str, list[float]] = {"sms": [], "email": [], "mixed": []}
+        for sample in samples:
+            by_channel.setdefault(sample["channel"], []).append(sample["per_worker"])
+        self._samples = {channel: rates[-SAMPLE_WINDOW:] for channel, rates in by_channel.items()}
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if not self._loaded_at or time.monotonic() - self._loaded_at > RELOAD_SECONDS:
+                self._load()
+
+    def observe(self, record: dict, segments: Optional[int] = None) -> Optional[dict]:
+        """Record the throughput of a finished delivery so the next estimate uses it"""
+        sample = sample_from_record(record, segments)
+        if sample is None:
+            return None
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(sample) + "\n")
+            rates = self._samples.setdefault(sample["channel"], [])
+            rates.append(sample["per_worker"])
+            del rates[:-SAMPLE_WINDOW]
+        return sample
+
+    def per_worker_rate(self, channel: str) -> tuple[float, str]:
+        """(units per worker-second, source); median so one slow provider hiccup does not dominate"""
+        self._ensure_loaded()
+        if self._samples.get(channel):
+            return statistics.median(self._samples[channel]), "measured"
+        if self._samples.get("mixed"):
+            return statistics.median(self._samples["mixed"]), "measured (mixed sends)"
+        return DEFAULT_PER_WORKER[channel], "default"
+
+    # --- Estimate ---
+
+    def _channel_seconds(self, units: int, rate: float, limit: float, workers: int) -> tuple[float, float, bool]:
+        throughput = workers * rate
+        capped = bool(limit) and limit <= throughput
+        if capped:
+            throughput = limit
+        return units / throughput if units else 0.0, throughput, capped
+
+    def estimate(self, message: str, phone_count: int, email_count: int) -> dict:
+        """Predicted completion time per channel and overall, with a recommended worker count"""
+        segments = measure(message).segments if phone_count else 0
+        units = {"sms": phone_count * segments, "email": email_count}
+        rates = {channel: self.per_worker_rate(channel) for channel in units if units[channel]}
+
+        def _eta(workers: int) -> float:
+            # Each shard sends both channels concurrently, so the slower channel sets the pace
+            seconds = max(
+                (self._channel_seconds(units[c], rates[c][0], self.rate_limits[c], workers)[0] for c in rates),
+                default=0.0,
+            )
+            return seconds + (WORKER_STARTUP_SECONDS if workers > 1 else 0.0)
+
+        etas = {workers: _eta(workers) for workers in range(1, self.max_workers + 1)}
+        best = min(etas.values())
+        # Smallest pool within reach of the best ETA; more processes past a rate limit only add overhead
+        recommended = next(w for w, seconds in etas.items() if seconds <= best * (1 + WORKER_GAIN_THRESHOLD))
+
+        channels = {}
+        for channel, (rate, source) in rates.items():
+            seconds, throughput, capped = self._channel_seconds(
+                units[channel], rate, self.rate_limits[channel], recommended
+            )
+            channels[channel] = {
+                "recipients": phone_count if channel == "sms" else email_count,
+                "units": units[channel],
+                "unit": "segments" if channel == "sms" else "messages",
+                "per_worker_rate": round(rate, 2),
+                "rate_limit": self.rate_limits[channel] or None,
+                "throughput": round(throughput, 2),
+                "seconds": round(seconds, 2),
+                "bottleneck": "rate limit" if capped else "workers",
+                "source": source,
+            }
+
+        return {
+            "estimated_seconds": round(etas[recommended], 2),
+            "estimated": format_duration(etas[recommended]),
+            "recommended_workers": recommended,
+            "single_worker_seconds": round(etas[1], 2),
+            "single_worker": format_duration(etas[1]),
+            "segments_per_message": segments,
+            "channels": channels,
+        }
@@ -0,0 +1,246 @@
+"""
+Weight & Threshold What-If Simulator
+Re-scores historical alerts under alternative SafetyScorer weights and send thresholds
+"""
+
+import json
+import itertools
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from analysis.language_router import analysis_version, build_analyzers, detect_language, select_analyzers
+from analysis.text_preprocessor import prepare
+
+# Component order used for every weight vector in this module
+COMPONENTS = ("fema", "wea", "readability", "confusion")
+
+# Weights shown in the app's Score Breakdown (FEMA 40 / WEA 20 / Readability 20 / Clarity 20)
+APP_WEIGHTS = {"fema": 0.40, "wea": 0.20, "readability": 0.20, "confusion": 0.20}
+
+# Weights documented in ARCHITECTURE.md (FEMA 30 / WEA 20 / Readability 25 / Confusion 25)
+ARCHITECTURE_WEIGHTS = {"fema": 0.30, "wea": 0.20, "readability": 0.25, "confusion": 0.25}
+
+DEFAULT_THRESHOLD = 75
+
+
+def _weight_dict(weights) -> dict:
+    """Normalized {component: weight} from a dict or a row in COMPONENTS order"""
+    if isinstance(weights, dict):
+        vec = np.array([float(weights.get(name, 0.0)) for name in COMPONENTS])
+    else:
+        vec = np.asarray(weights, dtype=float)
+    total = vec.sum()
+    vec = vec / total if total > 0 else vec
+    return {name: float(value) for name, value in zip(COMPONENTS, vec)}
+
+
+def weighted_scorer(weights: dict, threshold: float):
+    """SafetyScorer with trial component weights and send threshold"""
+    from utils.safety_scorer import SafetyScorer
+    return SafetyScorer(weights=weights, min_threshold=threshold)
+
+
+def load_history_messages(log_dir: str = "delivery_logs") -> list[tuple[str, str]]:
+    """Read (message_id, message) pairs from the per-message JSON delivery logs"""
+    pairs = []
+    for path in sorted(Path(log_dir).glob("*.json")):
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        message = record.get("message") or record.get("message_text")
+        if message:
+            pairs.append((record.get("message_id", path.stem), message))
+    return pairs
+
+
+class WhatIfSimulator:
+    """Cache analysis results once, then re-score them under weight/threshold grids
+
+    Every score comes from the scorer itself (built by make_scorer for each trial
+    weight set and threshold), so its gates and caps apply exactly as in the app.
+    """
+
+    def __init__(self, analyzers: dict,
+                 make_scorer: Callable[[dict, float], Any] = weighted_scorer):
+        """Initialize with the analyzer dict returned by build_analyzers()"""
+        self.analyzers = analyzers
+        self.make_scorer = make_scorer
+        self.alert_ids: list[str] = []
+        self._results: list[dict] = []
+        self._row_by_digest: dict[str, int] = {}
+        self._baseline_threshold = DEFAULT_THRESHOLD
+
+    @property
+    def size(self) -> int:
+        return len(self.alert_ids)
+
+    def _analyze(self, message) -> dict:
+        """Same routing as the app's run_analysis, without the session caches"""
+        language = detect_language(message)
+        routed = select_analyzers(language, self.analyzers)
+        return {
+            "fema": routed["fema"].analyze(message),
+            "wea": routed["wea"].analyze(message),
+            "readability": routed["readability"].analyze(message),
+            "confusion": routed["confusion"].analyze(message),
+            "language": language,
+            "rule_pack_version": analysis_version(routed),
+        }
+
+    def _current(self, results: dict) -> bool:
+        """Whether the loaded analyzers would still produce this result"""
+        routed = select_analyzers(results.get("language", "en"), self.analyzers)
+        return results.get("rule_pack_version") == analysis_version(routed)
+
+    def _append(self, alert_id: str, digest: str, results: dict) -> None:
+        self._row_by_digest[digest] = len(self._results)
+        self._results.append(results)
+        self.alert_ids.append(alert_id)
+
+    def add_messages(self, messages: Iterable[tuple[str, str]]) -> int:
+        """Analyze and cache results; already-cached messages are skipped"""
+        added = 0
+        for alert_id, text in messages:
+            message = prepare(text)
+            if message.digest in self._row_by_digest:
+                continue
+            results = self._analyze(message)
+            overall = self.analyzers["scorer"].calculate_overall_score(results)
+            self._baseline_threshold = overall.get("min_threshold", self._baseline_threshold)
+            self._append(alert_id, message.digest, results)
+            added += 1
+        return added
+
+    def save_cache(self, path: str) -> None:
+        """Persist the cached analysis results so re-runs skip analysis"""
+        # Digests were inserted in row order
+        rows = [
+            {"alert_id": alert_id, "digest": digest, "results": results}
+            for alert_id, digest, results in zip(self.alert_ids, self._row_by_digest, self._results)
+        ]
+
+        Path(path).write_text(json.dumps({
+            "baseline_threshold": self._baseline_threshold,
+            "rows": rows,
+        }), encoding="utf-8")
+
+    def load_cache(self, path: str) -> int:
+        """Load results written by save_cache(); rows from other analyzer versions are dropped"""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        self.alert_ids, self._results, self._row_by_digest = [], [], {}
+        self._baseline_threshold = data.get("baseline_threshold", DEFAULT_THRESHOLD)
+        for row in data.get("rows", []):
+            if self._current(row["results"]):
+                self._append(row["alert_id"], row["digest"], row["results"])
+        return self.size
+
+    def evaluate(self, weights, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+        """(scores, ready) per alert from a scorer built with these weights and threshold"""
+        scorer = self.make_scorer(_weight_dict(weights), threshold)
+        overalls = [scorer.calculate_overall_score(results) for results in self._results]
+        scores = np.array([float(overall["overall_score"]) for overall in overalls])
+        ready = np.array([bool(overall["is_ready_to_send"]) for overall in overalls], dtype=bool)
+        return scores, ready
+
+    def scores(self, weight_grid: np.ndarray) -> np.ndarray:
+        """Overall scores, shape (alerts, weight sets), for a (k, 4) weight grid"""
+        grid = np.atleast_2d(np.asarray(weight_grid, dtype=float))
+        columns = [self.evaluate(weights, self._baseline_threshold)[0] for weights in grid]
+        return np.column_stack(columns) if columns else np.empty((self.size, 0))
+
+    def readiness(self, weight_grid: np.ndarray, thresholds: Iterable[float]) -> np.ndarray:
+        """Ready-to-send mask, shape (alerts, weight sets, thresholds)"""
+        grid = np.atleast_2d(np.asarray(weight_grid, dtype=float))
+        thresholds = [float(t) for t in thresholds]
+        ready = np.zeros((self.size, len(grid), len(thresholds)), dtype=bool)
+        for i, weights in enumerate(grid):
+            for j, threshold in enumerate(thresholds):
+                ready[:, i, j] = self.evaluate(weights, threshold)[1]
+        return ready
+
+    def readiness_curves(self, weight_grid: np.ndarray, thresholds: Iterable[float]) -> dict:
+        """Fraction of historical alerts ready to send per weight set and threshold"""
+        thresholds = list(thresholds)
+        if self.size == 0:
+            rates = np.zeros((len(np.atleast_2d(weight_grid)), len(thresholds)))
+        else:
+            rates = self.readiness(weight_grid, thresholds).mean(axis=0)
+        return {
+            "thresholds": thresholds,
+            "weights": np.atleast_2d(weight_grid).tolist(),
+            "readiness_rate": rates.tolist(),
+        }
+
+    def status_changes(self, weights: dict, threshold: float,
+                       baseline_weights: dict = None, baseline_threshold: float = None) -> dict:
+        """List alerts whose send status flips between the baseline and a candidate config"""
+        baseline_weights = baseline_weights or APP_WEIGHTS
+        if baseline_threshold is None:
+            baseline_threshold = self._baseline_threshold
+
+        base_scores, base_ready = self.evaluate(baseline_weights, baseline_threshold)
+        new_scores, new_ready = self.evaluate(weights, threshold)
+
+        def _rows(mask):
+            return [
+                {
+                    "alert_id": self.alert_ids[i],
+                    "baseline_score": float(base_scores[i]),
+                    "new_score": float(new_scores[i]),
+                }
+                for i in np.flatnonzero(mask)
+            ]
+
+        return {
+            "newly_blocked": _rows(base_ready & ~new_ready),
+            "newly_ready": _rows(~base_ready & new_ready),
+            "baseline_ready_rate": float(base_ready.mean()) if self.size else 0.0,
+            "new_ready_rate": float(new_ready.mean()) if self.size else 0.0,
+        }
+
+
+def weight_grid(step: float = 0.05, minimum: float = 0.05) -> np.ndarray:
+    """Every 4-component weight combination on a simplex grid that sums to 1"""
+    ticks = np.arange(minimum, 1.0 + 1e-9, step)
+    combos = [
+        (f, w, r, round(1.0 - f - w - r, 10))
+        for f, w, r in itertools.product(ticks, repeat=3)
+        if 1.0 - f - w - r >= minimum - 1e-9
+    ]
+    return np.array(combos)
+
+
+def main():
+    """Compare app vs. ARCHITECTURE.md weights over the delivery logs"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="What-if simulator for SafetyScorer weights")
+    parser.add_argument("--logs", default="delivery_logs")
+    parser.add_argument("--cache", default=None, help="Optional JSON analysis cache")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--rules", default="rules/en.json")
+    parser.add_argument("--spanish-rules", default="rules/es.json")
+    args = parser.parse_args()
+
+    simulator = WhatIfSimulator(build_analyzers(args.rules, args.spanish_rules))
+    if args.cache and Path(args.cache).exists():
+        simulator.load_cache(args.cache)
+    simulator.add_messages(load_history_messages(args.logs))
+    if args.cache:
+        simulator.save_cache(args.cache)
+
+    changes = simulator.status_changes(ARCHITECTURE_WEIGHTS, args.threshold)
+    print(f"Alerts analyzed: {simulator.size}")
+    print(f"Ready (app weights):          {changes['baseline_ready_rate']:.1%}")
+    print(f"Ready (ARCHITECTURE weights): {changes['new_ready_rate']:.1%}")
+    for row in changes["newly_blocked"]:
+        print(f"  blocked: {row['alert_id']} {row['baseline_score']} -> {row['new_score']}")
+    for row in changes["newly_ready"]:
+        print(f"  ready:   {row['alert_id']} {row['baseline_score']} -> {row['new_score']}")
+
+
+if __name__ == "__main__":
+    main()